@@ -69,12 +69,12 @@ def _cache_get_or_set(key: str, ttl: int, compute_fn):
 
 def _build_skill_performance_from_results(graded_submissions) -> List[Dict[str, Any]]:
 	"""
-	Build skill_performance from Submission.results (JSONField).
+	Build skill_performance from SubmissionPayload.results (JSONField).
 	Returns list of {skill_name, average_score} in consistent order.
 	"""
 	section_scores: Dict[str, List[float]] = defaultdict(list)
 	for sub in graded_submissions:
-		results = sub.results or {}
+		results = sub.get_results() or {}
 		if not isinstance(results, dict):
 			continue
 		jlpt = results.get("jlpt_result") or {}
@@ -244,6 +244,7 @@ def get_teacher_analytics(user) -> Dict[str, Any]:
 
 		recent_submissions_q = (
 			submissions_q.select_related("exam_assignment", "homework_assignment")
+			.exclude(status=Submission.Status.STARTED, started_at__isnull=True)
 			.order_by("-created_at")[:10]
 		)
 		user_ids_set = {s.user_id for s in recent_submissions_q}
@@ -363,7 +364,7 @@ def get_student_analytics(user) -> Dict[str, Any]:
 				}).data
 			)
 
-		skill_performance = _build_skill_performance_from_results(graded_qs)
+		skill_performance = _build_skill_performance_from_results(graded_qs.select_related("payload"))
 		payload = {
 			"average_score": average_score,
 			"completed_exams_count": completed_count,
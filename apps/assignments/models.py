@@ -43,6 +43,11 @@ class ExamAssignment(TenantBaseModel):
         help_text="If False, student sees 'Submitted'. If True, student sees scores."
     )
 
+    shuffle = models.BooleanField(
+        default=False,
+        help_text="Per-student question/option order (seeded, see attempts/shuffle.py). Fixed once attempts start."
+    )
+
     created_by_id = models.BigIntegerField(
         null=True, blank=True, db_index=True
     )
@@ -44,7 +44,7 @@ class ExamAssignmentSerializer(serializers.ModelSerializer):
         model = ExamAssignment
         fields = [
             "id", "title", "description", "mock_test", "status",
-            "estimated_start_time", "is_published", "assigned_group_ids",
+            "estimated_start_time", "is_published", "shuffle", "assigned_group_ids",
             "assigned_groups", "created_by_id", "created_by",
             "created_at", "updated_at",
         ]
@@ -84,6 +84,17 @@ class ExamAssignmentSerializer(serializers.ModelSerializer):
                 "mock_test": "MockTest is required."
             })
 
+        # Saved answers are option indices in each student's shuffled order
+        if (
+            self.instance is not None
+            and "shuffle" in attrs
+            and attrs["shuffle"] != self.instance.shuffle
+            and self.instance.submissions.filter(started_at__isnull=False).exists()
+        ):
+            raise serializers.ValidationError({
+                "shuffle": "Cannot change shuffling after students have started the exam."
+            })
+
         request = self.context.get("request")
         user = getattr(request, "user", None) if request else None
         if user and user.role == "TEACHER" and group_ids:
@@ -0,0 +1,231 @@
+# apps/attempts/admission.py
+"""
+Admission control (virtual waiting room) for start-exam.
+
+Every start of an exam room passes two Redis token buckets before any database
+work: one per tenant (schema) and one per room (ExamAssignment). Buckets refill
+at a configured rate up to a burst size, so when a whole room opens at once the
+starts reach Postgres at a steady rate and other tenants keep their share.
+
+Students who are not admitted join the room's queue (sorted set, first attempt
+time as score) and get 429 with their queue position and a Retry-After. Only the
+first ADMISSION_QUEUE_WINDOW queued students may take a token, so retries are
+served roughly first come, first served. Students who stop retrying are dropped
+from the queue after ADMISSION_STALE_SECONDS.
+
+The whole decision is one Lua script (atomic, one round trip). Counters of
+admitted / rejected starts per tenant and per room are kept in Redis hashes and
+returned by get_room_metrics (GET /submissions/admission-metrics/).
+
+Disabled (every start admitted) unless ATTEMPTS_ADMISSION_ENABLED is set and the
+default cache is Redis. Redis errors also admit: the gate must never block an exam.
+"""
+import logging
+import math
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ErrorDetail
+
+from apps.core.cache_utils import get_redis_client
+from apps.core.tenant_utils import get_current_schema
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_KEY_PREFIX = "attempts:admission"
+ADMISSION_TENANT_RATE = getattr(settings, "ATTEMPTS_ADMISSION_TENANT_RATE", 50.0)
+ADMISSION_TENANT_BURST = getattr(settings, "ATTEMPTS_ADMISSION_TENANT_BURST", 100)
+ADMISSION_ROOM_RATE = getattr(settings, "ATTEMPTS_ADMISSION_ROOM_RATE", 20.0)
+ADMISSION_ROOM_BURST = getattr(settings, "ATTEMPTS_ADMISSION_ROOM_BURST", 40)
+# Queue positions allowed to take a token; later positions wait their turn.
+ADMISSION_QUEUE_WINDOW = getattr(settings, "ATTEMPTS_ADMISSION_QUEUE_WINDOW", 40)
+ADMISSION_MAX_RETRY_AFTER = 30
+# Queued students who have not retried for this long lose their place.
+ADMISSION_STALE_SECONDS = 3 * ADMISSION_MAX_RETRY_AFTER
+ADMISSION_METRICS_TTL = 24 * 60 * 60
+
+# KEYS: tenant bucket, room bucket, queue (first seen), last seen, tenant metrics, room metrics
+# ARGV: now_ms, member, tenant rate/s, tenant burst, room rate/s, room burst, window, stale_ms, metrics ttl
+_ADMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local stale = tonumber(ARGV[8])
+
+local function refill(key, rate, burst)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    return math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+end
+
+local function store(key, tokens, rate, burst)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+
+local gone = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now - stale, 'LIMIT', 0, 500)
+if #gone > 0 then
+    redis.call('ZREM', KEYS[3], unpack(gone))
+    redis.call('ZREM', KEYS[4], unpack(gone))
+end
+redis.call('ZADD', KEYS[3], 'NX', now, member)
+redis.call('ZADD', KEYS[4], now, member)
+local position = redis.call('ZRANK', KEYS[3], member)
+
+local tenant_rate, tenant_burst = tonumber(ARGV[3]), tonumber(ARGV[4])
+local room_rate, room_burst = tonumber(ARGV[5]), tonumber(ARGV[6])
+local tenant = refill(KEYS[1], tenant_rate, tenant_burst)
+local room = refill(KEYS[2], room_rate, room_burst)
+
+local admitted = 0
+local outcome = 'rejected'
+if position < tonumber(ARGV[7]) and tenant >= 1 and room >= 1 then
+    tenant = tenant - 1
+    room = room - 1
+    admitted = 1
+    outcome = 'admitted'
+    redis.call('ZREM', KEYS[3], member)
+    redis.call('ZREM', KEYS[4], member)
+end
+store(KEYS[1], tenant, tenant_rate, tenant_burst)
+store(KEYS[2], room, room_rate, room_burst)
+redis.call('PEXPIRE', KEYS[3], stale)
+redis.call('PEXPIRE', KEYS[4], stale)
+for _, key in ipairs({KEYS[5], KEYS[6]}) do
+    redis.call('HINCRBY', key, outcome, 1)
+    redis.call('EXPIRE', key, tonumber(ARGV[9]))
+end
+return {admitted, position}
+"""
+
+_script = None
+
+
+class AdmissionDenied(APIException):
+    """429 with queue position; `wait` becomes the Retry-After header."""
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "The exam room is busy. Please retry shortly."
+    default_code = "admission_denied"
+
+    def __init__(self, position, retry_after):
+        self.wait = retry_after
+        super().__init__()
+        # Set after __init__: APIException would turn the integers into ErrorDetail strings.
+        self.detail = {
+            "detail": ErrorDetail(str(self.default_detail), code=self.default_code),
+            "queue_position": position,
+            "retry_after": retry_after,
+        }
+
+
+def is_enabled():
+    return getattr(settings, "ATTEMPTS_ADMISSION_ENABLED", False)
+
+
+def _keys(schema_name, exam_assignment_id):
+    tenant = f"{ADMISSION_KEY_PREFIX}:{schema_name}"
+    room = f"{tenant}:{exam_assignment_id}"
+    return (
+        f"{tenant}:bucket",
+        f"{room}:bucket",
+        f"{room}:queue",
+        f"{room}:seen",
+        f"{tenant}:metrics",
+        f"{room}:metrics",
+    )
+
+
+def retry_after_seconds(position):
+    """Time until the room's refill reaches this queue position (1..ADMISSION_MAX_RETRY_AFTER)."""
+    return min(ADMISSION_MAX_RETRY_AFTER, max(1, math.ceil((position + 1) / ADMISSION_ROOM_RATE)))
+
+
+def admit_exam_start(exam_assignment_id, user_id) -> None:
+    """Take a start token for the user, or raise AdmissionDenied with their queue position."""
+    if not is_enabled():
+        return
+    client = get_redis_client()
+    if client is None:
+        return
+    global _script
+    if _script is None:
+        _script = client.register_script(_ADMIT_SCRIPT)
+    try:
+        admitted, position = _script(
+            keys=_keys(get_current_schema(), exam_assignment_id),
+            args=[
+                int(time.time() * 1000), str(user_id),
+                ADMISSION_TENANT_RATE, ADMISSION_TENANT_BURST,
+                ADMISSION_ROOM_RATE, ADMISSION_ROOM_BURST,
+                ADMISSION_QUEUE_WINDOW, ADMISSION_STALE_SECONDS * 1000, ADMISSION_METRICS_TTL,
+            ],
+            client=client,
+        )
+    except Exception:
+        logger.warning("Admission check failed for room %s; admitting", exam_assignment_id, exc_info=True)
+        return
+    if not admitted:
+        raise AdmissionDenied(int(position), retry_after_seconds(int(position)))
+
+
+def _decode(state):
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in (state or {}).items()
+    }
+
+
+def _tokens(state, rate, burst, now_ms):
+    """Current bucket level from its stored (tokens, ts) hash; full if untouched."""
+    state = _decode(state)
+    if not state.get("tokens"):
+        return float(burst)
+    elapsed = max(0, now_ms - int(state["ts"]))
+    return min(float(burst), float(state["tokens"]) + elapsed * rate / 1000)
+
+
+def _counters(state):
+    state = _decode(state)
+    return {
+        "admitted": int(state.get("admitted", 0)),
+        "rejected": int(state.get("rejected", 0)),
+    }
+
+
+def get_room_metrics(exam_assignment_id):
+    """Admission counters, queue length and bucket levels of a room and its tenant."""
+    settings_block = {
+        "enabled": is_enabled(),
+        "tenant_rate": ADMISSION_TENANT_RATE,
+        "tenant_burst": ADMISSION_TENANT_BURST,
+        "room_rate": ADMISSION_ROOM_RATE,
+        "room_burst": ADMISSION_ROOM_BURST,
+    }
+    client = get_redis_client()
+    if client is None:
+        return {**settings_block, "available": False}
+    tenant_bucket, room_bucket, queue, _seen, tenant_metrics, room_metrics = _keys(
+        get_current_schema(), exam_assignment_id,
+    )
+    pipe = client.pipeline()
+    pipe.hgetall(tenant_bucket)
+    pipe.hgetall(room_bucket)
+    pipe.zcard(queue)
+    pipe.hgetall(tenant_metrics)
+    pipe.hgetall(room_metrics)
+    tenant_state, room_state, queue_length, tenant_counts, room_counts = pipe.execute()
+    now_ms = int(time.time() * 1000)
+    return {
+        **settings_block,
+        "available": True,
+        "queue_length": queue_length,
+        "room": {
+            **_counters(room_counts),
+            "tokens": round(_tokens(room_state, ADMISSION_ROOM_RATE, ADMISSION_ROOM_BURST, now_ms), 2),
+        },
+        "tenant": {
+            **_counters(tenant_counts),
+            "tokens": round(_tokens(tenant_state, ADMISSION_TENANT_RATE, ADMISSION_TENANT_BURST, now_ms), 2),
+        },
+    }
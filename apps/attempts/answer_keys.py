@@ -0,0 +1,144 @@
+# apps/attempts/answer_keys.py
+"""
+Compiled answer keys for MockTest grading.
+
+A compiled key is a compact, read-only structure of
+question_id -> (correct_index, score, section_id, section_type, option_count) plus the ordered
+section list, built with a single values_list query. Keys are cached in two tiers:
+an in-process LRU and the Django cache (Redis in production), both keyed by
+(schema, MockTest id, MockTest.content_version).
+
+content_version is bumped whenever MockTestViewSet.publish toggles status, so a
+stale key in another worker's LRU simply becomes unreachable. Only PUBLISHED tests
+are cached: draft content can change at any time without a version bump.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.cache_utils import LRUCache, tenant_cache_key
+from apps.mock_tests.models import MockTest, Question
+
+# Bump the suffix when the pickled key layout changes.
+ANSWER_KEY_CACHE_PREFIX = "attempts:answer_key:v2"
+ANSWER_KEY_CACHE_TTL = getattr(settings, "ANSWER_KEY_CACHE_TTL", 60 * 60 * 24)
+
+_local_cache = LRUCache(maxsize=getattr(settings, "ANSWER_KEY_LRU_SIZE", 128))
+
+
+class AnswerKeyQuestion(NamedTuple):
+    question_id: str
+    correct_index: Optional[int]
+    score: int
+    section_id: str
+    section_type: str
+    option_count: int
+
+
+class AnswerKeySection(NamedTuple):
+    section_id: str
+    name: str
+    section_type: str
+    max_score: int
+
+
+class CompiledAnswerKey:
+    """
+    Immutable answer key for one MockTest version.
+
+    questions keeps paper order (section order, group order, question order);
+    sections keeps the order in which sections first appear in that sequence,
+    which is the order GradingService has always emitted in results["sections"].
+    """
+    __slots__ = ("mock_test_id", "version", "level", "sections", "questions", "_index")
+
+    def __init__(self, mock_test_id, version, level, sections, questions):
+        self.mock_test_id = str(mock_test_id)
+        self.version = version
+        self.level = level
+        self.sections: Tuple[AnswerKeySection, ...] = tuple(sections)
+        self.questions: Tuple[AnswerKeyQuestion, ...] = tuple(questions)
+        self._index = {q.question_id: q for q in self.questions}
+
+    def __reduce__(self):
+        # Pickle only the tuples; the lookup index is rebuilt on load.
+        return (
+            CompiledAnswerKey,
+            (self.mock_test_id, self.version, self.level, self.sections, self.questions),
+        )
+
+    def __len__(self):
+        return len(self.questions)
+
+    def get(self, question_id):
+        return self._index.get(question_id)
+
+
+def compile_answer_key(mock_test) -> CompiledAnswerKey:
+    """Build the answer key for mock_test with one query (no model instances)."""
+    rows = (
+        Question.objects.filter(group__section__mock_test=mock_test)
+        .order_by("group__section__order", "group__order", "order")
+        .values_list(
+            "id",
+            "correct_option_index",
+            "score",
+            "group__section_id",
+            "group__section__name",
+            "group__section__section_type",
+            "options",
+        )
+    )
+    questions = []
+    section_meta = {}
+    section_max = {}
+    for question_id, correct_index, score, section_id, section_name, section_type, options in rows:
+        section_id = str(section_id)
+        if section_id not in section_meta:
+            section_meta[section_id] = (section_name, section_type)
+            section_max[section_id] = 0
+        section_max[section_id] += score
+        questions.append(
+            AnswerKeyQuestion(
+                str(question_id), correct_index, score, section_id, section_type,
+                len(options) if isinstance(options, list) else 0,
+            )
+        )
+    sections = [
+        AnswerKeySection(sid, name, section_type, section_max[sid])
+        for sid, (name, section_type) in section_meta.items()
+    ]
+    return CompiledAnswerKey(
+        mock_test.id, mock_test.content_version, mock_test.level, sections, questions
+    )
+
+
+def _answer_key_cache_key(mock_test_id, version):
+    return tenant_cache_key(ANSWER_KEY_CACHE_PREFIX, mock_test_id, f"v{version}")
+
+
+def get_answer_key(mock_test) -> CompiledAnswerKey:
+    """
+    Return the compiled answer key for mock_test (LRU -> Django cache -> DB).
+    Draft tests are compiled on every call and never cached.
+    """
+    if mock_test.status != MockTest.Status.PUBLISHED:
+        return compile_answer_key(mock_test)
+    key = _answer_key_cache_key(mock_test.id, mock_test.content_version)
+    answer_key = _local_cache.get(key)
+    if answer_key is not None:
+        return answer_key
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = compile_answer_key(mock_test)
+        cache.set(key, answer_key, ANSWER_KEY_CACHE_TTL)
+    _local_cache.set(key, answer_key)
+    return answer_key
+
+
+def invalidate_answer_key(mock_test_id, version) -> None:
+    """Drop the cached key for one (MockTest, version) from both cache tiers."""
+    key = _answer_key_cache_key(mock_test_id, version)
+    _local_cache.delete(key)
+    cache.delete(key)
@@ -0,0 +1,148 @@
+# apps/attempts/archive.py
+"""
+Cold-tier archive of old submission payloads.
+
+Graded submissions completed more than ATTEMPTS_ARCHIVE_AFTER_DAYS ago are rarely
+read, yet their SubmissionPayload rows (answers, results, legacy snapshot) make up
+most of the attempts data in Postgres and in every backup. The daily
+archive_submission_payloads task writes each such payload as one zstd-compressed
+JSON object to the default storage backend (S3 in production, local filesystem
+in development), records the object path in Submission.payload_archive, and
+deletes the payload row.
+
+Reads stay transparent: Submission.get_payload() falls back to the archive when
+the row is gone, so results endpoints, exports and regrades see the same data.
+Decoded archives are kept in a small in-process LRU. A payload row written again
+later (e.g. by a regrade) takes precedence over the archive until the next run
+archives it anew.
+
+Requires zstandard (optional dependency); without it nothing is archived, and
+reading an archived payload raises ImproperlyConfigured.
+"""
+import base64
+import copy
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.cache_utils import LRUCache
+from apps.core.tenant_utils import get_current_schema
+from .models import Submission, SubmissionPayload
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "attempts-archive"
+ARCHIVE_FORMAT = 1
+ARCHIVE_LEVEL = 10
+ARCHIVE_BATCH_SIZE = 500
+# 0 disables archiving.
+ARCHIVE_AFTER_DAYS = getattr(settings, "ATTEMPTS_ARCHIVE_AFTER_DAYS", 0)
+
+_JSON_FIELDS = ("answers", "results", "snapshot")
+_BINARY_FIELDS = ("answers_packed", "results_packed")
+
+_local_cache = LRUCache(maxsize=128)
+
+
+def _object_name(schema_name, submission):
+    completed = submission.completed_at or timezone.now()
+    return f"{ARCHIVE_PREFIX}/{schema_name}/{completed:%Y/%m}/{submission.id}.json.zst"
+
+
+def encode_payload(payload) -> bytes:
+    document = {"v": ARCHIVE_FORMAT}
+    for name in _JSON_FIELDS:
+        document[name] = getattr(payload, name)
+    for name in _BINARY_FIELDS:
+        value = getattr(payload, name)
+        document[name] = base64.b64encode(bytes(value)).decode("ascii") if value is not None else None
+    raw = json.dumps(document, separators=(",", ":"), default=str).encode("utf-8")
+    return zstandard.ZstdCompressor(level=ARCHIVE_LEVEL).compress(raw)
+
+
+def decode_payload(blob) -> dict:
+    document = json.loads(zstandard.ZstdDecompressor().decompress(blob))
+    fields = {name: document.get(name) or {} for name in _JSON_FIELDS}
+    for name in _BINARY_FIELDS:
+        value = document.get(name)
+        fields[name] = base64.b64decode(value) if value is not None else None
+    return fields
+
+
+def load_archived_payload(submission) -> SubmissionPayload:
+    """Unsaved SubmissionPayload rebuilt from the submission's archive object."""
+    if not HAS_ZSTD:
+        raise ImproperlyConfigured("zstandard is required to read archived submission payloads.")
+    name = submission.payload_archive
+    fields = _local_cache.get(name)
+    if fields is None:
+        with default_storage.open(name, "rb") as handle:
+            fields = decode_payload(handle.read())
+        _local_cache.set(name, fields)
+    # Copies: callers may modify the payload (e.g. regrade), the cached dicts must not change.
+    return SubmissionPayload(submission=submission, **copy.deepcopy(fields))
+
+
+def archive_payloads(now=None, limit=ARCHIVE_BATCH_SIZE) -> int:
+    """Archive up to `limit` payloads of the current schema that are due. Returns how many."""
+    if not HAS_ZSTD or not ARCHIVE_AFTER_DAYS:
+        return 0
+    now = now or timezone.now()
+    submissions = list(
+        Submission.objects.filter(
+            status=Submission.Status.GRADED,
+            completed_at__lt=now - timedelta(days=ARCHIVE_AFTER_DAYS),
+            payload__isnull=False,
+        ).select_related("payload").only(
+            "id", "completed_at", "payload_archive",
+            *(f"payload__{name}" for name in _JSON_FIELDS + _BINARY_FIELDS),
+        ).order_by("completed_at")[:limit]
+    )
+    if not submissions:
+        return 0
+
+    schema_name = get_current_schema()
+    written, replaced = [], []
+    try:
+        for submission in submissions:
+            name = default_storage.save(
+                _object_name(schema_name, submission), ContentFile(encode_payload(submission.payload)),
+            )
+            written.append(name)
+            if submission.payload_archive:
+                replaced.append(submission.payload_archive)
+            submission.payload_archive = name
+        with transaction.atomic():
+            Submission.objects.bulk_update(submissions, ["payload_archive"], batch_size=ARCHIVE_BATCH_SIZE)
+            # A payload rewritten since it was read stays in Postgres (and wins over the archive).
+            SubmissionPayload.objects.filter(
+                submission_id__in=[s.id for s in submissions], updated_at__lte=now,
+            ).delete()
+    except Exception:
+        for name in written:
+            default_storage.delete(name)
+        raise
+
+    def drop_replaced():
+        for name in replaced:
+            _local_cache.delete(name)
+            try:
+                default_storage.delete(name)
+            except Exception:
+                logger.warning("Could not delete replaced payload archive %s", name, exc_info=True)
+
+    transaction.on_commit(drop_replaced)
+    return len(submissions)
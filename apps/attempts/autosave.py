@@ -0,0 +1,158 @@
+# apps/attempts/autosave.py
+"""
+Incremental answer autosave with a Redis write-behind buffer.
+
+PATCH /submissions/autosave/ writes the changed answers into a Redis hash per
+submission ({question_uuid: option_index}) and marks the submission dirty. The
+periodic flush_autosaved_answers task pops dirty submissions, merges their hashes
+into SubmissionPayload.answers and persists them per tenant with one upsert, so a
+full exam room costs a handful of Postgres writes per flush instead of one per click.
+
+Readers (resume, grading) merge DB answers with the buffer, buffer winning.
+Without Redis (dev/tests) saves are merged straight into Postgres.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.core.cache_utils import get_redis_client
+from apps.core.tenant_utils import get_current_schema, schema_context
+from .models import Submission, SubmissionPayload
+
+logger = logging.getLogger(__name__)
+
+AUTOSAVE_KEY_PREFIX = "attempts:autosave"
+AUTOSAVE_DIRTY_KEY = f"{AUTOSAVE_KEY_PREFIX}:dirty"
+# Buffered answers outlive any exam (longest JLPT paper + grace) with a wide margin.
+AUTOSAVE_TTL = getattr(settings, "AUTOSAVE_TTL", 60 * 60 * 24)
+AUTOSAVE_FLUSH_BATCH = getattr(settings, "AUTOSAVE_FLUSH_BATCH", 1000)
+
+
+def _answers_key(schema_name, submission_id):
+    return f"{AUTOSAVE_KEY_PREFIX}:{schema_name}:{submission_id}"
+
+
+def _dirty_member(schema_name, submission_id):
+    return f"{schema_name}:{submission_id}"
+
+
+def _decode_hash(raw):
+    return {
+        (k.decode() if isinstance(k, bytes) else k): int(v)
+        for k, v in raw.items()
+    }
+
+
+def save_answers(submission, answers) -> None:
+    """Buffer answers ({question_uuid: option_index}) for a STARTED submission."""
+    if not answers:
+        return
+    client = get_redis_client()
+    if client is None:
+        with transaction.atomic():
+            locked = Submission.objects.select_for_update().only("id", "status").get(
+                pk=submission.pk
+            )
+            if locked.status != Submission.Status.STARTED:
+                return
+            payload = locked.get_payload()
+            payload.answers = {**(payload.answers or {}), **answers}
+            SubmissionPayload.save_for([locked], ["answers"])
+        return
+    schema_name = get_current_schema()
+    key = _answers_key(schema_name, submission.id)
+    pipe = client.pipeline()
+    pipe.hset(key, mapping={qid: int(idx) for qid, idx in answers.items()})
+    pipe.expire(key, AUTOSAVE_TTL)
+    pipe.sadd(AUTOSAVE_DIRTY_KEY, _dirty_member(schema_name, submission.id))
+    pipe.execute()
+
+
+def get_buffered_answers(submission_id) -> dict:
+    """Answers saved since the last flush (empty without Redis)."""
+    client = get_redis_client()
+    if client is None:
+        return {}
+    return _decode_hash(client.hgetall(_answers_key(get_current_schema(), submission_id)))
+
+
+def get_buffered_answers_many(submission_ids) -> dict:
+    """{submission_id (str): buffered answers} for many submissions in one round trip."""
+    client = get_redis_client()
+    if client is None or not submission_ids:
+        return {}
+    schema_name = get_current_schema()
+    ids = [str(sid) for sid in submission_ids]
+    pipe = client.pipeline()
+    for submission_id in ids:
+        pipe.hgetall(_answers_key(schema_name, submission_id))
+    return {sid: _decode_hash(raw) for sid, raw in zip(ids, pipe.execute()) if raw}
+
+
+def get_saved_answers(submission) -> dict:
+    """Persisted answers overlaid with the not-yet-flushed buffer."""
+    return {**(submission.get_payload().answers or {}), **get_buffered_answers(submission.id)}
+
+
+def discard_buffered_answers(submission_id) -> None:
+    """Drop the buffer once the submission is graded (answers are final in Postgres)."""
+    client = get_redis_client()
+    if client is None:
+        return
+    schema_name = get_current_schema()
+    pipe = client.pipeline()
+    pipe.delete(_answers_key(schema_name, submission_id))
+    pipe.srem(AUTOSAVE_DIRTY_KEY, _dirty_member(schema_name, submission_id))
+    pipe.execute()
+
+
+def flush_dirty_answers(limit=AUTOSAVE_FLUSH_BATCH) -> int:
+    """
+    Persist up to `limit` dirty submissions. Returns how many rows were written.
+    Members whose flush fails are put back into the dirty set for the next run.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    members = client.spop(AUTOSAVE_DIRTY_KEY, limit) or []
+    by_schema = {}
+    for member in members:
+        member = member.decode() if isinstance(member, bytes) else member
+        schema_name, _, submission_id = member.rpartition(":")
+        by_schema.setdefault(schema_name, []).append(submission_id)
+
+    written = 0
+    for schema_name, submission_ids in by_schema.items():
+        try:
+            with schema_context(schema_name):
+                written += _flush_schema(client, schema_name, submission_ids)
+        except Exception:
+            logger.exception("Autosave flush failed for %s; re-queueing", schema_name)
+            client.sadd(
+                AUTOSAVE_DIRTY_KEY,
+                *[_dirty_member(schema_name, sid) for sid in submission_ids],
+            )
+    return written
+
+
+def _flush_schema(client, schema_name, submission_ids) -> int:
+    pipe = client.pipeline()
+    for submission_id in submission_ids:
+        pipe.hgetall(_answers_key(schema_name, submission_id))
+    buffers = dict(zip(submission_ids, (_decode_hash(raw) for raw in pipe.execute())))
+
+    with transaction.atomic():
+        # Locking the still-STARTED rows keeps grading (which updates them) from
+        # interleaving: a submission graded since it was read is not overwritten.
+        submissions = list(
+            Submission.objects.select_for_update(of=("self",)).select_related("payload").filter(
+                id__in=[sid for sid, buf in buffers.items() if buf],
+                status=Submission.Status.STARTED,
+            ).only("id", "payload__answers")
+        )
+        for submission in submissions:
+            payload = submission.get_payload()
+            payload.answers = {**(payload.answers or {}), **buffers[str(submission.id)]}
+        SubmissionPayload.save_for(submissions, ["answers"])
+    return len(submissions)
@@ -0,0 +1,335 @@
+# apps/attempts/batch_grading.py
+"""
+Vectorized grading for whole exam rooms (regrade and room-close finalization).
+
+All answers of an ExamAssignment are loaded into one students × questions matrix
+of option indices (-1 = unanswered) and compared against the compiled answer-key
+vector (see answer_keys.py). Section totals come from a segment reduction
+(np.add.reduceat over question columns grouped by section), and the JLPT pass/fail
+rules of GradingService.JLPT_PASS_REQUIREMENTS are applied to all students at once.
+
+JLPT section weights (0.5 / 0.67 / 0.33) are applied in integer hundredths so the
+outcome is exactly what the Decimal arithmetic in
+GradingService._calculate_jlpt_result produces for a single submission.
+
+Results are written back with bulk_update, filtered on the expected status so a
+row graded concurrently by the normal submit path is never overwritten. Note that
+bulk_update does not send post_save, so no per-student notifications are emitted.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.tenant_utils import get_current_schema
+from apps.mock_tests.models import TestSection
+from .answer_keys import get_answer_key
+from .autosave import discard_buffered_answers, get_buffered_answers_many
+from .irt import get_score_scale
+from .item_stats import record_responses_bulk, replace_responses
+from .leaderboard import invalidate_room
+from .mastery import record_mastery_bulk
+from .models import Submission, SubmissionPayload
+from .services import GradingService
+from .shuffle import to_canonical
+from .snapshots import get_mock_test_snapshot_id
+from .timers import cancel_expiry
+
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Unanswered cells hold -1; missing correct answers hold -2 so they never match.
+_UNANSWERED = -1
+_NO_KEY = -2
+
+_SectionType = TestSection.SectionType
+
+# Hundredths of a section score credited to each JLPT scoring category.
+_WEIGHTS = {
+    ("N1", "N2", "N3"): (
+        ("language_knowledge", "reading", "listening"),
+        {
+            _SectionType.VOCAB: (100, 0, 0),
+            _SectionType.GRAMMAR_READING: (50, 50, 0),
+            _SectionType.FULL_WRITTEN: (67, 33, 0),
+            _SectionType.LISTENING: (0, 0, 100),
+        },
+    ),
+    ("N4", "N5"): (
+        ("language_reading_combined", "listening"),
+        {
+            _SectionType.VOCAB: (100, 0),
+            _SectionType.GRAMMAR_READING: (100, 0),
+            _SectionType.LISTENING: (0, 100),
+        },
+    ),
+}
+
+
+def _weights_for(level):
+    for levels, spec in _WEIGHTS.items():
+        if level in levels:
+            return spec
+    return None
+
+
+def grade_answer_matrix(answer_key, answers_list, scale_as_of=None):
+    """
+    Grade many answer dicts against one compiled key (and the IRT scale in force
+    at scale_as_of, see irt.scale_cutoff).
+    Returns (totals, results) where totals is a list of Decimal and results holds
+    dicts shaped exactly like GradingService._grade_mock_test output.
+    """
+    questions = answer_key.questions
+    sections = answer_key.sections
+    n_students, n_questions = len(answers_list), len(questions)
+
+    column = {q.question_id: j for j, q in enumerate(questions)}
+    matrix = np.full((n_students, n_questions), _UNANSWERED, dtype=np.int32)
+    for i, answers in enumerate(answers_list):
+        for question_id, selected_index in (answers or {}).items():
+            j = column.get(question_id)
+            if j is not None:
+                matrix[i, j] = int(selected_index)
+
+    key = np.array(
+        [_NO_KEY if q.correct_index is None else q.correct_index for q in questions],
+        dtype=np.int32,
+    )
+    weights = np.array([q.score for q in questions], dtype=np.int64)
+    section_pos = {s.section_id: k for k, s in enumerate(sections)}
+    section_of = np.array([section_pos[q.section_id] for q in questions], dtype=np.int64)
+
+    correct = matrix == key
+    points = np.where(correct, weights, 0)
+
+    if n_questions:
+        order = np.argsort(section_of, kind="stable")
+        starts = np.searchsorted(section_of[order], np.arange(len(sections)))
+        section_sums = np.add.reduceat(points[:, order], starts, axis=1)
+    else:
+        section_sums = np.zeros((n_students, len(sections)), dtype=np.int64)
+    totals = section_sums.sum(axis=1)
+
+    scale = get_score_scale(answer_key, scale_as_of)
+    if scale is not None:
+        jlpt = _scaled_jlpt(answer_key, sections, scale, correct, section_of, section_sums, totals)
+    else:
+        jlpt = _vectorized_jlpt(answer_key, sections, section_sums, totals)
+
+    results_list = []
+    for i in range(n_students):
+        answered = np.flatnonzero(matrix[i] != _UNANSWERED)
+        question_results = {s.section_id: {} for s in sections}
+        for j in answered:
+            q = questions[j]
+            question_results[q.section_id][q.question_id] = {
+                "correct": bool(correct[i, j]),
+                "score": float(points[i, j]),
+                "selected_index": int(matrix[i, j]),
+            }
+        results_list.append({
+            "total_score": float(totals[i]),
+            "sections": {
+                s.section_id: {
+                    "section_id": s.section_id,
+                    "section_name": s.name,
+                    "section_type": s.section_type,
+                    "score": float(section_sums[i, k]),
+                    "max_score": float(s.max_score),
+                    "questions": question_results[s.section_id],
+                }
+                for k, s in enumerate(sections)
+            },
+            "jlpt_result": jlpt(i),
+            "resource_type": "mock_test",
+        })
+        if results_list[-1]["jlpt_result"].get("scaled"):
+            results_list[-1]["scaled_total_score"] = results_list[-1]["jlpt_result"]["total_score"]
+    return [Decimal(int(t)) for t in totals], results_list
+
+
+def _vectorized_jlpt(answer_key, sections, section_sums, totals):
+    """Return row -> jlpt_result dict, with all comparisons done on whole columns."""
+    level = answer_key.level
+    spec = _weights_for(level)
+    requirements = GradingService.JLPT_PASS_REQUIREMENTS.get(level)
+    if spec is None or requirements is None:
+        def fallback(i):
+            section_scores = {
+                s.section_id: {"section_type": s.section_type, "score": int(section_sums[i, k])}
+                for k, s in enumerate(sections)
+            }
+            return GradingService._calculate_jlpt_result(level, Decimal(int(totals[i])), section_scores)
+        return fallback
+
+    categories, by_type = spec
+    zero = (0,) * len(categories)
+    weight_matrix = np.array([by_type.get(s.section_type, zero) for s in sections], dtype=np.int64)
+    weight_matrix = weight_matrix.reshape(len(sections), len(categories))
+    category_hundredths = section_sums.astype(np.int64) @ weight_matrix
+    minimums = np.array([requirements["sections"][c] * 100 for c in categories], dtype=np.int64)
+    category_passed = category_hundredths >= minimums
+    all_sections_passed = category_passed.all(axis=1)
+    total_passed = totals >= requirements["total_pass"]
+    passed = total_passed & all_sections_passed
+
+    def build(i):
+        return {
+            "level": level,
+            "total_score": float(totals[i]),
+            "pass_mark": int(requirements["total_pass"]),
+            "passed": bool(passed[i]),
+            "section_results": {
+                c: {
+                    "score": float(Decimal(int(category_hundredths[i, m])) / 100),
+                    "min_required": int(requirements["sections"][c]),
+                    "passed": bool(category_passed[i, m]),
+                }
+                for m, c in enumerate(categories)
+            },
+            "total_passed": bool(total_passed[i]),
+            "all_sections_passed": bool(all_sections_passed[i]),
+        }
+    return build
+
+
+def _scaled_jlpt(answer_key, sections, scale, correct, section_of, section_sums, totals):
+    """
+    Row -> jlpt_result on IRT-scaled section scores (see irt.py), matching
+    GradingService._calculate_scaled_jlpt_result: per-section correct counts come
+    from one matrix product and index the calibrated tables column by column.
+    """
+    membership = np.zeros((len(section_of), len(sections)), dtype=np.int64)
+    membership[np.arange(len(section_of)), section_of] = 1
+    correct_counts = correct.astype(np.int64) @ membership
+    scaled_sums = section_sums.astype(np.int64)
+    for k, s in enumerate(sections):
+        table = scale.tables.get(s.section_id)
+        if table:
+            lookup = np.asarray(table, dtype=np.int64)
+            scaled_sums[:, k] = lookup[np.minimum(correct_counts[:, k], len(lookup) - 1)]
+    build = _vectorized_jlpt(answer_key, sections, scaled_sums, scaled_sums.sum(axis=1))
+
+    def scaled(i):
+        result = build(i)
+        result["scaled"] = True
+        result["raw_total_score"] = float(totals[i])
+        result["scale_id"] = scale.scale_id
+        result["scale_calibrated_at"] = scale.calibrated_at
+        return result
+    return scaled
+
+
+def regrade_exam_room(exam_assignment):
+    """
+    Re-grade every GRADED submission of the room against the current answer key
+    (and the room's frozen IRT scale, so a regrade alone never moves results).
+    Returns {"regraded": n, "changed": n_score_changed, "passed": n_passed}.
+    """
+    mock_test = exam_assignment.mock_test
+    submissions = list(
+        Submission.objects.filter(
+            exam_assignment=exam_assignment, status=Submission.Status.GRADED,
+        ).select_related("payload").only(
+            "id", "score", "snapshot_ref", "payload_archive", "payload__answers", "payload__answers_packed",
+        )
+    )
+    if not submissions or not mock_test:
+        return {"regraded": 0, "changed": 0, "passed": 0}
+    answer_key = get_answer_key(mock_test)
+    snapshot_id = get_mock_test_snapshot_id(mock_test)
+    answers_list = [s.get_answers() for s in submissions]
+    # Same cutoff as irt.scale_cutoff gives each attempt of the room.
+    totals, results_list = grade_answer_matrix(answer_key, answers_list, exam_assignment.created_at)
+
+    changed = passed = 0
+    for submission, answers, total, results in zip(submissions, answers_list, totals, results_list):
+        if submission.score != total:
+            changed += 1
+        if results["jlpt_result"].get("passed"):
+            passed += 1
+        submission.score = total
+        submission.snapshot_ref_id = snapshot_id
+        submission.set_graded_payload(answers, results)
+    with transaction.atomic():
+        Submission.objects.filter(status=Submission.Status.GRADED).bulk_update(
+            submissions, ["score", "snapshot_ref"], batch_size=BULK_UPDATE_BATCH_SIZE,
+        )
+        SubmissionPayload.save_for(submissions, SubmissionPayload.GRADED_FIELDS, BULK_UPDATE_BATCH_SIZE)
+        replace_responses(answer_key, submissions, totals, answers_list)
+        schema_name = get_current_schema()
+        transaction.on_commit(lambda: invalidate_room(schema_name, exam_assignment.id))
+    return {"regraded": len(submissions), "changed": changed, "passed": passed}
+
+
+def finalize_exam_room(exam_assignment):
+    """
+    Grade all open attempts of a closed room: STARTED (with started_at, answers
+    merged with the autosave buffer) and SUBMITTED. Returns the number graded.
+    Pre-provisioned rows that were never started are left untouched.
+    """
+    mock_test = exam_assignment.mock_test
+    submissions = list(
+        Submission.objects.filter(
+            exam_assignment=exam_assignment,
+            status__in=(Submission.Status.STARTED, Submission.Status.SUBMITTED),
+            started_at__isnull=False,
+        ).select_related("payload").only("id", "user_id", "status", "completed_at", "payload__answers")
+    )
+    if not submissions or not mock_test:
+        return 0
+    buffered = get_buffered_answers_many(
+        [s.id for s in submissions if s.status == Submission.Status.STARTED]
+    )
+    answers_list = [
+        {**(s.get_payload().answers or {}), **buffered.get(str(s.id), {})} for s in submissions
+    ]
+
+    answer_key = get_answer_key(mock_test)
+    snapshot_id = get_mock_test_snapshot_id(mock_test)
+    if exam_assignment.shuffle:
+        # Open attempts hold displayed (per-student shuffled) option indices
+        answers_list = [to_canonical(s.id, answer_key, a) for s, a in zip(submissions, answers_list)]
+    # Same cutoff as irt.scale_cutoff gives each attempt of the room.
+    totals, results_list = grade_answer_matrix(answer_key, answers_list, exam_assignment.created_at)
+
+    now = timezone.now()
+    for submission, answers, total, results in zip(submissions, answers_list, totals, results_list):
+        submission.completed_at = submission.completed_at or now
+        submission.status = Submission.Status.GRADED
+        submission.score = total
+        submission.snapshot_ref_id = snapshot_id
+        submission.set_graded_payload(answers, results)
+    with transaction.atomic():
+        # Lock the attempts that are still open; one graded on its own since it was
+        # read keeps that result (its payload must not be overwritten either).
+        open_ids = set(
+            Submission.objects.select_for_update().filter(
+                id__in=[s.id for s in submissions],
+                status__in=(Submission.Status.STARTED, Submission.Status.SUBMITTED),
+            ).values_list("id", flat=True)
+        )
+        keep = [k for k, s in enumerate(submissions) if s.id in open_ids]
+        submissions = [submissions[k] for k in keep]
+        answers_list = [answers_list[k] for k in keep]
+        totals = [totals[k] for k in keep]
+        Submission.objects.bulk_update(
+            submissions,
+            ["completed_at", "status", "score", "snapshot_ref"],
+            batch_size=BULK_UPDATE_BATCH_SIZE,
+        )
+        SubmissionPayload.save_for(submissions, SubmissionPayload.GRADED_FIELDS, BULK_UPDATE_BATCH_SIZE)
+        record_responses_bulk(answer_key, submissions, totals, answers_list)
+        record_mastery_bulk(mock_test, answer_key, submissions, answers_list)
+        submission_ids = [s.id for s in submissions]
+        schema_name = get_current_schema()
+
+        def cleanup():
+            for submission_id in submission_ids:
+                discard_buffered_answers(submission_id)
+            cancel_expiry(schema_name, submission_ids)
+            invalidate_room(schema_name, exam_assignment.id)
+
+        transaction.on_commit(cleanup)
+    return len(submissions)
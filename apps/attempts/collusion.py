@@ -0,0 +1,117 @@
+# apps/attempts/collusion.py
+"""
+Answer-similarity screening for exam rooms.
+
+Two students who copied from each other share an unusual number of *identical
+wrong* answers (shared correct answers say little). For a finalized room the
+graded answers are packed into an n x q int8 matrix in answer-key order
+(-1 = unanswered), and the pairwise counts come out of a few matrix products:
+
+    same_wrong = sum over options k of  W_k @ W_k.T   (W_k: wrong and chose k)
+    both_wrong = W @ W.T                               (W: wrong, any option)
+
+which is O(k * n^2 * q) in BLAS instead of a Python loop over pairs. Every pair is
+then scored against the room's own distribution of same_wrong; pairs that are both
+far out (z >= COLLUSION_Z_THRESHOLD) and large in absolute terms
+(>= COLLUSION_MIN_SHARED_WRONG) become CollusionFlag rows for a teacher to review.
+A few hundred students take well under a second.
+"""
+import numpy as np
+from django.db import transaction
+
+from .answer_keys import get_answer_key
+from .models import CollusionFlag, Submission
+
+COLLUSION_Z_THRESHOLD = 4.0
+COLLUSION_MIN_SHARED_WRONG = 5
+# Rooms smaller than this have too few pairs for a meaningful distribution.
+COLLUSION_MIN_SUBMISSIONS = 5
+
+
+def _answer_matrix(answer_key, submissions):
+    """(n x q int8 answers, q int8 correct indices) in answer-key order; -1 = none."""
+    positions = {q.question_id: i for i, q in enumerate(answer_key.questions)}
+    matrix = np.full((len(submissions), len(positions)), -1, dtype=np.int8)
+    for row, submission in enumerate(submissions):
+        for question_id, selected in (submission.get_answers() or {}).items():
+            col = positions.get(question_id)
+            if col is not None and isinstance(selected, int) and 0 <= selected < 127:
+                matrix[row, col] = selected
+    key = np.array(
+        [q.correct_index if q.correct_index is not None else -1 for q in answer_key.questions],
+        dtype=np.int8,
+    )
+    return matrix, key
+
+
+def pair_statistics(matrix, key):
+    """(same_wrong, both_wrong) n x n int matrices for an answer matrix."""
+    # A question without a correct option cannot be answered "wrong".
+    wrong = (matrix >= 0) & (matrix != key) & (key >= 0)
+    wrong_f = wrong.astype(np.float32)
+    both_wrong = wrong_f @ wrong_f.T
+    same_wrong = np.zeros_like(both_wrong)
+    for option in np.unique(matrix[wrong]):
+        chose = (wrong & (matrix == option)).astype(np.float32)
+        same_wrong += chose @ chose.T
+    return same_wrong.astype(np.int32), both_wrong.astype(np.int32)
+
+
+def find_outlier_pairs(
+    matrix,
+    key,
+    z_threshold=COLLUSION_Z_THRESHOLD,
+    min_shared_wrong=COLLUSION_MIN_SHARED_WRONG,
+):
+    """[(i, j, shared_wrong, both_wrong, z)] for outlying pairs i < j, most extreme first."""
+    n = matrix.shape[0]
+    if n < COLLUSION_MIN_SUBMISSIONS or matrix.shape[1] == 0:
+        return []
+    same_wrong, both_wrong = pair_statistics(matrix, key)
+    upper_i, upper_j = np.triu_indices(n, k=1)
+    shared = same_wrong[upper_i, upper_j].astype(np.float64)
+    std = shared.std()
+    if std == 0:
+        return []
+    z = (shared - shared.mean()) / std
+    hits = np.nonzero((z >= z_threshold) & (shared >= min_shared_wrong))[0]
+    hits = hits[np.argsort(-z[hits])]
+    return [
+        (int(upper_i[h]), int(upper_j[h]), int(shared[h]), int(both_wrong[upper_i[h], upper_j[h]]), float(z[h]))
+        for h in hits
+    ]
+
+
+def detect_collusion(exam_assignment) -> int:
+    """
+    Screen a room's GRADED submissions and replace its PENDING flags.
+    Reviewed (dismissed/confirmed) flags are kept. Returns the number of flagged pairs.
+    """
+    mock_test = exam_assignment.mock_test
+    if mock_test is None:
+        return 0
+    submissions = list(
+        Submission.objects.filter(
+            exam_assignment=exam_assignment, status=Submission.Status.GRADED,
+        ).select_related("payload").only(
+            "id", "snapshot_ref", "payload_archive", "payload__answers", "payload__answers_packed",
+        ).order_by("id")
+    )
+    matrix, key = _answer_matrix(get_answer_key(mock_test), submissions)
+    flags = []
+    for i, j, shared_wrong, both_wrong, z_score in find_outlier_pairs(matrix, key):
+        first, second = sorted((submissions[i].id, submissions[j].id))
+        flags.append(CollusionFlag(
+            exam_assignment_id=exam_assignment.id,
+            submission_a_id=first,
+            submission_b_id=second,
+            shared_wrong=shared_wrong,
+            both_wrong=both_wrong,
+            z_score=round(z_score, 2),
+        ))
+    with transaction.atomic():
+        CollusionFlag.objects.filter(
+            exam_assignment_id=exam_assignment.id, status=CollusionFlag.ReviewStatus.PENDING,
+        ).delete()
+        CollusionFlag.objects.bulk_create(flags, ignore_conflicts=True)
+    return len(flags)
@@ -0,0 +1,232 @@
+# apps/attempts/encoding.py
+"""
+Compact storage for graded MockTest submissions.
+
+With ATTEMPTS_COMPACT_STORAGE enabled, grading stores a MockTest submission's answers
+and results as bytes instead of UUID-keyed JSON:
+
+- answers_packed: one byte per question of the snapshot, in paper order
+  (selected option index, 0xFF = unanswered).
+- results_packed: format byte, section count and section scores (uint16, section order),
+  followed by a correctness bitset over the same question order.
+
+Everything else in results (section names, max scores, per-question dicts, the JLPT
+verdict) is rebuilt from the referenced TestSnapshot. Snapshots are content-addressed
+and never change, so their layout is cached in-process by snapshot id.
+
+A row is packed only when decoding reproduces the JSON exactly; quizzes, answers to
+questions missing from the snapshot and out-of-range indices stay JSON.
+Submission.get_answers() / get_results() hide the difference from readers.
+"""
+import struct
+from decimal import Decimal
+
+from django.conf import settings
+
+from apps.core.cache_utils import LRUCache, tenant_cache_key
+from .models import TestSnapshot
+
+FORMAT_VERSION = 1
+UNANSWERED = 0xFF
+MAX_SECTION_SCORE = 0xFFFF
+_HEADER = struct.Struct("<BH")
+
+LAYOUT_CACHE_PREFIX = "attempts:snapshot_layout"
+_layout_cache = LRUCache(maxsize=getattr(settings, "SNAPSHOT_LAYOUT_LRU_SIZE", 256))
+
+
+class SnapshotLayout:
+    """
+    Question order, scores and sections of one MockTest snapshot, in the order
+    compile_answer_key produces them (sections without questions are skipped).
+    """
+    __slots__ = ("level", "question_ids", "scores", "section_of", "sections", "_position")
+
+    def __init__(self, level, question_ids, scores, section_of, sections):
+        self.level = level
+        self.question_ids = tuple(question_ids)
+        self.scores = tuple(scores)
+        # section_of[i]: index into sections of question i
+        self.section_of = tuple(section_of)
+        # sections: (section_id, name, section_type, max_score)
+        self.sections = tuple(sections)
+        self._position = {qid: i for i, qid in enumerate(self.question_ids)}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def position(self, question_id):
+        return self._position.get(question_id)
+
+
+def build_layout(data):
+    """Layout of a serialized MockTest snapshot, or None for quizzes."""
+    if data.get("resource_type") != TestSnapshot.ResourceType.MOCK_TEST:
+        return None
+    question_ids, scores, section_of, sections = [], [], [], []
+    for section in data.get("sections") or []:
+        questions = [
+            question
+            for group in section.get("question_groups") or []
+            for question in group.get("questions") or []
+        ]
+        if not questions:
+            continue
+        k = len(sections)
+        for question in questions:
+            question_ids.append(str(question["id"]))
+            scores.append(int(question["score"]))
+            section_of.append(k)
+        sections.append((
+            str(section["id"]),
+            section["name"],
+            section["section_type"],
+            sum(int(q["score"]) for q in questions),
+        ))
+    return SnapshotLayout(data.get("level"), question_ids, scores, section_of, sections)
+
+
+def get_layout(snapshot_id):
+    """Cached layout for a TestSnapshot id (None when missing or not a MockTest)."""
+    if snapshot_id is None:
+        return None
+    key = tenant_cache_key(LAYOUT_CACHE_PREFIX, snapshot_id)
+    layout = _layout_cache.get(key)
+    if layout is not None:
+        return layout
+    data = TestSnapshot.all_objects.filter(id=snapshot_id).values_list("data", flat=True).first()
+    layout = build_layout(data) if data else None
+    if layout is not None:
+        _layout_cache.set(key, layout)
+    return layout
+
+
+def encode_answers(layout, answers):
+    """bytes of option indices in layout order, or None if answers do not fit the layout."""
+    packed = bytearray([UNANSWERED]) * len(layout)
+    for question_id, selected_index in (answers or {}).items():
+        pos = layout.position(question_id)
+        if pos is None or type(selected_index) is not int or not 0 <= selected_index < UNANSWERED:
+            return None
+        packed[pos] = selected_index
+    return bytes(packed)
+
+
+def decode_answers(layout, packed):
+    return {
+        layout.question_ids[i]: selected_index
+        for i, selected_index in enumerate(bytes(packed))
+        if selected_index != UNANSWERED
+    }
+
+
+def encode_results(layout, results, packed_answers):
+    """Section scores + correctness bitset, or None if results cannot be represented."""
+    if results.get("resource_type") != "mock_test":
+        return None
+    result_sections = results.get("sections") or {}
+    if len(result_sections) != len(layout.sections):
+        return None
+    scores = []
+    for section_id, _name, _type, _max in layout.sections:
+        section = result_sections.get(section_id)
+        if section is None:
+            return None
+        score = section.get("score")
+        if score is None or score != int(score) or not 0 <= score <= MAX_SECTION_SCORE:
+            return None
+        scores.append(int(score))
+    bits = bytearray((len(layout) + 7) // 8)
+    answers = bytes(packed_answers)
+    for i, question_id in enumerate(layout.question_ids):
+        if answers[i] == UNANSWERED:
+            continue
+        section_id = layout.sections[layout.section_of[i]][0]
+        question = result_sections[section_id].get("questions", {}).get(question_id)
+        if question is None:
+            return None
+        if question.get("correct"):
+            bits[i >> 3] |= 1 << (i & 7)
+    return _HEADER.pack(FORMAT_VERSION, len(scores)) + struct.pack(f"<{len(scores)}H", *scores) + bytes(bits)
+
+
+def decode_results(layout, packed_results, packed_answers):
+    """Rebuild the GradingService._grade_mock_test results dict."""
+    from .services import GradingService
+
+    packed_results = bytes(packed_results)
+    answers = bytes(packed_answers)
+    _version, n_sections = _HEADER.unpack_from(packed_results)
+    offset = _HEADER.size
+    scores = struct.unpack_from(f"<{n_sections}H", packed_results, offset)
+    bits = packed_results[offset + 2 * n_sections:]
+
+    question_results = [{} for _ in layout.sections]
+    for i, question_id in enumerate(layout.question_ids):
+        selected_index = answers[i]
+        if selected_index == UNANSWERED:
+            continue
+        correct = bool(bits[i >> 3] & (1 << (i & 7)))
+        question_results[layout.section_of[i]][question_id] = {
+            "correct": correct,
+            "score": float(layout.scores[i] if correct else 0),
+            "selected_index": selected_index,
+        }
+
+    total_score = Decimal(sum(scores))
+    section_scores = {
+        section_id: {"section_type": section_type, "score": score}
+        for (section_id, _name, section_type, _max), score in zip(layout.sections, scores)
+    }
+    return {
+        "total_score": float(total_score),
+        "sections": {
+            section_id: {
+                "section_id": section_id,
+                "section_name": name,
+                "section_type": section_type,
+                "score": float(score),
+                "max_score": float(max_score),
+                "questions": question_results[k],
+            }
+            for k, ((section_id, name, section_type, max_score), score)
+            in enumerate(zip(layout.sections, scores))
+        },
+        "jlpt_result": GradingService._calculate_jlpt_result(layout.level, total_score, section_scores),
+        "resource_type": "mock_test",
+    }
+
+
+def pack(snapshot_id, answers, results):
+    """
+    (answers_packed, results_packed) for a graded submission, or None to keep JSON
+    (setting off, no MockTest snapshot, or a lossy round trip).
+    """
+    if not getattr(settings, "ATTEMPTS_COMPACT_STORAGE", False):
+        return None
+    layout = get_layout(snapshot_id)
+    if layout is None:
+        return None
+    packed_answers = encode_answers(layout, answers)
+    if packed_answers is None:
+        return None
+    packed_results = encode_results(layout, results, packed_answers)
+    if packed_results is None:
+        return None
+    if (
+        decode_answers(layout, packed_answers) != answers
+        or decode_results(layout, packed_results, packed_answers) != results
+    ):
+        return None
+    return packed_answers, packed_results
+
+
+def unpack_answers(submission):
+    return decode_answers(get_layout(submission.snapshot_ref_id), submission.get_payload().answers_packed)
+
+
+def unpack_results(submission):
+    payload = submission.get_payload()
+    return decode_results(
+        get_layout(submission.snapshot_ref_id), payload.results_packed, payload.answers_packed,
+    )
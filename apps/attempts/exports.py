@@ -0,0 +1,202 @@
+# apps/attempts/exports.py
+"""
+Streaming gradebook export for an exam room or a homework assignment.
+
+Rows are read in keyset-paginated chunks of EXPORT_CHUNK_SIZE (one query each);
+for each chunk the student names are resolved with one public-schema query and the
+rows are written out before the next chunk is read, so memory stays constant
+whatever the room size.
+
+CSV is streamed straight to the client (StreamingHttpResponse). XLSX needs
+openpyxl (optional); its write-only workbook spools rows to a temporary file that
+is then streamed. The response body is produced after the view has returned, so
+the generator re-enters the tenant schema itself.
+"""
+import csv
+import tempfile
+
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+
+from apps.core.serializers import UserSummarySerializer
+from apps.core.tenant_utils import schema_context, with_public_schema
+from .answer_keys import get_answer_key
+from .models import Submission
+from .services import GradingService
+
+try:
+    from openpyxl import Workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMATS = ("csv", "xlsx")
+
+
+class _Echo:
+    """File-like object whose write() returns the value (csv.writer -> generator)."""
+    def write(self, value):
+        return value
+
+
+def _mock_tests(kind, assignment):
+    if kind == "exam":
+        return [assignment.mock_test] if assignment.mock_test else []
+    return list(assignment.mock_tests.all())
+
+
+def _columns(kind, assignment):
+    """(section names, JLPT scoring sections) that become per-row score columns."""
+    section_names, categories = [], []
+    for mock_test in _mock_tests(kind, assignment):
+        for section in get_answer_key(mock_test).sections:
+            if section.name not in section_names:
+                section_names.append(section.name)
+        requirements = GradingService.JLPT_PASS_REQUIREMENTS.get(mock_test.level) or {}
+        for category in requirements.get("sections", {}):
+            if category not in categories:
+                categories.append(category)
+    return section_names, categories
+
+
+def _header(kind, section_names, categories):
+    header = ["student_id", "student_name", "email"]
+    if kind == "homework":
+        header += ["item_type", "item_title"]
+    header += ["status", "started_at", "completed_at", "time_taken_seconds", "score", "percentage", "scaled_score"]
+    header += [f"section: {name}" for name in section_names]
+    for category in categories:
+        header += [f"{category}_score", f"{category}_passed"]
+    header += ["total_passed", "passed"]
+    return header
+
+
+def _blank_if_none(value):
+    return "" if value is None else value
+
+
+def _row(kind, submission, student, section_names, categories):
+    results = submission.get_results() or {}
+    jlpt = results.get("jlpt_result") or {}
+    section_results = jlpt.get("section_results") or {}
+    scores = {
+        section.get("section_name"): section.get("score")
+        for section in (results.get("sections") or {}).values()
+    }
+    time_taken = None
+    if submission.started_at and submission.completed_at:
+        time_taken = max(0, int((submission.completed_at - submission.started_at).total_seconds()))
+
+    row = [submission.user_id, student["full_name"] if student else "", student["email"] if student else ""]
+    if kind == "homework":
+        resource = submission.mock_test or submission.quiz
+        row += [submission.resource_type or "", resource.title if resource else ""]
+    row += [
+        submission.status,
+        submission.started_at.isoformat() if submission.started_at else "",
+        submission.completed_at.isoformat() if submission.completed_at else "",
+        time_taken if time_taken is not None else "",
+        float(submission.score) if submission.score is not None else "",
+        _blank_if_none(GradingService.results_percentage(results)),
+        # Total the pass decision used when the test is IRT-scaled (score stays the raw sum).
+        results.get("scaled_total_score", ""),
+    ]
+    row += [scores.get(name, "") for name in section_names]
+    for category in categories:
+        data = section_results.get(category) or {}
+        row += [data.get("score", ""), data.get("passed", "")]
+    row += [jlpt.get("total_passed", ""), jlpt.get("passed", "")]
+    return row
+
+
+def _submissions(kind, assignment):
+    queryset = Submission.objects.exclude(
+        # Pre-provisioned at room open but never started by the student
+        status=Submission.Status.STARTED, started_at__isnull=True,
+    ).select_related("payload").defer(
+        "payload__answers", "payload__snapshot",
+    ).order_by("user_id", "created_at", "id")
+    if kind == "exam":
+        return queryset.filter(exam_assignment=assignment).select_related("exam_assignment__mock_test")
+    return queryset.filter(homework_assignment=assignment).select_related("mock_test", "quiz")
+
+
+def _chunks(queryset):
+    """
+    EXPORT_CHUNK_SIZE submissions at a time, by keyset on (user_id, created_at, id).
+    Not QuerySet.iterator(): the stream runs outside a transaction, and its
+    server-side cursor does not survive PgBouncer transaction pooling.
+    """
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            user_id, created_at, pk = last
+            page = page.filter(
+                Q(user_id__gt=user_id)
+                | Q(user_id=user_id, created_at__gt=created_at)
+                | Q(user_id=user_id, created_at=created_at, id__gt=pk)
+            )
+        chunk = list(page[:EXPORT_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last = (chunk[-1].user_id, chunk[-1].created_at, chunk[-1].id)
+
+
+def iter_rows(kind, assignment):
+    """Header, then one row per submission, resolving names one chunk at a time."""
+    from apps.authentication.models import User
+
+    section_names, categories = _columns(kind, assignment)
+    yield _header(kind, section_names, categories)
+
+    def flush(chunk):
+        user_ids = {s.user_id for s in chunk}
+        students = with_public_schema(
+            lambda: {
+                u.id: UserSummarySerializer.from_user(u)
+                for u in User.objects.filter(id__in=user_ids).only("id", "first_name", "last_name", "email")
+            }
+        )
+        return [_row(kind, s, students.get(s.user_id), section_names, categories) for s in chunk]
+
+    for chunk in _chunks(_submissions(kind, assignment)):
+        yield from flush(chunk)
+
+
+def _filename(kind, assignment, file_format):
+    return f"{kind}-{assignment.id}-results.{file_format}"
+
+
+def csv_response(schema_name, kind, assignment):
+    def stream():
+        writer = csv.writer(_Echo())
+        with schema_context(schema_name):
+            # UTF-8 BOM so spreadsheet apps detect the encoding (Japanese titles).
+            yield "\ufeff"
+            for row in iter_rows(kind, assignment):
+                yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{_filename(kind, assignment, "csv")}"'
+    return response
+
+
+def xlsx_response(schema_name, kind, assignment):
+    """Write-only workbook spooled to a temp file, then streamed (requires openpyxl)."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title="Results")
+    with schema_context(schema_name):
+        for row in iter_rows(kind, assignment):
+            sheet.append(row)
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=_filename(kind, assignment, "xlsx"),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
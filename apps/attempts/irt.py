@@ -0,0 +1,281 @@
+# apps/attempts/irt.py
+"""
+2PL IRT calibration and scaled section scores for MockTests.
+
+Calibration (Celery batch job, calibrate_score_scales task): the latest graded
+responses of a published test (QuestionResponse rows) form a students × questions
+correctness matrix. Item parameters are fitted by marginal maximum likelihood with
+EM over a fixed quadrature grid of ability values:
+
+    E-step  posterior over the grid for every student: one (n × q) @ (q × K) product
+    M-step  two Newton steps per item on the expected counts, all items at once
+            (2 × 2 systems solved in closed form), with a weak ridge towards a = 1
+
+Scaling: for each section, the test characteristic curve sum_i P_i(theta) is inverted
+at every possible number of correct answers 0..n, and the resulting ability is mapped
+linearly onto 0..section max score. Every fit adds a ScoreScale row for the
+(MockTest, content_version); earlier rows are kept.
+
+Scales are frozen per room: a submission is graded on the latest fit calibrated
+before its cutoff (scale_cutoff: creation of its exam room or homework
+assignment, else its start), so identical answer sheets of one room always get
+the same result, whenever they are graded or re-graded. A fit applies only to
+rooms created after it. Scaled results record scale_id and scale_calibrated_at.
+"""
+from typing import NamedTuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from apps.core.cache_utils import tenant_cache_key
+from apps.mock_tests.models import MockTest
+from .answer_keys import get_answer_key
+from .models import ItemCalibration, ItemStatistic, QuestionResponse, ScoreScale, Submission
+
+IRT_MIN_SUBMISSIONS = 200
+IRT_MAX_SUBMISSIONS = 5000
+# Submissions whose responses are read per query.
+IRT_RESPONSE_CHUNK = 500
+# Recalibrate once the response count has grown by this factor.
+IRT_RECALIBRATE_GROWTH = 1.25
+IRT_EM_ITERATIONS = 50
+IRT_NEWTON_STEPS = 2
+IRT_TOLERANCE = 1e-4
+
+QUADRATURE = np.linspace(-4.0, 4.0, 41)
+_LOG_PRIOR = -0.5 * QUADRATURE ** 2 - np.log(np.exp(-0.5 * QUADRATURE ** 2).sum())
+# Ability range mapped onto 0..max score of a section.
+SCALE_THETA_RANGE = (-3.0, 3.0)
+_TCC_GRID = np.linspace(-4.0, 4.0, 801)
+
+_DISCRIMINATION_BOUNDS = (0.2, 4.0)
+_INTERCEPT_BOUND = 8.0
+_DISCRIMINATION_RIDGE = 0.5
+_INTERCEPT_RIDGE = 0.01
+
+SCORE_SCALE_CACHE_PREFIX = "attempts:score_scale:v2"
+SCORE_SCALE_CACHE_TTL = 60 * 60 * 24
+
+
+def _log_sigmoid(z):
+    return -np.logaddexp(0.0, -z)
+
+
+def fit_2pl(correct, observed, iterations=IRT_EM_ITERATIONS):
+    """
+    Fit 2PL parameters to an n × q matrix of 0/1 answers.
+    observed marks answered cells (correct is 0 elsewhere). Returns (a, b) arrays.
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    observed = np.asarray(observed, dtype=np.float64)
+    wrong = observed - correct
+    attempts = np.maximum(observed.sum(axis=0), 1.0)
+    p_value = np.clip(correct.sum(axis=0) / attempts, 0.02, 0.98)
+    # Slope-intercept form: logit P = a * theta + c, difficulty b = -c / a
+    a = np.ones(correct.shape[1])
+    c = np.log(p_value / (1.0 - p_value))
+    theta = QUADRATURE[:, None]
+
+    for _ in range(iterations):
+        z = theta * a + c                                   # K × q
+        log_likelihood = correct @ _log_sigmoid(z).T + wrong @ _log_sigmoid(-z).T + _LOG_PRIOR
+        log_likelihood -= log_likelihood.max(axis=1, keepdims=True)
+        posterior = np.exp(log_likelihood)
+        posterior /= posterior.sum(axis=1, keepdims=True)  # n × K
+        expected_correct = posterior.T @ correct            # K × q
+        expected_attempts = posterior.T @ observed
+
+        previous_a, previous_c = a, c
+        for _ in range(IRT_NEWTON_STEPS):
+            p = 1.0 / (1.0 + np.exp(-(theta * a + c)))
+            residual = expected_correct - expected_attempts * p
+            information = expected_attempts * p * (1.0 - p)
+            grad_a = (residual * theta).sum(axis=0) - _DISCRIMINATION_RIDGE * (a - 1.0)
+            grad_c = residual.sum(axis=0) - _INTERCEPT_RIDGE * c
+            h_aa = (information * theta ** 2).sum(axis=0) + _DISCRIMINATION_RIDGE
+            h_ac = (information * theta).sum(axis=0)
+            h_cc = information.sum(axis=0) + _INTERCEPT_RIDGE
+            det = h_aa * h_cc - h_ac ** 2
+            a = np.clip(a + (h_cc * grad_a - h_ac * grad_c) / det, *_DISCRIMINATION_BOUNDS)
+            c = np.clip(c + (h_aa * grad_c - h_ac * grad_a) / det, -_INTERCEPT_BOUND, _INTERCEPT_BOUND)
+        if max(np.abs(a - previous_a).max(initial=0), np.abs(c - previous_c).max(initial=0)) < IRT_TOLERANCE:
+            break
+    return a, -c / a
+
+
+def scale_table(a, b, max_score):
+    """Scaled score (int, 0..max_score) for 0..len(a) correct answers."""
+    if not len(a):
+        return [0]
+    tcc = (1.0 / (1.0 + np.exp(-a * (_TCC_GRID[:, None] - b)))).sum(axis=1)
+    abilities = np.interp(np.arange(len(a) + 1), tcc, _TCC_GRID)
+    abilities[0], abilities[-1] = _TCC_GRID[0], _TCC_GRID[-1]
+    low, high = SCALE_THETA_RANGE
+    scaled = np.clip((abilities - low) / (high - low), 0.0, 1.0) * max_score
+    return [int(v) for v in np.rint(scaled)]
+
+
+def _response_matrix(mock_test, answer_key):
+    """(correct, observed, n_submissions) over the latest graded submissions of the test."""
+    submission_ids = list(
+        Submission.objects.filter(
+            Q(mock_test_id=mock_test.id) | Q(exam_assignment__mock_test_id=mock_test.id),
+            status=Submission.Status.GRADED,
+        ).order_by("-completed_at").values_list("id", flat=True)[:IRT_MAX_SUBMISSIONS]
+    )
+    column = {q.question_id: j for j, q in enumerate(answer_key.questions)}
+    row = {submission_id: i for i, submission_id in enumerate(submission_ids)}
+    correct = np.zeros((len(submission_ids), len(column)), dtype=np.float64)
+    observed = np.zeros_like(correct)
+    # Read in slices of submissions, not with QuerySet.iterator(): its server-side
+    # cursor does not survive PgBouncer transaction pooling.
+    for start in range(0, len(submission_ids), IRT_RESPONSE_CHUNK):
+        responses = QuestionResponse.objects.filter(
+            mock_test_id=mock_test.id, submission_id__in=submission_ids[start:start + IRT_RESPONSE_CHUNK],
+        ).values_list("submission_id", "question_id", "is_correct")
+        for submission_id, question_id, is_correct in responses:
+            j = column.get(str(question_id))
+            if j is not None:
+                i = row[submission_id]
+                # Unanswered counts as wrong, as in grading.
+                observed[i, j] = 1.0
+                correct[i, j] = 1.0 if is_correct else 0.0
+    return correct, observed, len(submission_ids)
+
+
+def _response_count(mock_test_id):
+    return ItemStatistic.objects.filter(mock_test_id=mock_test_id).aggregate(n=Max("n"))["n"] or 0
+
+
+def calibrate_mock_test(mock_test) -> bool:
+    """Fit item parameters and store the score scale of the test's current version."""
+    response_count = _response_count(mock_test.id)
+    answer_key = get_answer_key(mock_test)
+    correct, observed, n_submissions = _response_matrix(mock_test, answer_key)
+    if n_submissions < IRT_MIN_SUBMISSIONS or not len(answer_key):
+        return False
+    a, b = fit_2pl(correct, observed)
+
+    now = timezone.now()
+    counts = observed.sum(axis=0)
+    calibrations = [
+        ItemCalibration(
+            mock_test_id=mock_test.id, question_id=q.question_id,
+            discrimination=float(a[j]), difficulty=float(b[j]), n=int(counts[j]), calibrated_at=now,
+        )
+        for j, q in enumerate(answer_key.questions)
+    ]
+    tables = {}
+    for section in answer_key.sections:
+        columns = [j for j, q in enumerate(answer_key.questions) if q.section_id == section.section_id]
+        tables[section.section_id] = scale_table(a[columns], b[columns], section.max_score)
+
+    with transaction.atomic():
+        ItemCalibration.objects.filter(mock_test_id=mock_test.id).delete()
+        ItemCalibration.objects.bulk_create(calibrations)
+        # A new row, not an update: rooms created before now keep grading on the previous fit.
+        ScoreScale.objects.create(
+            mock_test_id=mock_test.id,
+            content_version=mock_test.content_version,
+            tables=tables,
+            submission_count=n_submissions,
+            response_count=response_count,
+            calibrated_at=now,
+        )
+    cache.delete(_score_scale_cache_key(mock_test.id, mock_test.content_version))
+    return True
+
+
+def mock_tests_due_for_calibration():
+    """Published tests with enough new responses since their scale was last fitted."""
+    response_counts = dict(
+        ItemStatistic.objects.values("mock_test_id").annotate(responses=Max("n"))
+        .filter(responses__gte=IRT_MIN_SUBMISSIONS).values_list("mock_test_id", "responses")
+    )
+    if not response_counts:
+        return []
+    mock_tests = MockTest.objects.filter(
+        id__in=response_counts, status=MockTest.Status.PUBLISHED,
+    ).only("id", "level", "status", "content_version")
+    fitted = {
+        (mock_test_id, version): count
+        for mock_test_id, version, count in ScoreScale.objects.filter(
+            mock_test_id__in=response_counts,
+        ).values("mock_test_id", "content_version").annotate(
+            count=Max("response_count"),
+        ).values_list("mock_test_id", "content_version", "count")
+    }
+    due = []
+    for mock_test in mock_tests:
+        count = fitted.get((mock_test.id, mock_test.content_version))
+        if count is None or response_counts[mock_test.id] >= count * IRT_RECALIBRATE_GROWTH:
+            due.append(mock_test)
+    return due
+
+
+def _score_scale_cache_key(mock_test_id, version):
+    return tenant_cache_key(SCORE_SCALE_CACHE_PREFIX, mock_test_id, f"v{version}")
+
+
+class Scale(NamedTuple):
+    scale_id: int
+    calibrated_at: str     # ISO timestamp, recorded in jlpt_result
+    tables: dict           # {section_id: [scaled score for 0..n correct]}
+
+
+def scale_cutoff(submission):
+    """
+    Time that selects the scale for a submission: creation of its exam room or
+    homework assignment (one table per room), else the attempt's start.
+    """
+    assignment = submission.exam_assignment or submission.homework_assignment
+    if assignment is not None:
+        return assignment.created_at
+    return submission.started_at
+
+
+def _scale_history(mock_test_id, version):
+    """[(calibrated_at epoch seconds, Scale)] of every fit of the version, oldest first."""
+    key = _score_scale_cache_key(mock_test_id, version)
+    history = cache.get(key)
+    if history is None:
+        history = [
+            (calibrated_at.timestamp(), Scale(scale_id, calibrated_at.isoformat(), tables))
+            for scale_id, calibrated_at, tables in ScoreScale.objects.filter(
+                mock_test_id=mock_test_id, content_version=version,
+            ).order_by("calibrated_at", "id").values_list("id", "calibrated_at", "tables")
+        ]
+        cache.set(key, history, SCORE_SCALE_CACHE_TTL)
+    return history
+
+
+def get_score_scale(answer_key, as_of=None):
+    """
+    Scale in force at `as_of` (see scale_cutoff) for the answer key's (MockTest,
+    version): the latest fit calibrated at or before it, or the latest fit when
+    as_of is None. None when there is no such fit: grading stays raw.
+    One cache read per grading; absence is cached too.
+    """
+    history = _scale_history(answer_key.mock_test_id, answer_key.version)
+    cutoff = as_of.timestamp() if as_of is not None else None
+    chosen = None
+    for calibrated_at, scale in history:
+        if cutoff is not None and calibrated_at > cutoff:
+            break
+        chosen = scale
+    return chosen
+
+
+def scaled_section_scores(tables, section_scores, correct_counts):
+    """section_scores ({section_id: {section_type, score}}) with scores replaced by the scale."""
+    scaled = {}
+    for section_id, data in section_scores.items():
+        table = tables.get(section_id)
+        score = data["score"]
+        if table:
+            score = table[min(correct_counts.get(section_id, 0), len(table) - 1)]
+        scaled[section_id] = {"section_type": data["section_type"], "score": score}
+    return scaled
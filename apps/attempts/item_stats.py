@@ -0,0 +1,163 @@
+# apps/attempts/item_stats.py
+"""
+Question-level response facts and incremental item statistics.
+
+Grading writes one QuestionResponse per question of the paper with bulk_create.
+The aggregate_item_statistics task folds not-yet-aggregated rows into ItemStatistic
+with a few GROUP BY queries (claimed with FOR UPDATE SKIP LOCKED), so item quality
+for a MockTest is afterwards a single indexed read.
+
+A regrade changes correctness retroactively; it replaces the room's responses and
+resets the test's statistics, which are then rebuilt from all of its responses.
+"""
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .answer_keys import get_answer_key
+from .models import ItemStatistic, QuestionResponse
+
+RESPONSE_BATCH_SIZE = 2000
+AGGREGATE_BATCH_SIZE = 20000
+
+
+def _response_rows(submission_id, answer_key, answers, total_score):
+    answers = answers or {}
+    total = int(total_score or 0)
+    rows = []
+    for q in answer_key.questions:
+        selected = answers.get(q.question_id)
+        rows.append(QuestionResponse(
+            submission_id=submission_id,
+            mock_test_id=answer_key.mock_test_id,
+            question_id=q.question_id,
+            selected_index=selected,
+            is_correct=selected is not None and selected == q.correct_index,
+            total_score=total,
+        ))
+    return rows
+
+
+def record_responses(submission, answers, total_score):
+    """Insert the response facts of one graded MockTest submission (idempotent)."""
+    mock_test = submission.mock_test or (
+        submission.exam_assignment.mock_test if submission.exam_assignment_id else None
+    )
+    if mock_test is None:
+        return
+    QuestionResponse.objects.bulk_create(
+        _response_rows(submission.id, get_answer_key(mock_test), answers, total_score),
+        batch_size=RESPONSE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def record_responses_bulk(answer_key, submissions, totals, answers_list):
+    """Insert response facts for many submissions graded against one key."""
+    rows = []
+    for submission, total, answers in zip(submissions, totals, answers_list):
+        rows.extend(_response_rows(submission.id, answer_key, answers, total))
+    QuestionResponse.objects.bulk_create(rows, batch_size=RESPONSE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def replace_responses(answer_key, submissions, totals, answers_list):
+    """
+    Regrade: swap the submissions' response facts and reset the test's statistics so
+    the aggregation task rebuilds them from every response of the test.
+    """
+    with transaction.atomic():
+        QuestionResponse.objects.filter(submission__in=[s.id for s in submissions]).delete()
+        record_responses_bulk(answer_key, submissions, totals, answers_list)
+        ItemStatistic.objects.filter(mock_test_id=answer_key.mock_test_id).delete()
+        QuestionResponse.objects.filter(
+            mock_test_id=answer_key.mock_test_id, aggregated=True,
+        ).update(aggregated=False)
+
+
+def aggregate_pending(batch_size=AGGREGATE_BATCH_SIZE) -> int:
+    """Fold up to batch_size unaggregated responses into ItemStatistic. Returns rows folded."""
+    with transaction.atomic():
+        ids = list(
+            QuestionResponse.objects.filter(aggregated=False)
+            .order_by("id")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        pending = QuestionResponse.objects.filter(id__in=ids)
+        total = Cast("total_score", BigIntegerField())
+        sums = pending.values("mock_test_id", "question_id").annotate(
+            n=Count("id"),
+            n_correct=Count("id", filter=Q(is_correct=True)),
+            sum_total=Sum(total),
+            sum_total_sq=Sum(total * total),
+            sum_total_correct=Sum(total, filter=Q(is_correct=True)),
+        )
+        option_counts = {}
+        for row in (
+            pending.filter(selected_index__isnull=False)
+            .values("question_id", "selected_index")
+            .annotate(count=Count("id"))
+        ):
+            option_counts.setdefault(row["question_id"], {})[str(row["selected_index"])] = row["count"]
+
+        sums = list(sums)
+        existing = {
+            stat.question_id: stat
+            for stat in ItemStatistic.objects.select_for_update().filter(
+                question_id__in=[row["question_id"] for row in sums]
+            )
+        }
+        to_create, to_update = [], []
+        now = timezone.now()
+        for row in sums:
+            stat = existing.get(row["question_id"])
+            if stat is None:
+                stat = ItemStatistic(mock_test_id=row["mock_test_id"], question_id=row["question_id"])
+                to_create.append(stat)
+            else:
+                to_update.append(stat)
+            stat.n += row["n"]
+            stat.n_correct += row["n_correct"]
+            stat.sum_total += row["sum_total"] or 0
+            stat.sum_total_sq += row["sum_total_sq"] or 0
+            stat.sum_total_correct += row["sum_total_correct"] or 0
+            counts = dict(stat.option_counts or {})
+            for option, count in option_counts.get(row["question_id"], {}).items():
+                counts[option] = counts.get(option, 0) + count
+            stat.option_counts = counts
+            stat.updated_at = now
+        ItemStatistic.objects.bulk_create(to_create)
+        ItemStatistic.objects.bulk_update(
+            to_update,
+            ["n", "n_correct", "sum_total", "sum_total_sq", "sum_total_correct", "option_counts", "updated_at"],
+        )
+        pending.update(aggregated=True)
+        return len(ids)
+
+
+def get_item_statistics(mock_test):
+    """Item statistics of mock_test in paper order (one indexed query + cached key)."""
+    stats = {
+        str(stat.question_id): stat
+        for stat in ItemStatistic.objects.filter(mock_test_id=mock_test.id)
+    }
+    items = []
+    for q in get_answer_key(mock_test).questions:
+        stat = stats.get(q.question_id)
+        if stat is None:
+            continue
+        p_value = stat.p_value
+        point_biserial = stat.point_biserial
+        items.append({
+            "question_id": q.question_id,
+            "section_type": q.section_type,
+            "responses": stat.n,
+            "p_value": round(p_value, 4) if p_value is not None else None,
+            "point_biserial": round(point_biserial, 4) if point_biserial is not None else None,
+            "option_frequencies": {k: round(v, 4) for k, v in stat.option_frequencies().items()},
+            "correct_index": q.correct_index,
+        })
+    return items
@@ -0,0 +1,251 @@
+# apps/attempts/leaderboard.py
+"""
+Exam-room leaderboard: rank, percentile and score distribution.
+
+Per room (ExamAssignment) Redis holds:
+- a sorted set {user_id: score} of graded submissions, so a student's rank is two
+  ZCOUNTs (O(log n)) and the top of the room is one ZREVRANGE;
+- a hash of histogram buckets ("total:80", "listening:15", ...) plus running
+  count/sum, and each member's bucket fields so a re-grade moves the student
+  between buckets instead of counting them twice.
+
+Grading records each result after commit. The structures are built lazily from
+Postgres the first time a room is read (and again after invalidate_room, which
+regrade and room finalization call), so a missing or evicted key only costs one
+rebuild. Without Redis, the same answers are computed from the submissions table.
+"""
+import logging
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from apps.core.cache_utils import get_redis_client
+from apps.core.tenant_utils import get_current_schema
+from .models import Submission
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY_PREFIX = "attempts:leaderboard"
+LEADERBOARD_TTL = getattr(settings, "LEADERBOARD_TTL", 60 * 60 * 24 * 7)
+TOTAL_BUCKET_WIDTH = 10
+SECTION_BUCKET_WIDTH = 5
+TOTAL = "total"
+
+
+def _keys(schema_name, exam_assignment_id):
+    base = f"{LEADERBOARD_KEY_PREFIX}:{schema_name}:{exam_assignment_id}"
+    return {
+        "ranking": f"{base}:ranking",
+        "histogram": f"{base}:histogram",
+        "members": f"{base}:members",
+    }
+
+
+def _bucket_fields(score, section_scores):
+    """Histogram fields for one result: total bucket plus one per JLPT scoring section."""
+    fields = [f"{TOTAL}:{int(score // TOTAL_BUCKET_WIDTH) * TOTAL_BUCKET_WIDTH}"]
+    for section, section_score in sorted(section_scores.items()):
+        bucket = int(section_score // SECTION_BUCKET_WIDTH) * SECTION_BUCKET_WIDTH
+        fields.append(f"{section}:{bucket}")
+    return fields
+
+
+def _section_scores(results):
+    section_results = ((results or {}).get("jlpt_result") or {}).get("section_results") or {}
+    return {
+        section: float(data["score"])
+        for section, data in section_results.items()
+        if isinstance(data, dict) and data.get("score") is not None
+    }
+
+
+def _room_rows(exam_assignment_id):
+    """(user_id, score, section_scores) for every graded submission of the room."""
+    submissions = Submission.objects.filter(
+        exam_assignment_id=exam_assignment_id, status=Submission.Status.GRADED, score__isnull=False,
+    ).select_related("payload").only(
+        "id", "user_id", "score", "snapshot_ref", "payload_archive",
+        "payload__results", "payload__results_packed", "payload__answers_packed",
+    )
+    return [
+        (s.user_id, float(s.score), _section_scores(s.get_results()))
+        for s in submissions
+    ]
+
+
+def _rebuild(client, keys, exam_assignment_id):
+    rows = _room_rows(exam_assignment_id)
+    histogram = {}
+    members = {}
+    ranking = {}
+    total_sum = 0.0
+    for user_id, score, section_scores in rows:
+        fields = _bucket_fields(score, section_scores)
+        for field in fields:
+            histogram[field] = histogram.get(field, 0) + 1
+        members[str(user_id)] = ",".join(fields)
+        ranking[str(user_id)] = score
+        total_sum += score
+    histogram["count"] = len(rows)
+    histogram["sum"] = total_sum
+    # Built into fresh keys and swapped in atomically, so readers never see a half-built room.
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(*keys.values())
+    if ranking:
+        pipe.zadd(keys["ranking"], ranking)
+        pipe.hset(keys["members"], mapping=members)
+    pipe.hset(keys["histogram"], mapping=histogram)
+    for key in keys.values():
+        pipe.expire(key, LEADERBOARD_TTL)
+    pipe.execute()
+
+
+def _ready_keys(client, exam_assignment_id):
+    keys = _keys(get_current_schema(), exam_assignment_id)
+    if not client.exists(keys["histogram"]):
+        _rebuild(client, keys, exam_assignment_id)
+    return keys
+
+
+def record_result(schema_name, exam_assignment_id, user_id, score, results) -> None:
+    """Add or move one graded result (call after commit). Skipped until the room is built."""
+    client = get_redis_client()
+    if client is None or score is None:
+        return
+    keys = _keys(schema_name, exam_assignment_id)
+    member = str(user_id)
+    score = float(score)
+    fields = _bucket_fields(score, _section_scores(results))
+    try:
+        if not client.exists(keys["histogram"]):
+            return
+        previous = client.hget(keys["members"], member)
+        previous_score = client.zscore(keys["ranking"], member)
+        pipe = client.pipeline(transaction=True)
+        if previous:
+            previous = previous.decode() if isinstance(previous, bytes) else previous
+            for field in previous.split(","):
+                pipe.hincrby(keys["histogram"], field, -1)
+        for field in fields:
+            pipe.hincrby(keys["histogram"], field, 1)
+        if previous_score is None:
+            pipe.hincrby(keys["histogram"], "count", 1)
+            pipe.hincrbyfloat(keys["histogram"], "sum", score)
+        else:
+            pipe.hincrbyfloat(keys["histogram"], "sum", score - float(previous_score))
+        pipe.hset(keys["members"], member, ",".join(fields))
+        pipe.zadd(keys["ranking"], {member: score})
+        pipe.execute()
+    except Exception:
+        # Best effort: drop the room so the next read rebuilds it from Postgres.
+        logger.warning("Could not record leaderboard entry for room %s", exam_assignment_id, exc_info=True)
+        invalidate_room(schema_name, exam_assignment_id)
+
+
+def invalidate_room(schema_name, exam_assignment_id) -> None:
+    """Forget a room's structures (after regrade / bulk finalization); rebuilt on next read."""
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.delete(*_keys(schema_name, exam_assignment_id).values())
+    except Exception:
+        logger.warning("Could not invalidate leaderboard for room %s", exam_assignment_id, exc_info=True)
+
+
+def _percentile(below, equal, out_of):
+    return round((below + equal / 2) / out_of * 100, 1) if out_of else None
+
+
+def get_ranking(exam_assignment_id, user_id, score):
+    """{"rank", "out_of", "percentile"} for one graded submission (competition ranking)."""
+    if score is None:
+        return None
+    score = float(score)
+    client = get_redis_client()
+    if client is None:
+        counts = Submission.objects.filter(
+            exam_assignment_id=exam_assignment_id, status=Submission.Status.GRADED, score__isnull=False,
+        ).aggregate(
+            out_of=Count("id"),
+            higher=Count("id", filter=Q(score__gt=Decimal(str(score)))),
+            equal=Count("id", filter=Q(score=Decimal(str(score)))),
+        )
+        out_of, higher, equal = counts["out_of"], counts["higher"], counts["equal"]
+    else:
+        keys = _ready_keys(client, exam_assignment_id)
+        pipe = client.pipeline()
+        pipe.zcard(keys["ranking"])
+        pipe.zcount(keys["ranking"], f"({score}", "+inf")
+        pipe.zcount(keys["ranking"], score, score)
+        out_of, higher, equal = pipe.execute()
+    if not out_of:
+        return None
+    return {
+        "rank": higher + 1,
+        "out_of": out_of,
+        "percentile": _percentile(out_of - higher - equal, equal, out_of),
+    }
+
+
+def _distribution(histogram):
+    """{"total": [{"from", "to", "count"}...], "<section>": [...]} from bucket counts."""
+    distribution = {}
+    for field, count in histogram.items():
+        if ":" not in field or not count:
+            continue
+        name, _, bucket = field.rpartition(":")
+        width = TOTAL_BUCKET_WIDTH if name == TOTAL else SECTION_BUCKET_WIDTH
+        start = int(bucket)
+        distribution.setdefault(name, []).append({"from": start, "to": start + width, "count": count})
+    for buckets in distribution.values():
+        buckets.sort(key=lambda b: b["from"])
+    return distribution
+
+
+def get_room_summary(exam_assignment_id, top=10):
+    """Graded count, average, score distribution and the top `top` students of a room."""
+    client = get_redis_client()
+    if client is None:
+        rows = sorted(_room_rows(exam_assignment_id), key=lambda row: -row[1])
+        histogram = {}
+        for _user_id, score, section_scores in rows:
+            for field in _bucket_fields(score, section_scores):
+                histogram[field] = histogram.get(field, 0) + 1
+        count = len(rows)
+        total_sum = sum(row[1] for row in rows)
+        leaders = [(user_id, score) for user_id, score, _ in rows[:top]]
+    else:
+        keys = _ready_keys(client, exam_assignment_id)
+        pipe = client.pipeline()
+        pipe.hgetall(keys["histogram"])
+        pipe.zrevrange(keys["ranking"], 0, top - 1, withscores=True)
+        raw_histogram, raw_leaders = pipe.execute()
+        histogram = {
+            (k.decode() if isinstance(k, bytes) else k): float(v)
+            for k, v in raw_histogram.items()
+        }
+        count = int(histogram.pop("count", 0))
+        total_sum = histogram.pop("sum", 0.0)
+        histogram = {k: int(v) for k, v in histogram.items()}
+        leaders = [
+            (int(member.decode() if isinstance(member, bytes) else member), score)
+            for member, score in raw_leaders
+        ]
+
+    # Competition ranking among leaders: equal scores share a rank.
+    top_entries = []
+    for position, (user_id, score) in enumerate(leaders):
+        if top_entries and math.isclose(top_entries[-1]["score"], score):
+            rank = top_entries[-1]["rank"]
+        else:
+            rank = position + 1
+        top_entries.append({"rank": rank, "user_id": user_id, "score": score})
+    return {
+        "graded_count": count,
+        "average_score": round(total_sum / count, 2) if count else None,
+        "distribution": _distribution(histogram),
+        "top": top_entries,
+    }
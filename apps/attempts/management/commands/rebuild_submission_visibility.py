@@ -0,0 +1,20 @@
+# apps/attempts/management/commands/rebuild_submission_visibility.py
+from django.core.management.base import BaseCommand
+
+from apps.attempts.tasks import _tenant_schema_names
+from apps.attempts.visibility import rebuild_visibility
+from apps.core.tenant_utils import schema_context
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the teacher submission visibility index (one-off backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', type=str, help='Rebuild only this tenant schema')
+
+    def handle(self, *args, **options):
+        schema_names = [options['schema']] if options['schema'] else _tenant_schema_names()
+        for schema_name in schema_names:
+            with schema_context(schema_name):
+                count = rebuild_visibility()
+            self.stdout.write(self.style.SUCCESS(f'✓ {schema_name}: {count} assignments indexed'))
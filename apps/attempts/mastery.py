@@ -0,0 +1,163 @@
+# apps/attempts/mastery.py
+"""
+Per-student mastery vectors over skills.
+
+A skill is a section type ("VOCAB") or a section type with its mondai number
+("VOCAB:1"), so skills are shared by every MockTest of the tenant. For each
+(student, skill) StudentMastery keeps exponentially decayed counts of correct
+answers and attempts. Grading adds one submission's counts with a single
+INSERT … ON CONFLICT DO UPDATE (older evidence is multiplied by MASTERY_DECAY),
+so nothing ever rescans a student's submission history.
+
+The whole vector of a student is cached (Django cache) and dropped when it changes;
+practice.py reads it to pick questions.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core.cache_utils import tenant_cache_key
+from apps.mock_tests.models import MockTest, Question, QuizQuestion
+from .answer_keys import get_answer_key
+from .models import StudentMastery
+
+MASTERY_DECAY = 0.8
+MASTERY_UPSERT_BATCH_SIZE = 1000
+MASTERY_CACHE_PREFIX = "attempts:mastery:v1"
+MASTERY_CACHE_TTL = 60 * 60 * 24
+SKILL_MAP_CACHE_PREFIX = "attempts:skill_map:v1"
+
+
+def skill_keys(section_type, mondai_number):
+    """(section skill, mondai skill) of a question."""
+    return section_type, f"{section_type}:{mondai_number}"
+
+
+def _skill_rows(question_filter):
+    rows = Question.objects.filter(**question_filter).values_list(
+        "id", "group__section__section_type", "group__mondai_number",
+    )
+    return {str(question_id): skill_keys(section_type, mondai) for question_id, section_type, mondai in rows}
+
+
+def get_skill_map(mock_test):
+    """question_id -> (section skill, mondai skill), cached per (MockTest, content_version)."""
+    if mock_test.status != MockTest.Status.PUBLISHED:
+        return _skill_rows({"group__section__mock_test": mock_test})
+    key = tenant_cache_key(SKILL_MAP_CACHE_PREFIX, mock_test.id, f"v{mock_test.content_version}")
+    skill_map = cache.get(key)
+    if skill_map is None:
+        skill_map = _skill_rows({"group__section__mock_test": mock_test})
+        cache.set(key, skill_map, MASTERY_CACHE_TTL)
+    return skill_map
+
+
+def _count(skill_map, outcomes):
+    """{skill: [correct, attempts]} from (question_id, is_correct) pairs."""
+    counts = defaultdict(lambda: [0, 0])
+    for question_id, is_correct in outcomes:
+        for skill in skill_map.get(question_id, ()):
+            counts[skill][0] += bool(is_correct)
+            counts[skill][1] += 1
+    return counts
+
+
+def _mock_test_outcomes(answer_key, answers):
+    """Every question of the paper; unanswered counts as wrong, as in grading."""
+    answers = answers or {}
+    for q in answer_key.questions:
+        selected = answers.get(q.question_id)
+        yield q.question_id, selected is not None and selected == q.correct_index
+
+
+def _upsert(rows):
+    """rows: [(user_id, skill, correct, attempts)]; one statement per batch."""
+    if not rows:
+        return
+    table = connection.ops.quote_name(StudentMastery._meta.db_table)
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), MASTERY_UPSERT_BATCH_SIZE):
+            batch = rows[start:start + MASTERY_UPSERT_BATCH_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+            params = []
+            for user_id, skill, correct, attempts in batch:
+                params += [user_id, skill, correct, attempts, now]
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, skill, correct, attempts, updated_at) "
+                f"VALUES {placeholders} "
+                f"ON CONFLICT (user_id, skill) DO UPDATE SET "
+                f"correct = {table}.correct * %s + EXCLUDED.correct, "
+                f"attempts = {table}.attempts * %s + EXCLUDED.attempts, "
+                f"updated_at = EXCLUDED.updated_at",
+                params + [MASTERY_DECAY, MASTERY_DECAY],
+            )
+    user_ids = {row[0] for row in rows}
+    transaction.on_commit(lambda: cache.delete_many([_mastery_cache_key(u) for u in user_ids]))
+
+
+def record_mastery(submission, answers):
+    """Fold one graded MockTest submission into the student's mastery vector."""
+    mock_test = submission.mock_test or (
+        submission.exam_assignment.mock_test if submission.exam_assignment_id else None
+    )
+    if mock_test is None or not submission.user_id:
+        return
+    counts = _count(get_skill_map(mock_test), _mock_test_outcomes(get_answer_key(mock_test), answers))
+    _upsert([(submission.user_id, skill, c, a) for skill, (c, a) in counts.items()])
+
+
+def record_mastery_bulk(mock_test, answer_key, submissions, answers_list):
+    """Fold a whole room graded against one key (one upsert per batch of rows)."""
+    skill_map = get_skill_map(mock_test)
+    rows = []
+    for submission, answers in zip(submissions, answers_list):
+        if submission.user_id:
+            counts = _count(skill_map, _mock_test_outcomes(answer_key, answers))
+            rows.extend((submission.user_id, skill, c, a) for skill, (c, a) in counts.items())
+    _upsert(rows)
+
+
+def record_quiz_mastery(submission, results):
+    """Practice quizzes copied from MockTest questions count towards those questions' skills."""
+    sources = dict(
+        QuizQuestion.objects.filter(
+            quiz_id=submission.quiz_id, source_question_id__isnull=False,
+        ).values_list("id", "source_question_id")
+    )
+    if not sources or not submission.user_id:
+        return
+    skill_map = _skill_rows({"id__in": list(sources.values())})
+    question_results = results.get("questions") or {}
+    outcomes = [
+        (str(source_id), (question_results.get(str(quiz_question_id)) or {}).get("correct", False))
+        for quiz_question_id, source_id in sources.items()
+    ]
+    counts = _count(skill_map, outcomes)
+    _upsert([(submission.user_id, skill, c, a) for skill, (c, a) in counts.items()])
+
+
+def _mastery_cache_key(user_id):
+    return tenant_cache_key(MASTERY_CACHE_PREFIX, user_id)
+
+
+def get_mastery_vector(user_id):
+    """{skill: (correct, attempts)} for a student (cache -> one indexed query)."""
+    key = _mastery_cache_key(user_id)
+    vector = cache.get(key)
+    if vector is None:
+        vector = {
+            skill: (correct, attempts)
+            for skill, correct, attempts in StudentMastery.objects.filter(user_id=user_id).values_list(
+                "skill", "correct", "attempts"
+            )
+        }
+        cache.set(key, vector, MASTERY_CACHE_TTL)
+    return vector
+
+
+def mastery_level(correct, attempts):
+    """Smoothed share correct (Laplace prior: 0.5 without evidence)."""
+    return (correct + 1.0) / (attempts + 2.0)
@@ -1,12 +1,46 @@
 # apps/attempts/models.py
 
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from apps.core.models import TenantBaseModel
 
 
+class TestSnapshot(TenantBaseModel):
+    """
+    Content-addressed snapshot of a MockTest/Quiz (including correct answers).
+    
+    One row per distinct published content, shared by every Submission graded against it.
+    content_hash is the SHA-256 of the canonical JSON of `data`, so identical content is
+    stored once no matter how many students submit.
+    """
+    class ResourceType(models.TextChoices):
+        MOCK_TEST = 'mock_test', _('Mock Test')
+        QUIZ = 'quiz', _('Quiz')
+
+    content_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the canonical JSON snapshot"
+    )
+    resource_type = models.CharField(max_length=20, choices=ResourceType.choices)
+    resource_id = models.UUIDField(db_index=True)
+    data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="Full serialized MockTest/Quiz structure (same shape as SubmissionPayload.snapshot)"
+    )
+
+    class Meta:
+        db_table = 'test_snapshots'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Snapshot {self.content_hash[:12]} ({self.resource_type} {self.resource_id})"
+
+
 class Submission(TenantBaseModel):
     """
     Submission model for exam and homework attempts.
@@ -89,98 +123,23 @@ class Submission(TenantBaseModel):
         help_text="Total score acquired (0-180 for JLPT)"
     )
     
-    # JSONField structure: {"question_uuid": selected_option_index}
-    # Example: {"550e8400-e29b-41d4-a716-446655440000": 2, "660e8400-e29b-41d4-a716-446655440001": 0}
-    # where the key is the Question.id (UUID) and value is the 0-based index of the selected option
-    answers = models.JSONField(
-        default=dict,
-        blank=True,
-        help_text="Student's raw answers snapshot: {question_uuid: selected_option_index}"
-    )
-    
-    # JSONField structure for detailed grading results
-    # Example:
-    # {
-    #   "total_score": 95.5,
-    #   "sections": {
-    #     "section_uuid_1": {
-    #       "section_name": "Vocabulary",
-    #       "section_type": "VOCAB",
-    #       "score": 25.5,
-    #       "max_score": 60,
-    #       "questions": {
-    #         "question_uuid_1": {"correct": true, "score": 1.0},
-    #         "question_uuid_2": {"correct": false, "score": 0.0}
-    #       }
-    #     }
-    #   },
-    #   "jlpt_result": {
-    #     "level": "N2",
-    #     "total_score": 95.5,
-    #     "pass_mark": 90,
-    #     "passed": true,
-    #     "section_results": {
-    #       "language_knowledge": {"score": 25.5, "min_required": 19, "passed": true},
-    #       "reading": {"score": 35.0, "min_required": 19, "passed": true},
-    #       "listening": {"score": 35.0, "min_required": 19, "passed": true}
-    #     }
-    #   }
-    # }
-    results = models.JSONField(
-        default=dict,
+    # answers, results and the legacy inline snapshot live in SubmissionPayload
+    # (1:1, submission.payload) to keep this row narrow.
+    snapshot_ref = models.ForeignKey(
+        TestSnapshot,
+        on_delete=models.PROTECT,
+        null=True,
         blank=True,
-        help_text="Detailed grading result with section breakdown and JLPT pass/fail logic"
+        related_name="submissions",
+        help_text="Content-addressed snapshot graded against (replaces the inline snapshot)"
     )
-    
-    # JSONField structure: Complete snapshot of MockTest/Quiz at time of submission
-    # This preserves the exact state of the test (including correct answers) for historical integrity
-    # Structure matches the full serialized MockTest/Quiz with all nested data
-    # Example for MockTest:
-    # {
-    #   "resource_type": "mock_test",
-    #   "id": "uuid",
-    #   "title": "...",
-    #   "level": "N2",
-    #   "sections": [
-    #     {
-    #       "id": "uuid",
-    #       "name": "Vocabulary",
-    #       "question_groups": [
-    #         {
-    #           "id": "uuid",
-    #           "questions": [
-    #             {
-    #               "id": "uuid",
-    #               "text": "...",
-    #               "options": [{"id": 1, "text": "...", "is_correct": true}, ...],
-    #               "correct_option_index": 0,
-    #               "score": 1
-    #             }
-    #           ]
-    #         }
-    #       ]
-    #     }
-    #   ]
-    # }
-    # Example for Quiz:
-    # {
-    #   "resource_type": "quiz",
-    #   "id": "uuid",
-    #   "title": "...",
-    #   "questions": [
-    #     {
-    #       "id": "uuid",
-    #       "text": "...",
-    #       "options": [{"id": 1, "text": "...", "is_correct": true}, ...],
-    #       "correct_option_index": 0,
-    #       "points": 1
-    #     }
-    #   ]
-    # }
-    snapshot = models.JSONField(
-        default=dict,
+
+    payload_archive = models.CharField(
+        max_length=255,
+        null=True,
         blank=True,
-        help_text="Complete snapshot of MockTest/Quiz structure (including correct answers) at time of grading. Preserves historical integrity."
+        editable=False,
+        help_text="Storage path of the zstd-compressed payload once archived (see archive.py)"
     )
 
     class Meta:
@@ -260,6 +219,66 @@ class Submission(TenantBaseModel):
             return self.quiz
         return None
     
+    def get_payload(self):
+        """
+        The submission's SubmissionPayload: loaded by select_related("payload") on the
+        query, else read here with one primary-key query. Without a row it is rebuilt
+        from the cold-tier archive (archive.py) if there is one, else an unsaved,
+        empty payload is returned.
+        """
+        try:
+            return self.payload
+        except ObjectDoesNotExist:
+            if self.payload_archive:
+                from .archive import load_archived_payload
+                self.payload = load_archived_payload(self)
+            else:
+                self.payload = SubmissionPayload(submission=self)
+            return self.payload
+
+    @property
+    def snapshot_data(self):
+        """Snapshot dict: shared TestSnapshot when referenced, else the legacy inline copy."""
+        if self.snapshot_ref_id:
+            snapshot_ref = self.snapshot_ref
+            return {**snapshot_ref.data, "snapshot_created_at": snapshot_ref.created_at.isoformat()}
+        return self.get_payload().snapshot
+
+    def get_answers(self):
+        """{question_uuid: selected_option_index}, decoding the compact form if used."""
+        payload = self.get_payload()
+        if payload.answers_packed is None:
+            return payload.answers
+        from .encoding import unpack_answers
+        return unpack_answers(self)
+
+    def get_results(self):
+        """Grading results dict, decoding the compact form if used (memoized per instance)."""
+        payload = self.get_payload()
+        if payload.results_packed is None:
+            return payload.results
+        if getattr(self, "_unpacked_results", None) is None:
+            from .encoding import unpack_results
+            self._unpacked_results = unpack_results(self)
+        return self._unpacked_results
+
+    def set_graded_payload(self, answers, results):
+        """
+        Set graded answers/results on the payload, packed when compact storage applies.
+        snapshot_ref_id must already point at the snapshot graded against. Persist with
+        SubmissionPayload.save_for(..., SubmissionPayload.GRADED_FIELDS).
+        """
+        from .encoding import pack
+        packed = pack(self.snapshot_ref_id, answers, results)
+        payload = self.get_payload()
+        self._unpacked_results = None
+        if packed is None:
+            payload.answers, payload.results = answers, results
+            payload.answers_packed = payload.results_packed = None
+        else:
+            payload.answers, payload.results = {}, {}
+            payload.answers_packed, payload.results_packed = packed
+
     @property
     def resource_type(self):
         """Get the type of resource: 'mock_test' or 'quiz'."""
@@ -270,3 +289,402 @@ class Submission(TenantBaseModel):
         elif self.quiz:
             return 'quiz'
         return None
+
+
+class SubmissionPayload(models.Model):
+    """
+    Heavy per-attempt data of a Submission, split off 1:1 so the submissions table
+    (scanned by status filters, lists, sweeps and permission checks) holds only ids,
+    status, timestamps and score. Rows are created on the first write; a submission
+    without one has no answers yet.
+
+    Nothing loads the payload implicitly in bulk: queries that need it use
+    select_related("payload") (plus only("payload__…") for single columns), and
+    writers persist it with save_for().
+    """
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="payload",
+    )
+
+    # JSONField structure: {"question_uuid": selected_option_index}
+    # Example: {"550e8400-e29b-41d4-a716-446655440000": 2, "660e8400-e29b-41d4-a716-446655440001": 0}
+    # where the key is the Question.id (UUID) and value is the 0-based index of the selected option
+    answers = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Student's raw answers snapshot: {question_uuid: selected_option_index}"
+    )
+
+    # JSONField structure for detailed grading results
+    # Example:
+    # {
+    #   "total_score": 95.5,
+    #   "sections": {
+    #     "section_uuid_1": {
+    #       "section_name": "Vocabulary",
+    #       "section_type": "VOCAB",
+    #       "score": 25.5,
+    #       "max_score": 60,
+    #       "questions": {
+    #         "question_uuid_1": {"correct": true, "score": 1.0},
+    #         "question_uuid_2": {"correct": false, "score": 0.0}
+    #       }
+    #     }
+    #   },
+    #   "jlpt_result": {
+    #     "level": "N2",
+    #     "total_score": 95.5,
+    #     "pass_mark": 90,
+    #     "passed": true,
+    #     "section_results": {
+    #       "language_knowledge": {"score": 25.5, "min_required": 19, "passed": true},
+    #       "reading": {"score": 35.0, "min_required": 19, "passed": true},
+    #       "listening": {"score": 35.0, "min_required": 19, "passed": true}
+    #     }
+    #   }
+    # }
+    results = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Detailed grading result with section breakdown and JLPT pass/fail logic"
+    )
+
+    # Legacy per-row snapshot (same shape as TestSnapshot.data); new submissions
+    # reference a shared TestSnapshot through Submission.snapshot_ref instead.
+    snapshot = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Complete snapshot of MockTest/Quiz structure (including correct answers) at time of grading. Preserves historical integrity."
+    )
+
+    # Compact form of answers/results (ATTEMPTS_COMPACT_STORAGE, see encoding.py).
+    # When set, answers/results hold {} and readers go through
+    # Submission.get_answers()/get_results().
+    answers_packed = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Option index per snapshot question (0xFF = unanswered)"
+    )
+    results_packed = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Section scores + correctness bitset; rest of results derived from the snapshot"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields written by Submission.set_graded_payload().
+    GRADED_FIELDS = ["answers", "results", "answers_packed", "results_packed"]
+
+    class Meta:
+        db_table = 'submission_payloads'
+
+    def __str__(self):
+        return f"Payload of submission {self.submission_id}"
+
+    @classmethod
+    def save_for(cls, submissions, fields, batch_size=500):
+        """
+        Persist `fields` of the submissions' payloads: INSERT … ON CONFLICT DO UPDATE
+        per batch, so missing rows are created and existing ones updated in one statement.
+        """
+        payloads = []
+        for submission in submissions:
+            payload = submission.get_payload()
+            # Fresh instances: deferred columns of loaded payloads are never fetched.
+            payloads.append(cls(submission_id=submission.pk, **{f: getattr(payload, f) for f in fields}))
+        if payloads:
+            cls.objects.bulk_create(
+                payloads,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["submission"],
+                update_fields=[*fields, "updated_at"],
+            )
+
+
+class QuestionResponse(models.Model):
+    """
+    One row per (graded MockTest submission, question): the normalized fact table
+    behind item statistics. Written with bulk_create at grading time; every question
+    of the paper gets a row (unanswered -> selected_index NULL, is_correct False).
+
+    total_score is the submission's total, denormalized so point-biserial sums can be
+    aggregated without joining submissions. aggregated marks rows already folded into
+    ItemStatistic by the incremental aggregation task.
+    """
+    id = models.BigAutoField(primary_key=True)
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name="question_responses",
+    )
+    mock_test_id = models.UUIDField()
+    question_id = models.UUIDField()
+    selected_index = models.SmallIntegerField(null=True, blank=True)
+    is_correct = models.BooleanField(default=False)
+    total_score = models.PositiveSmallIntegerField(default=0)
+    aggregated = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'question_responses'
+        indexes = [
+            models.Index(fields=['mock_test_id', 'question_id']),
+            models.Index(
+                fields=['id'],
+                name='question_resp_pending_idx',
+                condition=models.Q(aggregated=False),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['submission', 'question_id'],
+                name='unique_submission_question_response',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Response {self.submission_id} / {self.question_id} ({'correct' if self.is_correct else 'wrong'})"
+
+
+class ItemStatistic(models.Model):
+    """
+    Running item-analysis sums for one MockTest question.
+
+    Only additive sums are stored, so new responses are folded in incrementally:
+    - p_value: n_correct / n
+    - point_biserial: correlation between correctness and the total score
+      (uncorrected: the total includes the item itself)
+    - option_counts: {"<option index>": count}; unanswered responses are counted in
+      n but not in option_counts
+    """
+    id = models.BigAutoField(primary_key=True)
+    mock_test_id = models.UUIDField(db_index=True)
+    question_id = models.UUIDField(unique=True)
+    n = models.PositiveIntegerField(default=0)
+    n_correct = models.PositiveIntegerField(default=0)
+    sum_total = models.BigIntegerField(default=0)
+    sum_total_sq = models.BigIntegerField(default=0)
+    sum_total_correct = models.BigIntegerField(default=0)
+    option_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'item_statistics'
+
+    def __str__(self):
+        return f"ItemStatistic {self.question_id} (n={self.n})"
+
+    @property
+    def p_value(self):
+        return self.n_correct / self.n if self.n else None
+
+    @property
+    def point_biserial(self):
+        n, n1 = self.n, self.n_correct
+        n0 = n - n1
+        if not n or not n1 or not n0:
+            return None
+        mean = self.sum_total / n
+        variance = self.sum_total_sq / n - mean * mean
+        if variance <= 0:
+            return None
+        mean_correct = self.sum_total_correct / n1
+        mean_wrong = (self.sum_total - self.sum_total_correct) / n0
+        p = n1 / n
+        return (mean_correct - mean_wrong) / variance ** 0.5 * (p * (1 - p)) ** 0.5
+
+    def option_frequencies(self):
+        """Share of all responses choosing each option index."""
+        if not self.n:
+            return {}
+        return {option: count / self.n for option, count in sorted(self.option_counts.items(), key=lambda kv: int(kv[0]))}
+
+
+
+class ItemCalibration(models.Model):
+    """
+    Fitted 2PL IRT parameters of one MockTest question (see irt.py):
+    P(correct | theta) = 1 / (1 + exp(-discrimination * (theta - difficulty))).
+    """
+    id = models.BigAutoField(primary_key=True)
+    mock_test_id = models.UUIDField(db_index=True)
+    question_id = models.UUIDField(unique=True)
+    discrimination = models.FloatField()
+    difficulty = models.FloatField()
+    n = models.PositiveIntegerField(default=0, help_text="Responses the parameters were fitted on")
+    calibrated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'item_calibrations'
+
+    def __str__(self):
+        return f"ItemCalibration {self.question_id} (a={self.discrimination:.2f}, b={self.difficulty:.2f})"
+
+
+class ScoreScale(models.Model):
+    """
+    Raw -> scaled section score lookup for one (MockTest, content_version), derived
+    from the test's ItemCalibration rows. tables: {section_id: [scaled score for
+    0, 1, ..., n correct answers in the section]}. One row per fit, never updated:
+    a room is graded on the latest fit calibrated before it was created (irt.py).
+    """
+    id = models.BigAutoField(primary_key=True)
+    mock_test_id = models.UUIDField()
+    content_version = models.PositiveIntegerField()
+    tables = models.JSONField(default=dict)
+    submission_count = models.PositiveIntegerField(default=0, help_text="Submissions the fit used")
+    response_count = models.PositiveIntegerField(
+        default=0, help_text="Graded responses per question (ItemStatistic.n) when fitted"
+    )
+    calibrated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'score_scales'
+        indexes = [
+            models.Index(
+                fields=['mock_test_id', 'content_version', 'calibrated_at'],
+                name='score_scale_version_fit_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"ScoreScale {self.mock_test_id} v{self.content_version} @ {self.calibrated_at:%Y-%m-%d}"
+
+class SubmissionVisibility(models.Model):
+    """
+    Denormalized (submission, group) pairs: a submission is visible to the teachers of
+    every group its exam/homework assignment is assigned to.
+
+    Maintained by visibility.py when submissions are created and when an assignment's
+    assigned_groups change, so teacher listing and object permission checks are one
+    indexed semi-join instead of OR-ed M2M joins with DISTINCT.
+    """
+    id = models.BigAutoField(primary_key=True)
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name="visibility",
+    )
+    group = models.ForeignKey(
+        "groups.Group",
+        on_delete=models.CASCADE,
+        related_name="submission_visibility",
+    )
+
+    class Meta:
+        db_table = 'submission_visibility'
+        constraints = [
+            # Leading group_id: serves "submissions visible to these groups"
+            models.UniqueConstraint(fields=['group', 'submission'], name='unique_group_submission_visibility'),
+        ]
+
+    def __str__(self):
+        return f"Submission {self.submission_id} visible to group {self.group_id}"
+
+
+class CollusionFlag(models.Model):
+    """
+    A pair of submissions in one exam room with an outlying number of identical
+    wrong answers (see collusion.py). Flags are for human review only; nothing
+    changes the submissions' grades automatically.
+    """
+    class ReviewStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pending review')
+        DISMISSED = 'DISMISSED', _('Dismissed')
+        CONFIRMED = 'CONFIRMED', _('Confirmed')
+
+    id = models.BigAutoField(primary_key=True)
+    exam_assignment = models.ForeignKey(
+        "assignments.ExamAssignment",
+        on_delete=models.CASCADE,
+        related_name="collusion_flags",
+    )
+    # Ordered pair: submission_a.id < submission_b.id
+    submission_a = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="+")
+    submission_b = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="+")
+    shared_wrong = models.PositiveIntegerField(help_text="Questions both answered with the same wrong option")
+    both_wrong = models.PositiveIntegerField(help_text="Questions both answered wrongly (any option)")
+    z_score = models.FloatField(help_text="shared_wrong relative to all pairs of the room")
+    status = models.CharField(
+        max_length=20,
+        choices=ReviewStatus.choices,
+        default=ReviewStatus.PENDING,
+        db_index=True,
+    )
+    reviewed_by_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'collusion_flags'
+        ordering = ['-z_score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['exam_assignment', 'submission_a', 'submission_b'],
+                name='unique_collusion_pair',
+            ),
+        ]
+
+    def __str__(self):
+        return f"CollusionFlag {self.submission_a_id} ~ {self.submission_b_id} (z={self.z_score:.1f})"
+
+
+class StudentMastery(models.Model):
+    """
+    One component of a student's mastery vector (see mastery.py). skill is a section
+    type ("VOCAB") or a section type and mondai number ("VOCAB:1"). correct and
+    attempts are exponentially decayed counts, updated at grading time.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.BigIntegerField()
+    skill = models.CharField(max_length=64)
+    correct = models.FloatField(default=0)
+    attempts = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'student_mastery'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'skill'], name='unique_student_skill'),
+        ]
+
+    def __str__(self):
+        return f"StudentMastery {self.user_id} {self.skill} ({self.correct:.1f}/{self.attempts:.1f})"
+
+
+class QuestionTimingEvent(models.Model):
+    """
+    Append-only client telemetry for one question of an attempt (see telemetry.py).
+    Rows are written in bulk with COPY by the telemetry flush task and never updated;
+    there are no foreign keys, so ingestion never touches or locks Submission rows.
+    """
+    class EventType(models.IntegerChoices):
+        VIEW = 1, _('Question viewed')
+        CHANGE = 2, _('Answer changed')
+        DWELL = 3, _('Time on question')
+
+    id = models.BigAutoField(primary_key=True)
+    submission_id = models.UUIDField()
+    user_id = models.BigIntegerField()
+    mock_test_id = models.UUIDField(null=True, blank=True)
+    quiz_id = models.UUIDField(null=True, blank=True)
+    question_id = models.UUIDField()
+    event_type = models.PositiveSmallIntegerField(choices=EventType.choices)
+    duration_ms = models.PositiveIntegerField(default=0)
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'question_timing_events'
+        indexes = [
+            models.Index(fields=['mock_test_id', 'question_id']),
+            models.Index(fields=['quiz_id', 'question_id']),
+        ]
+
+    def __str__(self):
+        return f"QuestionTimingEvent {self.get_event_type_display()} {self.question_id}"
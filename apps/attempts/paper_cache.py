@@ -0,0 +1,87 @@
+# apps/attempts/paper_cache.py
+"""
+Rendered exam papers (no correct answers) for start-exam / homework-start.
+
+Rendering a MockTest paper means a four-level prefetch, nested ExamPaperSerializer
+work and signing every audio/image URL. When a room opens, the whole group asks
+for the same paper within seconds, so PUBLISHED papers are rendered once per
+(schema, MockTest id, content_version) into JSON bytes and shared through the
+Django cache with single-flight protection.
+
+The cache TTL stays well below the signed media URL lifetime so a student never
+receives a paper whose audio links are about to expire.
+
+Quizzes carry no content version, so their papers are rendered per request.
+"""
+import hashlib
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.core.cache_utils import single_flight, tenant_cache_key
+from apps.mock_tests.models import MockTest
+
+PAPER_CACHE_PREFIX = "attempts:paper"
+# Keep URLs valid for at least this long after a paper is served from cache.
+SIGNED_URL_SAFETY_MARGIN = 15 * 60
+
+
+class RenderedPaper(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def _paper_cache_ttl():
+    url_lifetime = min(
+        getattr(settings, "AWS_QUERYSTRING_EXPIRE", 3600),
+        getattr(settings, "AWS_SENSITIVE_MEDIA_EXPIRE", 3600),
+    )
+    ttl = getattr(settings, "PAPER_CACHE_TTL", 15 * 60)
+    return max(0, min(ttl, url_lifetime - SIGNED_URL_SAFETY_MARGIN))
+
+
+def _render(data) -> RenderedPaper:
+    body = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return RenderedPaper(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def get_mock_test_paper(mock_test) -> RenderedPaper:
+    """Return the rendered exam paper for mock_test (cached for PUBLISHED tests)."""
+    from .services import GradingService
+
+    def build():
+        return _render(GradingService._fetch_mock_test_structure(mock_test))
+
+    ttl = _paper_cache_ttl()
+    if mock_test.status != MockTest.Status.PUBLISHED or not ttl:
+        return build()
+    key = tenant_cache_key(PAPER_CACHE_PREFIX, "mock_test", mock_test.id, f"v{mock_test.content_version}")
+    return single_flight(key, build, ttl)
+
+
+def get_quiz_paper(quiz) -> RenderedPaper:
+    """Return the rendered quiz paper; quizzes are small and unversioned, so never cached."""
+    from .services import GradingService
+
+    return _render(GradingService._fetch_quiz_structure(quiz))
+
+
+def paper_response(payload, paper_field, paper: RenderedPaper, status=200) -> HttpResponse:
+    """
+    Build the JSON response for payload with the pre-rendered paper spliced in
+    under paper_field, without decoding and re-encoding the paper bytes.
+    The paper's ETag is exposed so clients can tell whether the paper changed.
+    """
+    head = json.dumps(payload, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    field = json.dumps(paper_field).encode("utf-8")
+    if head == b"{}":
+        body = b"{" + field + b":" + paper.body + b"}"
+    else:
+        body = head[:-1] + b"," + field + b":" + paper.body + b"}"
+    response = HttpResponse(body, status=status, content_type="application/json")
+    response["ETag"] = paper.etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -55,30 +55,11 @@ class IsSubmissionOwnerOrTeacher(permissions.BasePermission):
         if user.role in ("STUDENT", "GUEST"):
             return obj.user_id == user.id
 
-        # TEACHER: Submissions for their groups
+        # TEACHER: Submissions for their groups (one indexed lookup on the visibility index)
         if user.role == "TEACHER":
-            from apps.groups.models import GroupMembership
+            from .visibility import is_visible_to_teacher
             
-            # Get groups where this teacher teaches
-            teaching_group_ids = GroupMembership.objects.filter(
-                user_id=user.id,
-                role_in_group="TEACHER"
-            ).values_list('group_id', flat=True)
-            
-            if not teaching_group_ids:
-                return False
-            
-            # Check if submission's assignment is assigned to any of these groups
-            if obj.exam_assignment:
-                return obj.exam_assignment.assigned_groups.filter(
-                    id__in=teaching_group_ids
-                ).exists()
-            elif obj.homework_assignment:
-                return obj.homework_assignment.assigned_groups.filter(
-                    id__in=teaching_group_ids
-                ).exists()
-            
-            return False
+            return is_visible_to_teacher(obj.id, user.id)
 
         return False
 
@@ -135,3 +116,25 @@ class CanStartExam(permissions.BasePermission):
             )
 
         return True
+
+
+class ExamStartAdmission(permissions.BasePermission):
+    """
+    Waiting-room gate for start-exam (apps/attempts/admission.py).
+
+    Listed before CanStartExam so that students over the tenant/room start rate
+    get 429 + Retry-After before any database query is made.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated or user.role not in ("STUDENT", "GUEST"):
+            return True
+        exam_assignment_id = request.data.get('exam_assignment_id')
+        if not exam_assignment_id:
+            return True
+
+        from .admission import admit_exam_start
+
+        admit_exam_start(exam_assignment_id, user.id)
+        return True
@@ -0,0 +1,206 @@
+# apps/attempts/practice.py
+"""
+Adaptive practice quizzes assembled from the tenant's MockTest question pool.
+
+The pool of a JLPT level (questions of published tests that stand on their own:
+no reading passage, audio or group diagram) is compiled into NumPy arrays:
+question ids, skill index and difficulty (ItemStatistic p-value). It is cached
+like answer keys (in-process LRU + Django cache), keyed by the level and the
+(id, content_version) set of its published tests, so publishing invalidates it.
+
+Generation scores every candidate at once from the student's cached mastery
+vector (mastery.py):
+
+    weakness     1 - mastery of the question's mondai skill (section skill if unseen)
+    fit          -|difficulty - target|, target slightly above the student's mastery
+    noise        Gumbel noise, so repeated quizzes differ
+
+and takes the best questions with at most PRACTICE_MAX_SKILL_SHARE of the quiz per
+skill. No query touches the student's submissions.
+"""
+import hashlib
+import math
+from typing import NamedTuple, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from apps.core.cache_utils import LRUCache, tenant_cache_key
+from apps.mock_tests.models import MockTest, Question, Quiz, QuizQuestion
+from .mastery import get_mastery_vector, mastery_level, skill_keys
+from .models import ItemStatistic
+
+PRACTICE_POOL_CACHE_PREFIX = "attempts:practice_pool:v1"
+PRACTICE_POOL_CACHE_TTL = 60 * 60
+PRACTICE_DEFAULT_SIZE = 20
+PRACTICE_MAX_SIZE = 50
+PRACTICE_MAX_SKILL_SHARE = 0.4
+# Only questions with enough responses use their observed p-value.
+PRACTICE_MIN_RESPONSES = 20
+PRACTICE_DEFAULT_DIFFICULTY = 0.6
+PRACTICE_TARGET_OFFSET = 0.1
+PRACTICE_FIT_WEIGHT = 0.5
+PRACTICE_NOISE = 0.05
+# QuizQuestion.text is a CharField(500)
+_QUIZ_TEXT_MAX = 500
+
+_local_cache = LRUCache(maxsize=16)
+
+
+class PracticePool(NamedTuple):
+    question_ids: Tuple[str, ...]
+    skills: Tuple[str, ...]            # mondai skill vocabulary
+    section_skills: Tuple[str, ...]    # section skill of each vocabulary entry
+    skill_index: np.ndarray            # per question, into skills
+    difficulty: np.ndarray             # per question, expected share correct
+
+
+def _pool_cache_key(level, published):
+    digest = hashlib.sha256(
+        ",".join(f"{mock_test_id}:{version}" for mock_test_id, version in published).encode("utf-8")
+    ).hexdigest()[:16]
+    return tenant_cache_key(PRACTICE_POOL_CACHE_PREFIX, level, digest)
+
+
+def compile_pool(level) -> PracticePool:
+    rows = list(
+        Question.objects.filter(
+            group__section__mock_test__level=level,
+            group__section__mock_test__status=MockTest.Status.PUBLISHED,
+            group__section__mock_test__deleted_at__isnull=True,
+            group__section__deleted_at__isnull=True,
+            group__deleted_at__isnull=True,
+            correct_option_index__isnull=False,
+        ).filter(
+            Q(group__reading_text__isnull=True) | Q(group__reading_text=""),
+            Q(group__audio_file__isnull=True) | Q(group__audio_file=""),
+            Q(group__image__isnull=True) | Q(group__image=""),
+            Q(audio_file__isnull=True) | Q(audio_file=""),
+        ).values_list("id", "text", "group__section__section_type", "group__mondai_number")
+    )
+    rows = [row for row in rows if len(row[1] or "") <= _QUIZ_TEXT_MAX]
+    p_values = {
+        str(question_id): n_correct / n
+        for question_id, n, n_correct in ItemStatistic.objects.filter(
+            question_id__in=[row[0] for row in rows], n__gte=PRACTICE_MIN_RESPONSES,
+        ).values_list("question_id", "n", "n_correct")
+    }
+    skills, section_skills, index = [], [], {}
+    question_ids, skill_index, difficulty = [], [], []
+    for question_id, _text, section_type, mondai in rows:
+        section_skill, skill = skill_keys(section_type, mondai)
+        if skill not in index:
+            index[skill] = len(skills)
+            skills.append(skill)
+            section_skills.append(section_skill)
+        question_ids.append(str(question_id))
+        skill_index.append(index[skill])
+        difficulty.append(p_values.get(str(question_id), PRACTICE_DEFAULT_DIFFICULTY))
+    return PracticePool(
+        tuple(question_ids), tuple(skills), tuple(section_skills),
+        np.array(skill_index, dtype=np.int32), np.array(difficulty, dtype=np.float32),
+    )
+
+
+def get_pool(level) -> PracticePool:
+    published = sorted(
+        MockTest.objects.filter(level=level, status=MockTest.Status.PUBLISHED)
+        .values_list("id", "content_version")
+    )
+    key = _pool_cache_key(level, published)
+    pool = _local_cache.get(key)
+    if pool is not None:
+        return pool
+    pool = cache.get(key)
+    if pool is None:
+        pool = compile_pool(level)
+        cache.set(key, pool, PRACTICE_POOL_CACHE_TTL)
+    _local_cache.set(key, pool)
+    return pool
+
+
+def _skill_mastery(pool, vector):
+    """Mastery per pool skill; unseen mondai skills fall back to their section skill."""
+    mastery = np.empty(len(pool.skills), dtype=np.float32)
+    for k, (skill, section_skill) in enumerate(zip(pool.skills, pool.section_skills)):
+        counts = vector.get(skill) or vector.get(section_skill) or (0.0, 0.0)
+        mastery[k] = mastery_level(*counts)
+    return mastery
+
+
+def select_questions(pool, vector, size, rng=None):
+    """Indices into the pool for a quiz of `size` questions, best first."""
+    if not pool.question_ids:
+        return []
+    rng = rng or np.random.default_rng()
+    mastery = _skill_mastery(pool, vector)[pool.skill_index]
+    target = np.minimum(mastery + PRACTICE_TARGET_OFFSET, 0.95)
+    scores = (1.0 - mastery) - PRACTICE_FIT_WEIGHT * np.abs(pool.difficulty - target)
+    scores = scores + PRACTICE_NOISE * rng.gumbel(size=scores.shape)
+
+    order = np.argsort(-scores, kind="stable")
+    cap = max(1, math.ceil(size * PRACTICE_MAX_SKILL_SHARE))
+    taken = np.zeros(len(pool.skills), dtype=np.int32)
+    picked = []
+    for j in order:
+        k = pool.skill_index[j]
+        if taken[k] < cap:
+            taken[k] += 1
+            picked.append(int(j))
+            if len(picked) == size:
+                return picked
+    # Too few skills for the cap: fill up with the next best questions.
+    chosen = set(picked)
+    picked.extend(int(j) for j in order if j not in chosen)
+    return picked[:size]
+
+
+def skill_summary(vector):
+    """[{skill, mastery, attempts}] weakest first, for the response."""
+    summary = []
+    for skill, (correct, attempts) in vector.items():
+        summary.append({
+            "skill": skill,
+            "mastery": round(mastery_level(correct, attempts), 3),
+            "attempts": round(attempts, 1),
+        })
+    return sorted(summary, key=lambda item: item["mastery"])
+
+
+def generate_practice_quiz(user_id, level, size=PRACTICE_DEFAULT_SIZE, created_by_id=None, title=None):
+    """Create a Quiz of copied pool questions targeted at the student's weak skills."""
+    pool = get_pool(level)
+    vector = get_mastery_vector(user_id)
+    picked = [pool.question_ids[j] for j in select_questions(pool, vector, size)]
+    if not picked:
+        return None, []
+    questions = {str(q.id): q for q in Question.objects.filter(id__in=picked)}
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            title=title or f"Adaptive practice {level}",
+            description=f"Generated for student {user_id} from their weakest skills.",
+            created_by_id=created_by_id,
+        )
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                quiz=quiz,
+                text=question.text,
+                question_type=(
+                    QuizQuestion.QuestionType.TRUE_FALSE if len(question.options) == 2
+                    else QuizQuestion.QuestionType.QUIZ
+                ),
+                image=question.image,
+                duration=quiz.default_question_duration,
+                points=1,
+                order=order,
+                options=question.options,
+                correct_option_index=question.correct_option_index,
+                source_question_id=question.id,
+            )
+            for order, question in enumerate(
+                (questions[qid] for qid in picked if qid in questions), start=1
+            )
+        ])
+    return quiz, skill_summary(vector)
@@ -0,0 +1,70 @@
+# apps/attempts/provisioning.py
+"""
+Room-open pre-provisioning of exam attempts.
+
+When an ExamAssignment switches to OPEN, one Celery task bulk-creates a Submission
+(status=STARTED, started_at=NULL) for every student of the assigned groups and warms
+the answer-key and exam-paper caches. StartExamService.start_exam then only claims
+the row with a single conditional UPDATE of started_at instead of racing INSERTs
+on the unique (user_id, exam_assignment) constraint.
+
+A provisioned row with started_at=NULL means "not started yet": it is excluded
+from submission listings and from the auto-submit sweep. Students who join a group
+after the room opened simply fall back to the INSERT path in start_exam.
+"""
+import logging
+
+from apps.assignments.models import ExamAssignment
+from apps.groups.models import GroupMembership
+from apps.mock_tests.models import MockTest
+from .models import Submission
+
+logger = logging.getLogger(__name__)
+
+PROVISION_BATCH_SIZE = 500
+
+
+def provision_exam_room(exam_assignment) -> int:
+    """
+    Create missing Submission rows for the room's students and warm caches.
+    Idempotent: existing rows are left untouched (ON CONFLICT DO NOTHING).
+    Returns the number of student rows attempted.
+    """
+    if exam_assignment.status != ExamAssignment.RoomStatus.OPEN:
+        return 0
+    mock_test = exam_assignment.mock_test
+    if not mock_test or mock_test.status != MockTest.Status.PUBLISHED:
+        return 0
+
+    group_ids = list(exam_assignment.assigned_groups.values_list("id", flat=True))
+    student_ids = set(
+        GroupMembership.objects.filter(
+            group_id__in=group_ids,
+            role_in_group=GroupMembership.ROLE_STUDENT,
+        ).values_list("user_id", flat=True)
+    ) if group_ids else set()
+
+    if student_ids:
+        Submission.objects.bulk_create(
+            [
+                Submission(
+                    user_id=user_id,
+                    exam_assignment=exam_assignment,
+                    status=Submission.Status.STARTED,
+                    started_at=None,
+                )
+                for user_id in student_ids
+            ],
+            batch_size=PROVISION_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # bulk_create sends no post_save: index the room for its teachers here.
+        from .visibility import grant_assignment
+        grant_assignment("exam_assignment", exam_assignment.id, group_ids)
+
+    from .answer_keys import get_answer_key
+    from .paper_cache import get_mock_test_paper
+
+    get_answer_key(mock_test)
+    get_mock_test_paper(mock_test)
+    return len(student_ids)
@@ -8,6 +8,7 @@ Documented in apps/attempts/swagger.py.
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from .models import Submission
+from apps.core.projection import ProjectedFieldsMixin
 from apps.core.serializers import user_display_from_map
 from apps.mock_tests.models import MockTest, TestSection, QuestionGroup, Question, Quiz, QuizQuestion
 
@@ -305,6 +306,8 @@ class SubmissionResultSerializer(serializers.ModelSerializer):
     mock_test_level = serializers.SerializerMethodField()
     time_taken_seconds = serializers.SerializerMethodField()
     percentage = serializers.SerializerMethodField()
+    # Decodes compact storage (see encoding.py); same shape as the JSON column.
+    results = serializers.JSONField(source="get_results", read_only=True)
 
     class Meta:
         model = Submission
@@ -357,27 +360,20 @@ class SubmissionResultSerializer(serializers.ModelSerializer):
 
     def get_percentage(self, obj):
         """Percentage of max score from results JSON (for dashboard)."""
-        if not obj.results or not isinstance(obj.results, dict):
-            return None
-        total = obj.results.get("total_score")
-        max_s = obj.results.get("max_score")
-        if max_s and max_s > 0 and total is not None:
-            return round(float(total) / float(max_s) * 100, 2)
-        jlpt = obj.results.get("jlpt_result") or {}
-        pass_mark = jlpt.get("pass_mark")
-        if pass_mark and pass_mark > 0 and total is not None:
-            return round(float(total) / float(pass_mark) * 100, 2)
-        return None
+        from .services import GradingService
+        return GradingService.results_percentage(obj.get_results())
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     """
     Standard serializer for Submission (teachers/admins list/retrieve).
     student_display is populated from user_map in context (batch-fetched, no N+1).
+    Supports ?fields= / ?exclude= (apps/core/projection.py); list omits results by default.
     """
     assignment_title = serializers.SerializerMethodField()
     assignment_type = serializers.SerializerMethodField()
     student_display = serializers.SerializerMethodField()
+    results = serializers.JSONField(source="get_results", read_only=True)
 
     class Meta:
         model = Submission
@@ -390,6 +386,23 @@ class SubmissionSerializer(serializers.ModelSerializer):
             "id", "user_id", "status", "started_at", "completed_at",
             "score", "results", "created_at", "updated_at",
         ]
+        # Model columns read by computed fields (for QuerySet.only()).
+        projection_sources = {
+            "student_display": ("user_id",),
+            "results": (
+                "snapshot_ref", "payload_archive",
+                "payload__results", "payload__results_packed", "payload__answers_packed",
+            ),
+            "assignment_title": (),
+            "assignment_type": (),
+        }
+        # Relations joined only when a selected field reads them.
+        projection_related = {"results": ("payload",)}
+        # select_related FKs must always be loaded.
+        projection_always = (
+            "id", "exam_assignment", "homework_assignment",
+            "exam_assignment__title", "homework_assignment__title",
+        )
 
     @extend_schema_field(serializers.CharField(allow_null=True, help_text="Assignment title"))
     def get_assignment_title(self, obj):
@@ -1,16 +1,28 @@
 # apps/attempts/services.py
 
+import logging
 from typing import Dict, Any, Tuple, Optional
-import json
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db import transaction, IntegrityError
-from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction, IntegrityError
 from decimal import Decimal
-from .models import Submission
+from .models import Submission, SubmissionPayload
+from .answer_keys import get_answer_key
+from .snapshots import get_submission_snapshot_id
+from .paper_cache import get_mock_test_paper, get_quiz_paper
+from .autosave import get_saved_answers, discard_buffered_answers
+from .timers import schedule_expiry, cancel_expiry
+from .item_stats import record_responses
+from .irt import get_score_scale, scale_cutoff, scaled_section_scores
+from .leaderboard import record_result
+from .mastery import record_mastery, record_quiz_mastery
+from .shuffle import canonical_answers, shuffle_paper
 from apps.assignments.models import ExamAssignment, HomeworkAssignment
+from apps.core.tenant_utils import get_current_schema
 from apps.mock_tests.models import MockTest, TestSection, QuestionGroup, Question, Quiz, QuizQuestion
 
+logger = logging.getLogger(__name__)
+
 
 class StartExamService:
     """
@@ -19,7 +31,7 @@ class StartExamService:
     Handles:
     - Validation that ExamAssignment is OPEN
     - Validation that user hasn't already completed the exam
-    - Creation of Submission record with status=STARTED
+    - Claiming the pre-provisioned Submission (or creating it) with status=STARTED
     """
     
     @staticmethod
@@ -32,7 +44,8 @@ class StartExamService:
             exam_assignment_id: UUID of ExamAssignment
             
         Returns:
-            tuple: (submission, exam_paper_data)
+            tuple: (submission, exam_paper) where exam_paper is a RenderedPaper
+            (JSON bytes + ETag) shared by every student starting the same test version.
             
         Raises:
             ValidationError: If validation fails
@@ -58,35 +71,51 @@ class StartExamService:
         if exam_assignment.mock_test.status != MockTest.Status.PUBLISHED:
             raise ValidationError("Mock test is not published.")
         
-        # Create submission with DB-level uniqueness to avoid race conditions
-        try:
-            with transaction.atomic():
-                submission = Submission.objects.create(
+        # Usually the row was pre-provisioned when the room opened: claim it with one
+        # conditional UPDATE. Otherwise fall back to INSERT with DB-level uniqueness.
+        submission = Submission.objects.filter(
+            user_id=user.id,
+            exam_assignment=exam_assignment,
+        ).first()
+        if submission is None:
+            try:
+                with transaction.atomic():
+                    submission = Submission.objects.create(
+                        user_id=user.id,
+                        exam_assignment=exam_assignment,
+                        status=Submission.Status.STARTED,
+                        started_at=timezone.now()
+                    )
+            except IntegrityError:
+                submission = Submission.objects.filter(
                     user_id=user.id,
                     exam_assignment=exam_assignment,
-                    status=Submission.Status.STARTED,
-                    started_at=timezone.now()
-                )
-        except IntegrityError:
-            submission = Submission.objects.filter(
-                user_id=user.id,
-                exam_assignment=exam_assignment,
-            ).first()
-            if not submission:
-                raise ValidationError("Unable to start exam at this time. Please retry.")
-            if submission.status in (Submission.Status.SUBMITTED, Submission.Status.GRADED):
-                raise ValidationError(
-                    "You have already completed this exam. Each exam can only be attempted once."
-                )
-            if not submission.started_at:
-                submission.started_at = timezone.now()
-                submission.save(update_fields=['started_at'])
+                ).first()
+                if not submission:
+                    raise ValidationError("Unable to start exam at this time. Please retry.")
+        if submission.status in (Submission.Status.SUBMITTED, Submission.Status.GRADED):
+            raise ValidationError(
+                "You have already completed this exam. Each exam can only be attempted once."
+            )
+        if not submission.started_at:
+            now = timezone.now()
+            claimed = Submission.objects.filter(
+                pk=submission.pk, started_at__isnull=True
+            ).update(started_at=now, updated_at=now)
+            if claimed:
+                submission.started_at = now
+            else:
+                submission.refresh_from_db(fields=['started_at'])
+        submission.exam_assignment = exam_assignment
+        schedule_expiry(get_current_schema(), submission)
         
-        # Fetch exam paper data (MockTest with all nested structures)
-        mock_test = exam_assignment.mock_test
-        exam_paper_data = GradingService._fetch_mock_test_structure(mock_test)
+        # Rendered exam paper (cached per MockTest version, single-flight),
+        # permuted per student when the room shuffles
+        exam_paper = get_mock_test_paper(exam_assignment.mock_test)
+        if exam_assignment.shuffle:
+            exam_paper = shuffle_paper(exam_paper, submission.id)
         
-        return submission, exam_paper_data
+        return submission, exam_paper
 
 
 class StartHomeworkService:
@@ -96,15 +125,20 @@ class StartHomeworkService:
     Handles:
     - Validation that HomeworkAssignment deadline hasn't passed
     - Validation that item belongs to the homework
-    - Creation/Resume of Submission record with status=STARTED
+    - Creation/Resume of Submission record with status=STARTED, in one
+      INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement
     """
     
+    RESOURCE_MODELS = {'mock_test': MockTest, 'quiz': Quiz}
+    
     @staticmethod
-    @transaction.atomic
     def start_homework_item(user, homework_assignment_id, item_type, item_id):
         """
         Start a homework item (MockTest or Quiz) for a user.
         
+        No transaction is held open: validation is two reads, the start-or-resume is a
+        single statement, and the paper is rendered afterwards.
+        
         Args:
             user: User instance
             homework_assignment_id: UUID of HomeworkAssignment
@@ -112,17 +146,20 @@ class StartHomeworkService:
             item_id: UUID of MockTest or Quiz
             
         Returns:
-            tuple: (submission, item_data)
+            tuple: (submission, item_data) where item_data is a RenderedPaper
             
         Raises:
             ValidationError: If validation fails
         """
+        resource_model = StartHomeworkService.RESOURCE_MODELS.get(item_type)
+        if resource_model is None:
+            raise ValidationError(f"Invalid item_type: {item_type}. Must be 'mock_test' or 'quiz'.")
+        
         # Fetch homework assignment
-        try:
-            homework = HomeworkAssignment.objects.prefetch_related(
-                'mock_tests', 'quizzes'
-            ).get(id=homework_assignment_id)
-        except HomeworkAssignment.DoesNotExist:
+        homework = HomeworkAssignment.objects.only('id', 'deadline').filter(
+            id=homework_assignment_id
+        ).first()
+        if homework is None:
             raise ValidationError("Homework assignment not found.")
         
         # Validate deadline hasn't passed
@@ -131,78 +168,90 @@ class StartHomeworkService:
                 f"Homework deadline has passed. Deadline was: {homework.deadline}"
             )
         
-        # Validate item belongs to homework
+        # Validate item belongs to homework (resource fetched through the M2M in one query)
+        resource = resource_model.objects.filter(
+            id=item_id, homework_assignments=homework
+        ).first()
         if item_type == 'mock_test':
-            if not homework.mock_tests.filter(id=item_id).exists():
-                raise ValidationError(
-                    "This MockTest is not assigned to this homework."
-                )
-            resource = MockTest.objects.get(id=item_id)
+            if resource is None:
+                raise ValidationError("This MockTest is not assigned to this homework.")
             if resource.status != MockTest.Status.PUBLISHED:
                 raise ValidationError("MockTest is not published.")
-        elif item_type == 'quiz':
-            if not homework.quizzes.filter(id=item_id).exists():
-                raise ValidationError(
-                    "This Quiz is not assigned to this homework."
-                )
-            resource = Quiz.objects.get(id=item_id)
+        else:
+            if resource is None:
+                raise ValidationError("This Quiz is not assigned to this homework.")
             if not resource.is_active:
                 raise ValidationError("Quiz is not active.")
-        else:
-            raise ValidationError(f"Invalid item_type: {item_type}. Must be 'mock_test' or 'quiz'.")
         
-        # Check if user already has a GRADED submission (locked)
-        existing_submission = Submission.objects.filter(
+        submission = Submission(
             user_id=user.id,
             homework_assignment=homework,
-            status=Submission.Status.GRADED
+            status=Submission.Status.STARTED,
+            started_at=timezone.now(),
+            **{item_type: resource}
         )
-        if item_type == 'mock_test':
-            existing_submission = existing_submission.filter(mock_test_id=item_id)
-        else:
-            existing_submission = existing_submission.filter(quiz_id=item_id)
-        
-        if existing_submission.exists():
+        if not StartHomeworkService._start_or_resume(submission, item_type):
+            # Conflicting row exists but is SUBMITTED/GRADED (locked)
             raise ValidationError(
                 "You have already submitted this item. It cannot be retaken."
             )
         
-        # Check if user has a STARTED submission (resume)
-        started_submission = Submission.objects.filter(
-            user_id=user.id,
-            homework_assignment=homework,
-            status=Submission.Status.STARTED
-        )
-        if item_type == 'mock_test':
-            started_submission = started_submission.filter(mock_test_id=item_id)
-        else:
-            started_submission = started_submission.filter(quiz_id=item_id)
-        
-        started_submission = started_submission.first()
-        
-        if started_submission:
-            # Resume existing submission
-            submission = started_submission
-            if not submission.started_at:
-                submission.started_at = timezone.now()
-                submission.save(update_fields=['started_at'])
-        else:
-            # Create new submission
-            submission = Submission.objects.create(
-                user_id=user.id,
-                homework_assignment=homework,
-                status=Submission.Status.STARTED,
-                started_at=timezone.now(),
-                **{item_type: resource}
-            )
+        schedule_expiry(get_current_schema(), submission)
         
-        # Fetch item data (without correct answers)
+        # Rendered item paper (without correct answers), outside any transaction
         if item_type == 'mock_test':
-            item_data = GradingService._fetch_mock_test_structure(resource)
+            item_data = get_mock_test_paper(resource)
         else:
-            item_data = GradingService._fetch_quiz_structure(resource)
+            item_data = get_quiz_paper(resource)
         
         return submission, item_data
+    
+    @staticmethod
+    def _start_or_resume(submission, item_type) -> bool:
+        """
+        INSERT the STARTED row, or resume the existing STARTED row for the same
+        (user, homework, item) via the partial unique constraints
+        (unique_user_homework_mocktest / unique_user_homework_quiz), stamping
+        started_at if it was never set. Fills submission from RETURNING.
+        Returns False when the existing row is already SUBMITTED/GRADED.
+        """
+        meta = Submission._meta
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        resource_column = qn(meta.get_field(item_type).column)
+        fields = meta.concrete_fields
+        values = [
+            field.get_db_prep_save(field.pre_save(submission, True), connection)
+            for field in fields
+        ]
+        sql = f"""
+            INSERT INTO {table} ({", ".join(qn(field.column) for field in fields)})
+            VALUES ({", ".join(["%s"] * len(fields))})
+            ON CONFLICT (user_id, homework_assignment_id, {resource_column})
+                WHERE homework_assignment_id IS NOT NULL AND {resource_column} IS NOT NULL
+            DO UPDATE SET
+                started_at = COALESCE({table}.started_at, EXCLUDED.started_at),
+                updated_at = EXCLUDED.updated_at
+            WHERE {table}.status = %s
+            RETURNING id, started_at, (xmax = 0) AS inserted
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*values, Submission.Status.STARTED])
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        submission_id, started_at, inserted = row
+        submission.id = submission_id
+        submission.started_at = started_at
+        submission._state.adding = False
+        submission._state.db = connection.alias
+        if inserted:
+            # A new attempt has no saved answers: skip the payload read on resume.
+            submission.payload = SubmissionPayload(submission=submission)
+            # Raw INSERT sends no post_save: index the new row for the homework's teachers.
+            from .visibility import grant_submission
+            grant_submission(submission)
+        return True
 
 
 class GradingService:
@@ -256,6 +305,24 @@ class GradingService:
             }
         }
     }
+
+    @staticmethod
+    def results_percentage(results):
+        """
+        Percentage of max score from a results dict (dashboard, exports).
+        Mock tests store no max_score, so their total is taken against the JLPT pass mark.
+        """
+        if not results or not isinstance(results, dict):
+            return None
+        total = results.get("total_score")
+        max_s = results.get("max_score")
+        if max_s and max_s > 0 and total is not None:
+            return round(float(total) / float(max_s) * 100, 2)
+        jlpt = results.get("jlpt_result") or {}
+        pass_mark = jlpt.get("pass_mark")
+        if pass_mark and pass_mark > 0 and total is not None:
+            return round(float(total) / float(pass_mark) * 100, 2)
+        return None
     
     @staticmethod
     def calculate_result_dry_run(submission, student_answers):
@@ -277,7 +344,9 @@ class GradingService:
         """
         # Determine resource type
         if submission.mock_test:
-            return GradingService._grade_mock_test(submission.mock_test, student_answers, save=False)
+            return GradingService._grade_mock_test(
+                submission.mock_test, student_answers, save=False, scale_as_of=scale_cutoff(submission),
+            )
         elif submission.quiz:
             return GradingService._grade_quiz(submission.quiz, student_answers, save=False)
         else:
@@ -288,7 +357,14 @@ class GradingService:
         """
         Grade a submission and SAVE in one atomic transaction.
         Immutability: Only STARTED submissions can be graded; once GRADED they cannot be modified.
-        CRITICAL: Creates snapshot (including correct answers) before grading for historical integrity.
+        The row is locked and its status re-checked inside the transaction, so concurrent
+        graders (student submit vs. expiry sweep) grade it once.
+        CRITICAL: Links a snapshot (including correct answers) before grading for historical integrity.
+        The snapshot is a shared, content-addressed TestSnapshot (see snapshots.py), resolved
+        outside the transaction; the submission row only stores its id.
+        Autosaved answers (see autosave.py) are merged under student_answers, so questions
+        the final payload omits keep their last saved value. In shuffled rooms the answers
+        are mapped back to canonical option order first (see shuffle.py).
         
         Args:
             submission: Submission instance
@@ -300,123 +376,239 @@ class GradingService:
         Raises:
             ValidationError: If submission is not STARTED or missing resource
         """
-        snapshot_data = GradingService.create_snapshot(submission)
+        snapshot_id = get_submission_snapshot_id(submission)
+        student_answers = canonical_answers(
+            submission, {**get_saved_answers(submission), **(student_answers or {})}
+        )
         with transaction.atomic():
+            # Lock and re-read the status: a student submit can race the expiry sweep,
+            # and grading twice would apply the mastery / item-stat updates twice.
+            current_status = Submission.objects.select_for_update().filter(
+                pk=submission.pk,
+            ).values_list("status", flat=True).first()
+            if current_status is not None:
+                submission.status = current_status
             if submission.status != Submission.Status.STARTED:
                 raise ValidationError(
                     f"Cannot grade submission with status: {submission.status}. Only STARTED submissions can be submitted."
                 )
-            if submission.mock_test:
-                results = GradingService._grade_mock_test(submission.mock_test, student_answers, save=True)
-            elif submission.quiz:
-                results = GradingService._grade_quiz(submission.quiz, student_answers, save=True)
-            elif submission.exam_assignment and submission.exam_assignment.mock_test:
-                results = GradingService._grade_mock_test(
-                    submission.exam_assignment.mock_test,
-                    student_answers,
-                    save=True,
+            results = GradingService._grade_resource(submission, student_answers)
+            GradingService._store_results(submission, student_answers, results, snapshot_id)
+            return results
+    
+    @staticmethod
+    def submit_for_grading(submission: Submission, student_answers: Dict[str, int]) -> Submission:
+        """
+        Asynchronous submit: durably record the answers, mark the submission SUBMITTED
+        with one conditional UPDATE and queue grading on the "grading" Celery queue.
+        The student is notified over WebSocket once the task marks it GRADED.
+        
+        Raises:
+            ValidationError: If the submission is no longer STARTED
+        """
+        answers = {**get_saved_answers(submission), **(student_answers or {})}
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Submission.objects.filter(
+                pk=submission.pk, status=Submission.Status.STARTED,
+            ).update(
+                status=Submission.Status.SUBMITTED,
+                completed_at=now,
+                updated_at=now,
+            )
+            if not updated:
+                raise ValidationError(
+                    "Only STARTED submissions can be submitted. This attempt is already submitted or graded."
                 )
-            else:
-                raise ValidationError("Submission has no associated resource (MockTest or Quiz).")
-            submission.answers = student_answers
-            submission.completed_at = timezone.now()
-            submission.status = Submission.Status.GRADED
-            submission.score = Decimal(str(results["total_score"]))
-            submission.results = results
-            submission.snapshot = snapshot_data
-            submission.save(update_fields=[
-                "answers", "completed_at", "status", "score", "results", "snapshot",
-            ])
+            submission.get_payload().answers = answers
+            SubmissionPayload.save_for([submission], ["answers"])
+        submission.status = Submission.Status.SUBMITTED
+        submission.completed_at = now
+        
+        schema_name = get_current_schema()
+        submission_id = str(submission.id)
+        
+        def enqueue():
+            cancel_expiry(schema_name, [submission_id])
+            from .tasks import grade_submission_task
+            try:
+                grade_submission_task.delay(schema_name, submission_id)
+            except Exception:
+                # Broker unavailable: grade in-process rather than leave it SUBMITTED.
+                logger.warning("Could not queue grading for %s; grading inline", submission_id, exc_info=True)
+                GradingService.grade_submitted(submission_id)
+        
+        transaction.on_commit(enqueue)
+        return submission
+    
+    @staticmethod
+    def grade_submitted(submission_id) -> Optional[Dict[str, Any]]:
+        """
+        Grade a SUBMITTED submission (async pipeline). Idempotent on submission id:
+        the row is locked and re-checked, so duplicate deliveries of the task are no-ops.
+        Returns the results, or None when there was nothing to grade.
+        """
+        submission = Submission.objects.select_related(
+            "exam_assignment__mock_test", "mock_test", "quiz",
+        ).filter(id=submission_id, status=Submission.Status.SUBMITTED).first()
+        if submission is None:
+            return None
+        # Resolved before taking the row lock (may serialize the test on a cold cache).
+        snapshot_id = get_submission_snapshot_id(submission)
+        with transaction.atomic():
+            locked = Submission.objects.select_for_update().filter(
+                id=submission_id, status=Submission.Status.SUBMITTED,
+            ).values_list("id", flat=True).first()
+            if locked is None:
+                return None
+            answers = SubmissionPayload.objects.filter(
+                submission_id=submission_id,
+            ).values_list("answers", flat=True).first()
+            student_answers = canonical_answers(submission, answers or {})
+            results = GradingService._grade_resource(submission, student_answers)
+            GradingService._store_results(
+                submission, student_answers, results, snapshot_id,
+                completed_at=submission.completed_at,
+            )
             return results
     
     @staticmethod
-    def _grade_mock_test(mock_test, student_answers, save=False):
+    def _grade_resource(submission, student_answers):
+        """Dispatch to MockTest (JLPT) or Quiz grading for the submission's resource."""
+        if submission.mock_test:
+            return GradingService._grade_mock_test(
+                submission.mock_test, student_answers, save=True, scale_as_of=scale_cutoff(submission),
+            )
+        if submission.quiz:
+            return GradingService._grade_quiz(submission.quiz, student_answers, save=True)
+        if submission.exam_assignment and submission.exam_assignment.mock_test:
+            return GradingService._grade_mock_test(
+                submission.exam_assignment.mock_test,
+                student_answers,
+                save=True,
+                scale_as_of=scale_cutoff(submission),
+            )
+        raise ValidationError("Submission has no associated resource (MockTest or Quiz).")
+    
+    @staticmethod
+    def _store_results(submission, student_answers, results, snapshot_id, completed_at=None):
+        """
+        Persist a graded result; status in update_fields triggers the SUBMISSION_GRADED push.
+        MockTest results also get their per-question QuestionResponse rows (item_stats.py),
+        graded answers update the student's mastery vector (mastery.py), and exam results
+        are added to the room leaderboard after commit.
+        """
+        submission.completed_at = completed_at or timezone.now()
+        submission.status = Submission.Status.GRADED
+        submission.score = Decimal(str(results["total_score"]))
+        submission.snapshot_ref_id = snapshot_id
+        submission.set_graded_payload(student_answers, results)
+        submission.save(update_fields=["completed_at", "status", "score", "snapshot_ref"])
+        SubmissionPayload.save_for([submission], SubmissionPayload.GRADED_FIELDS)
+        if results.get("resource_type") == "mock_test":
+            record_responses(submission, student_answers, submission.score)
+            record_mastery(submission, student_answers)
+        elif submission.quiz_id:
+            record_quiz_mastery(submission, results)
+        submission_id = submission.id
+        schema_name = get_current_schema()
+        exam_assignment_id = submission.exam_assignment_id
+        user_id, score = submission.user_id, submission.score
+        
+        def cleanup():
+            discard_buffered_answers(submission_id)
+            cancel_expiry(schema_name, [submission_id])
+            if exam_assignment_id:
+                record_result(schema_name, exam_assignment_id, user_id, score, results)
+        
+        transaction.on_commit(cleanup)
+    
+    @staticmethod
+    def _grade_mock_test(mock_test, student_answers, save=False, scale_as_of=None):
         """
         Grade a MockTest submission using JLPT logic.
         
+        Uses the compiled answer key (see answer_keys.py): one dictionary pass over
+        the answers, no DB queries when the key is cached. Scores are integers, so
+        section sums are exact; they are converted to Decimal only for JLPT checks.
+        
         Args:
             mock_test: MockTest instance
             student_answers: dict with format {question_uuid: selected_option_index}
             save: Whether to save results (unused, kept for API consistency)
+            scale_as_of: Cutoff selecting the IRT scale (irt.scale_cutoff); None = latest fit
             
         Returns:
-            dict: Grading results
+            dict: Grading results. total_score (and Submission.score) is always the raw
+            point sum. When the test version is calibrated, jlpt_result (pass decision,
+            section results, its total_score) is on the IRT scale, and that scaled total
+            is also recorded as results["scaled_total_score"]: it is the total the pass
+            decision was made on.
         """
-        # Fetch all questions with optimized query
-        questions = GradingService._fetch_questions(mock_test)
-        
-        # Create question lookup dict
-        question_dict = {str(q.id): q for q in questions}
+        answer_key = get_answer_key(mock_test)
         
-        # Calculate scores
-        total_score = Decimal('0.00')
-        section_scores = {}
-        section_question_results = {}
-        
-        # Initialize section tracking with ALL questions to ensure correct max_score
-        for question in questions:
-            section_id = str(question.group.section.id)
-            if section_id not in section_scores:
-                section_scores[section_id] = {
-                    'section': question.group.section,
-                    'score': Decimal('0.00'),
-                    'max_score': Decimal('0.00'),
-                    'questions': {}
-                }
-                section_question_results[section_id] = {}
-            
-            # Add question's max score to section max_score (whether answered or not)
-            section_scores[section_id]['max_score'] += Decimal(str(question.score))
+        # Initialize section tracking with ALL sections to ensure correct max_score
+        section_scores = {
+            section.section_id: {
+                "section_type": section.section_type,
+                "score": 0,
+            }
+            for section in answer_key.sections
+        }
+        section_question_results = {section.section_id: {} for section in answer_key.sections}
+        section_correct = {section.section_id: 0 for section in answer_key.sections}
         
         # Grade each answer
         for question_id_str, selected_index in student_answers.items():
-            if question_id_str not in question_dict:
+            question = answer_key.get(question_id_str)
+            if question is None:
                 # Question not found (might have been deleted)
                 continue
             
-            question = question_dict[question_id_str]
-            section_id = str(question.group.section.id)
-            
-            # Check if answer is correct
             is_correct = (
-                question.correct_option_index is not None and
-                selected_index == question.correct_option_index
+                question.correct_index is not None and
+                selected_index == question.correct_index
             )
-            
-            # Calculate score for this question
-            question_score = Decimal(str(question.score)) if is_correct else Decimal('0.00')
-            
-            # Add to section score
-            section_scores[section_id]['score'] += question_score
+            question_score = question.score if is_correct else 0
+            section_scores[question.section_id]["score"] += question_score
+            section_correct[question.section_id] += is_correct
             
             # Store question result (no correct_index / is_correct leak; student sees only correct bool + score)
-            section_question_results[section_id][question_id_str] = {
+            section_question_results[question.section_id][question_id_str] = {
                 'correct': is_correct,
                 'score': float(question_score),
                 'selected_index': selected_index,
             }
         
-        total_score = sum((s["score"] for s in section_scores.values()), Decimal("0.00"))
-        results = {
-            "total_score": float(total_score),
-            "sections": {},
-            "jlpt_result": GradingService._calculate_jlpt_result(
+        total_score = Decimal(sum(s["score"] for s in section_scores.values()))
+        scale = get_score_scale(answer_key, scale_as_of)
+        if scale is not None:
+            jlpt_result = GradingService._calculate_scaled_jlpt_result(
+                mock_test.level, scale, section_scores, section_correct, total_score,
+            )
+        else:
+            jlpt_result = GradingService._calculate_jlpt_result(
                 mock_test.level,
                 total_score,
                 section_scores,
-            ),
+            )
+        results = {
+            "total_score": float(total_score),
+            "sections": {},
+            "jlpt_result": jlpt_result,
             "resource_type": "mock_test",
         }
+        if jlpt_result.get("scaled"):
+            results["scaled_total_score"] = jlpt_result["total_score"]
         
-        for section_id, section_data in section_scores.items():
-            section = section_data["section"]
-            results["sections"][section_id] = {
-                "section_id": section_id,
+        for section in answer_key.sections:
+            results["sections"][section.section_id] = {
+                "section_id": section.section_id,
                 "section_name": section.name,
                 "section_type": section.section_type,
-                "score": float(section_data["score"]),
-                "max_score": float(section_data["max_score"]),
-                "questions": section_question_results.get(section_id, {}),
+                "score": float(section_scores[section.section_id]["score"]),
+                "max_score": float(section.max_score),
+                "questions": section_question_results[section.section_id],
             }
         return results
     
@@ -489,26 +681,11 @@ class GradingService:
         }
         return results
     
-    @staticmethod
-    def _fetch_questions(mock_test):
-        """
-        Fetch all questions for a mock test with optimized query.
-        """
-        return Question.objects.filter(
-            group__section__mock_test=mock_test
-        ).select_related(
-            'group', 'group__section'
-        ).order_by(
-            'group__section__order',
-            'group__order',
-            'order'
-        )
-    
     @staticmethod
     def _fetch_mock_test_structure(mock_test):
         """
         Fetch complete mock test structure for exam paper.
-        Used by StartExamService to return exam paper data.
+        Rendered and cached by paper_cache.get_mock_test_paper.
         Optimized with prefetch_related to avoid N+1 queries.
         """
         from apps.attempts.serializers import ExamPaperSerializer
@@ -556,52 +733,22 @@ class GradingService:
         return serializer.data
     
     @staticmethod
-    def create_snapshot(submission):
+    def _calculate_scaled_jlpt_result(level, scale, section_scores, correct_counts, raw_total_score):
         """
-        Create a complete snapshot of the MockTest/Quiz at the exact moment of grading.
-        
-        Saves the full structure (sections, groups, questions, options) including
-        correct_option_index and is_correct flags. If a teacher later deletes a question
-        or changes the correct answer, the student's historical result remains unchanged
-        because it was graded against this snapshot.
-        
-        Args:
-            submission: Submission instance (must have mock_test, quiz, or exam_assignment.mock_test)
-            
-        Returns:
-            dict: Complete snapshot with resource_type and snapshot_created_at
+        JLPT result on IRT-scaled section scores (see irt.py): each section's number
+        of correct answers is looked up in the calibrated table in force for the
+        submission, then the usual pass rules apply. raw_total_score keeps the point
+        sum; scale_id / scale_calibrated_at record which fit was used.
         """
-        from apps.attempts.serializers import (
-            FullMockTestSnapshotSerializer,
-            FullQuizSnapshotSerializer
-        )
-        
-        snapshot_data = {}
-        
-        # Determine resource type and create appropriate snapshot
-        if submission.mock_test:
-            # MockTest snapshot
-            serializer = FullMockTestSnapshotSerializer(submission.mock_test)
-            snapshot_data = json.loads(json.dumps(serializer.data, cls=DjangoJSONEncoder))
-            snapshot_data['resource_type'] = 'mock_test'
-            snapshot_data['snapshot_created_at'] = timezone.now().isoformat()
-        elif submission.quiz:
-            # Quiz snapshot
-            serializer = FullQuizSnapshotSerializer(submission.quiz)
-            snapshot_data = json.loads(json.dumps(serializer.data, cls=DjangoJSONEncoder))
-            snapshot_data['resource_type'] = 'quiz'
-            snapshot_data['snapshot_created_at'] = timezone.now().isoformat()
-        elif submission.exam_assignment and submission.exam_assignment.mock_test:
-            # Legacy exam submission
-            serializer = FullMockTestSnapshotSerializer(submission.exam_assignment.mock_test)
-            snapshot_data = json.loads(json.dumps(serializer.data, cls=DjangoJSONEncoder))
-            snapshot_data['resource_type'] = 'mock_test'
-            snapshot_data['snapshot_created_at'] = timezone.now().isoformat()
-        else:
-            raise ValidationError("Cannot create snapshot: Submission has no associated resource.")
-        
-        return snapshot_data
-    
+        scaled = scaled_section_scores(scale.tables, section_scores, correct_counts)
+        scaled_total = Decimal(sum(s["score"] for s in scaled.values()))
+        result = GradingService._calculate_jlpt_result(level, scaled_total, scaled)
+        result["scaled"] = True
+        result["raw_total_score"] = float(raw_total_score)
+        result["scale_id"] = scale.scale_id
+        result["scale_calibrated_at"] = scale.calibrated_at
+        return result
+
     @staticmethod
     def _calculate_jlpt_result(level, total_score, section_scores):
         """
@@ -635,20 +782,20 @@ class GradingService:
             reading_score = Decimal("0.00")
             listening_score = Decimal("0.00")
             for _sid, section_data in section_scores.items():
-                section = section_data["section"]
+                section_type = section_data["section_type"]
                 score = section_data["score"]
                 if not isinstance(score, Decimal):
                     score = Decimal(str(score))
-                if section.section_type == TestSection.SectionType.VOCAB:
+                if section_type == TestSection.SectionType.VOCAB:
                     lang_score += score
-                elif section.section_type == TestSection.SectionType.GRAMMAR_READING:
+                elif section_type == TestSection.SectionType.GRAMMAR_READING:
                     half = score * Decimal("0.5")
                     lang_score += half
                     reading_score += half
-                elif section.section_type == TestSection.SectionType.FULL_WRITTEN:
+                elif section_type == TestSection.SectionType.FULL_WRITTEN:
                     lang_score += score * Decimal("0.67")
                     reading_score += score * Decimal("0.33")
-                elif section.section_type == TestSection.SectionType.LISTENING:
+                elif section_type == TestSection.SectionType.LISTENING:
                     listening_score += score
             lang_min = Decimal(str(requirements["sections"]["language_knowledge"]))
             reading_min = Decimal(str(requirements["sections"]["reading"]))
@@ -676,13 +823,13 @@ class GradingService:
             lang_reading_score = Decimal("0.00")
             listening_score = Decimal("0.00")
             for _sid, section_data in section_scores.items():
-                section = section_data["section"]
+                section_type = section_data["section_type"]
                 score = section_data["score"]
                 if not isinstance(score, Decimal):
                     score = Decimal(str(score))
-                if section.section_type == TestSection.SectionType.LISTENING:
+                if section_type == TestSection.SectionType.LISTENING:
                     listening_score += score
-                elif section.section_type in (
+                elif section_type in (
                     TestSection.SectionType.VOCAB,
                     TestSection.SectionType.GRAMMAR_READING,
                 ):
@@ -0,0 +1,76 @@
+# apps/attempts/shuffle.py
+"""
+Per-student shuffled exam papers without stored copies.
+
+For rooms with ExamAssignment.shuffle, each student sees the questions of every
+question group and the options of every question in an order derived from
+SHA-256(submission id, group/question id). Nothing is stored: the shared cached
+paper (paper_cache.py) is permuted at render time, and the same seed is recomputed
+when grading.
+
+Answers arrive (and are autosaved / resumed) as indices into the displayed option
+order. Grading maps them back to the canonical order first, so GRADED rows,
+results and item statistics always hold canonical indices. Question groups keep
+their order, since mondai share reading passages and audio.
+"""
+import hashlib
+import json
+import random
+
+from .paper_cache import RenderedPaper, _render
+
+
+def _permutation(submission_id, key, n):
+    """order[d] = canonical position of the item displayed at position d."""
+    digest = hashlib.sha256(f"{submission_id}:{key}".encode("utf-8")).digest()
+    order = list(range(n))
+    random.Random(int.from_bytes(digest[:8], "big")).shuffle(order)
+    return order
+
+
+def is_shuffled(submission) -> bool:
+    return bool(submission.exam_assignment_id and submission.exam_assignment.shuffle)
+
+
+def shuffle_paper(paper: RenderedPaper, submission_id) -> RenderedPaper:
+    """Return this student's permutation of a rendered MockTest paper."""
+    data = json.loads(paper.body)
+    for section in data.get("sections") or []:
+        for group in section.get("question_groups") or []:
+            questions = group.get("questions") or []
+            order = _permutation(submission_id, f"group:{group['id']}", len(questions))
+            # Displayed numbering stays sequential; only the content moves.
+            numbering = [(q.get("question_number"), q.get("order")) for q in questions]
+            shuffled = [questions[i] for i in order]
+            for question, (number, position) in zip(shuffled, numbering):
+                question["question_number"] = number
+                question["order"] = position
+                options = question.get("options") or []
+                option_order = _permutation(submission_id, question["id"], len(options))
+                question["options"] = [options[i] for i in option_order]
+                for displayed, option in enumerate(question["options"]):
+                    # Option ids would reveal the canonical order; renumber them.
+                    if isinstance(option, dict) and "id" in option:
+                        option["id"] = displayed + 1
+            group["questions"] = shuffled
+    return _render(data)
+
+
+def to_canonical(submission_id, answer_key, answers):
+    """Map displayed option indices to canonical ones (unknown questions pass through)."""
+    canonical = {}
+    for question_id, selected_index in (answers or {}).items():
+        question = answer_key.get(question_id)
+        if question is not None and isinstance(selected_index, int) and 0 <= selected_index < question.option_count:
+            selected_index = _permutation(submission_id, question_id, question.option_count)[selected_index]
+        canonical[question_id] = selected_index
+    return canonical
+
+
+def canonical_answers(submission, answers):
+    """Answers in canonical option order for grading (no-op unless the room shuffles)."""
+    if not is_shuffled(submission):
+        return answers
+    from .answer_keys import get_answer_key
+
+    return to_canonical(submission.id, get_answer_key(submission.exam_assignment.mock_test), answers)
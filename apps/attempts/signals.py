@@ -0,0 +1,104 @@
+# apps/attempts/signals.py
+"""
+Attempt-side reactions to assignment changes.
+
+ExamAssignment -> OPEN queues room pre-provisioning (see provisioning.py) after the
+transaction commits, so assigned_groups set in the same request are visible.
+ExamAssignment OPEN -> CLOSED queues batch finalization of open attempts
+(see batch_grading.py).
+prev status comes from notifications.signals.exam_assignment_presave.
+
+New submissions and assigned_groups changes keep the teacher visibility index
+(see visibility.py) in sync.
+"""
+import logging
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from apps.core.tenant_utils import get_current_schema
+from . import visibility
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=apps.get_model("assignments", "ExamAssignment"))
+def exam_assignment_opened_provision(sender, instance, created, **kwargs):
+    if instance.status != instance.RoomStatus.OPEN:
+        return
+    if not created and getattr(instance, "_previous_status", None) == instance.RoomStatus.OPEN:
+        return
+    schema_name = get_current_schema()
+    if not schema_name or schema_name == "public":
+        return
+    exam_assignment_id = str(instance.id)
+
+    def enqueue():
+        from .tasks import provision_exam_room_task
+        try:
+            provision_exam_room_task.delay(schema_name, exam_assignment_id)
+        except Exception:
+            # Provisioning is an optimization; start-exam still works without it.
+            logger.warning("Could not queue provisioning for exam %s", exam_assignment_id, exc_info=True)
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=apps.get_model("assignments", "ExamAssignment"))
+def exam_assignment_closed_finalize(sender, instance, created, **kwargs):
+    if created or instance.status != instance.RoomStatus.CLOSED:
+        return
+    if getattr(instance, "_previous_status", None) != instance.RoomStatus.OPEN:
+        return
+    schema_name = get_current_schema()
+    if not schema_name or schema_name == "public":
+        return
+    exam_assignment_id = str(instance.id)
+
+    def enqueue():
+        from .tasks import finalize_exam_room_task
+        try:
+            finalize_exam_room_task.delay(schema_name, exam_assignment_id)
+        except Exception:
+            # The periodic auto-submit sweep still grades these attempts later.
+            logger.warning("Could not queue finalization for exam %s", exam_assignment_id, exc_info=True)
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=apps.get_model("attempts", "Submission"))
+def submission_created_grant_visibility(sender, instance, created, **kwargs):
+    if created:
+        visibility.grant_submission(instance)
+
+
+def _assigned_groups_changed(field, instance, action, reverse, pk_set):
+    if action == "post_add":
+        if reverse:
+            for assignment_id in pk_set:
+                visibility.grant_assignment(field, assignment_id, [instance.pk])
+        else:
+            visibility.grant_assignment(field, instance.pk, pk_set)
+    elif action == "post_remove":
+        if reverse:
+            for assignment_id in pk_set:
+                visibility.revoke_assignment(field, assignment_id, [instance.pk])
+        else:
+            visibility.revoke_assignment(field, instance.pk, pk_set)
+    elif action == "post_clear":
+        if reverse:
+            visibility.revoke_group(field, instance.pk)
+        else:
+            visibility.revoke_assignment(field, instance.pk)
+
+
+@receiver(m2m_changed, sender=apps.get_model("assignments", "ExamAssignment").assigned_groups.through)
+def exam_assignment_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _assigned_groups_changed("exam_assignment", instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=apps.get_model("assignments", "HomeworkAssignment").assigned_groups.through)
+def homework_assignment_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _assigned_groups_changed("homework_assignment", instance, action, reverse, pk_set)
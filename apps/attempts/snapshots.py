@@ -0,0 +1,121 @@
+# apps/attempts/snapshots.py
+"""
+Content-addressed snapshot store.
+
+Instead of serializing the whole MockTest/Quiz into every Submission, a snapshot is
+built once per content (prefetched, one serializer pass), hashed (SHA-256 of the
+canonical JSON) and stored as a TestSnapshot row. Submissions only hold a reference.
+
+For PUBLISHED MockTests the (MockTest id, content_version) -> snapshot id mapping is
+cached, so grading normally resolves the snapshot without touching the test tree.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from apps.core.cache_utils import tenant_cache_key
+from apps.mock_tests.models import MockTest, TestSection, QuestionGroup, Question, Quiz, QuizQuestion
+from .models import TestSnapshot
+
+SNAPSHOT_CACHE_PREFIX = "attempts:snapshot"
+SNAPSHOT_CACHE_TTL = getattr(settings, "SNAPSHOT_CACHE_TTL", 60 * 60 * 24)
+
+
+def _without_url_signatures(value):
+    """Drop query strings from signed media URLs; they change on every serialization."""
+    if isinstance(value, dict):
+        return {k: _without_url_signatures(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_without_url_signatures(v) for v in value]
+    if isinstance(value, str) and value.startswith(("http://", "https://", "/")) and "?" in value:
+        return value.split("?", 1)[0]
+    return value
+
+
+def _content_hash(data):
+    canonical = json.dumps(
+        _without_url_signatures(data), cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _serialize_mock_test(mock_test):
+    from apps.attempts.serializers import FullMockTestSnapshotSerializer
+
+    mock_test = MockTest.objects.prefetch_related(
+        Prefetch(
+            "sections",
+            queryset=TestSection.objects.order_by("order").prefetch_related(
+                Prefetch(
+                    "question_groups",
+                    queryset=QuestionGroup.objects.order_by("order").prefetch_related(
+                        Prefetch("questions", queryset=Question.objects.order_by("order"))
+                    ),
+                )
+            ),
+        )
+    ).get(id=mock_test.id)
+    data = dict(FullMockTestSnapshotSerializer(mock_test).data)
+    data["resource_type"] = TestSnapshot.ResourceType.MOCK_TEST.value
+    return data
+
+
+def _serialize_quiz(quiz):
+    from apps.attempts.serializers import FullQuizSnapshotSerializer
+
+    quiz = Quiz.objects.prefetch_related(
+        Prefetch("questions", queryset=QuizQuestion.objects.order_by("order"))
+    ).get(id=quiz.id)
+    data = dict(FullQuizSnapshotSerializer(quiz).data)
+    data["resource_type"] = TestSnapshot.ResourceType.QUIZ.value
+    return data
+
+
+def _store(resource_type, resource_id, data):
+    snapshot, _created = TestSnapshot.objects.get_or_create(
+        content_hash=_content_hash(data),
+        defaults={
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "data": data,
+        },
+    )
+    return snapshot
+
+
+def get_mock_test_snapshot_id(mock_test):
+    """Return the TestSnapshot id for mock_test's current content, building it at most once per version."""
+    cacheable = mock_test.status == MockTest.Status.PUBLISHED
+    key = tenant_cache_key(SNAPSHOT_CACHE_PREFIX, mock_test.id, f"v{mock_test.content_version}")
+    if cacheable:
+        snapshot_id = cache.get(key)
+        if snapshot_id is not None:
+            return snapshot_id
+    snapshot = _store(
+        TestSnapshot.ResourceType.MOCK_TEST, mock_test.id, _serialize_mock_test(mock_test)
+    )
+    if cacheable:
+        cache.set(key, snapshot.id, SNAPSHOT_CACHE_TTL)
+    return snapshot.id
+
+
+def get_quiz_snapshot_id(quiz):
+    """Quizzes carry no content version; they are small, so serialize and dedupe by hash."""
+    snapshot = _store(TestSnapshot.ResourceType.QUIZ, quiz.id, _serialize_quiz(quiz))
+    return snapshot.id
+
+
+def get_submission_snapshot_id(submission):
+    """Resolve the snapshot id for the resource a submission is graded against."""
+    if submission.mock_test:
+        return get_mock_test_snapshot_id(submission.mock_test)
+    if submission.quiz:
+        return get_quiz_snapshot_id(submission.quiz)
+    if submission.exam_assignment and submission.exam_assignment.mock_test:
+        return get_mock_test_snapshot_id(submission.exam_assignment.mock_test)
+    raise ValidationError("Cannot create snapshot: Submission has no associated resource.")
@@ -56,6 +56,14 @@ JLPT SCORING ENGINE (RESULTS JSON)
 - **N1–N3:** 3 sections — Language Knowledge, Reading, Listening (min 19 each)
 - **N4–N5:** 2 sections — Language+Reading combined (min 38), Listening (min 19)
 - **PASS** requires both `total_passed` and `all_sections_passed`
+- Once a published test version has been calibrated (2PL IRT on past responses), `jlpt_result`
+  uses **scaled** section scores looked up by number of correct answers per section; it then
+  carries `scaled: true` and `raw_total_score` (the point sum, also in `total_score`), plus
+  `scale_id` / `scale_calibrated_at` of the fit used. Scales are frozen per room: a room is
+  graded (and re-graded) on the latest fit calibrated before the room was created.
+- Which total is which: `results.total_score` and the submission `score` (leaderboard, exports)
+  are always the raw point sum; the pass decision is made on `jlpt_result.total_score`, which for
+  scaled results is also recorded as `results.scaled_total_score`.
 
 ================================================================================
 RACE-CONDITION PROTECTION & SINGLE ATTEMPT GUARANTEE
@@ -71,6 +79,7 @@ AUTO-SUBMIT GRACE PERIOD (SERVER-SIDE)
 ================================================================================
 
 - After the deadline, the server allows a **10-minute grace period** before auto-submit locks.
+- Expired attempts are auto-submitted within seconds of the grace period ending.
 - After grace ends, submissions are locked and return 400 if attempted.
 
 ================================================================================
@@ -79,6 +88,64 @@ PERFORMANCE NOTES
 
 - List view batch-fetches student names via **user_map** (public schema) to avoid N+1.
 - `time_taken_seconds` = completed_at − started_at (dashboard).
+- MockTest grading uses a **compiled answer key** (question → correct index, score, section)
+  cached per (MockTest, content_version) in-process and in Redis; publish/unpublish bumps the
+  version. Grading a published test is a single dictionary pass with no DB queries.
+- Submission snapshots are **content-addressed**: identical test content is serialized once into a
+  shared TestSnapshot row (SHA-256 of the canonical JSON); submissions store only a reference.
+- `start-exam` / `homework-start` serve the exam paper from a rendered-bytes cache per
+  (MockTest, content_version); only one worker renders it when a room opens (single-flight).
+  The response carries an **ETag** for the paper. Cache TTL stays below the signed media URL expiry.
+- When a room switches to OPEN, a background task pre-creates every student's submission
+  (started_at = null) and warms the caches; `start-exam` then only sets `started_at`.
+  Such not-yet-started rows are hidden from submission lists.
+- `autosave` writes to a Redis hash per submission; a Celery beat task flushes dirty
+  submissions to Postgres every 30s with one bulk UPDATE per tenant.
+- `regrade-exam` and room close (OPEN → CLOSED) grade a whole room at once: answers become a
+  NumPy students × questions matrix compared against the key vector, section totals use a
+  segment reduction, JLPT rules are applied column-wise, and rows are saved with bulk_update.
+- Attempt expiry uses a Redis sorted set of deadlines (started_at + duration + grace) across
+  all tenants; a sweeper pops only due entries every 15s. An hourly tenant-aware sweep reconciles.
+- Grading a MockTest also writes one QuestionResponse row per question (bulk insert); a beat task
+  folds new rows into ItemStatistic with GROUP BY sums, so item analysis is one indexed read.
+- With ATTEMPTS_COMPACT_STORAGE, graded MockTest answers are stored as one byte per question and
+  results as section totals + a correctness bitset; `results` is decoded against the snapshot and
+  has the same shape as before.
+- Each exam room keeps a Redis sorted set of scores plus score histograms, updated when a result is
+  graded: `my-results` rank/percentile and `room-summary` are O(log n) lookups, not row sorts.
+- Teachers' submission list and object permission use a denormalized (submission, group)
+  visibility table kept in sync on submission create and assigned_groups changes: one indexed
+  semi-join instead of two M2M joins + DISTINCT.
+- `export` streams CSV rows from a server-side cursor, resolving student names once per 500-row
+  chunk, instead of paging the list endpoint.
+- List/retrieve accept `fields=` / `exclude=`; the selection maps to QuerySet.only(), and the
+  payload table is joined only when `results` is requested. The list omits `results` by default.
+- `homework-start` starts or resumes with one INSERT … ON CONFLICT DO UPDATE … RETURNING on the
+  (user, homework, item) unique constraint; no transaction is held while the paper is rendered.
+- Rooms with `shuffle` give each student a seeded question/option order applied on top of the
+  shared cached paper (no stored copies). Answers use displayed indices; grading maps them back.
+- After a room is finalized, a task screens it for copied answers: pairwise identical-wrong-answer
+  counts come from a few NumPy matrix products over the students × questions answer matrix, and
+  outlying pairs are stored as CollusionFlag rows (`collusion-flags`) for review.
+- Scaled scoring: an hourly task fits 2PL item parameters per published test with vectorized
+  EM (quadrature E-step as one matrix product, Newton M-step for all items at once) and stores a
+  raw → scaled table per section; grading does one table lookup per section.
+- Grading also folds each student's per-skill (section type / mondai) correct and attempt counts
+  into a decayed mastery vector with one upsert; adaptive practice quizzes are scored from that
+  cached vector and a cached per-level question pool, without reading submission history.
+- `telemetry` appends each batch of timing events to a Redis stream (one XADD, attempt context
+  cached); a beat task COPYs them into an append-only per-tenant table. Submissions are not written.
+- `submit-exam` / `submit-homework` honour an `Idempotency-Key` header: retries are answered from a
+  stored response (one cache read) instead of re-entering grading; in-flight duplicates wait for it.
+- `start-exam` passes a waiting room first (ATTEMPTS_ADMISSION_ENABLED): one Lua call takes a token
+  from a per-tenant and a per-room Redis bucket before any query; students over the rate get 429 with
+  their queue position and Retry-After, so a room opening at once reaches Postgres at a steady rate.
+- answers, results and the legacy inline snapshot live in a 1:1 SubmissionPayload table; the
+  submissions row keeps ids, status, timestamps and score, so status filters, lists and sweeps scan a
+  narrow table. Endpoints that need the payload join it explicitly (select_related("payload")).
+- With ATTEMPTS_ARCHIVE_AFTER_DAYS, a daily task moves payloads of long-graded submissions to
+  zstd-compressed objects on the storage backend; reading such a result fetches and decodes the
+  object once per process (small LRU), with the same response shape.
 """
 from drf_spectacular.utils import (
     OpenApiExample,
@@ -160,8 +227,9 @@ ANSWERS_DESCRIPTION = "Object: question UUID (string) -> selected option index (
 
 RESULTS_SCHEMA_DESCRIPTION = (
     "Results JSON schema for frontend charts: "
-    "MockTest: {total_score, sections{section_id:{section_name, section_type, score, max_score, questions}}, "
-    "jlpt_result{level, pass_mark, passed, section_results, total_passed, all_sections_passed}, resource_type}. "
+    "MockTest: {total_score, [scaled_total_score, ]sections{section_id:{section_name, section_type, score, max_score, questions}}, "
+    "jlpt_result{level, pass_mark, passed, section_results, total_passed, all_sections_passed"
+    "[, scaled, raw_total_score, scale_id, scale_calibrated_at]}, resource_type}. "
     "Quiz: {total_score, max_score, correct_count, total_count, percentage, questions, resource_type}."
 )
 
@@ -217,6 +285,29 @@ RESULTS_JLPT_EXAMPLE = {
     "resource_type": "mock_test",
 }
 
+PROJECTION_PARAMETERS = [
+    OpenApiParameter(
+        name="fields", type=str, required=False,
+        description="Comma-separated fields to return (e.g. `id,status,score`). Only those columns are loaded.",
+    ),
+    OpenApiParameter(
+        name="exclude", type=str, required=False,
+        description="Comma-separated fields to leave out (e.g. `results`).",
+    ),
+]
+
+IDEMPOTENCY_PARAMETERS = [
+    OpenApiParameter(
+        name="Idempotency-Key", type=str, location=OpenApiParameter.HEADER, required=False,
+        description=(
+            "Client-generated unique key (max 255 chars) to retry safely. The first response is "
+            "stored for 10 minutes and replayed byte-for-byte to retries (header "
+            "`Idempotent-Replayed: true`); a duplicate sent while the first is running waits for it. "
+            "Same key with a different body → 422; still running after 10s → 409 with Retry-After."
+        ),
+    ),
+]
+
 submission_viewset_schema = extend_schema_view(
     create=extend_schema(exclude=True),
     list=extend_schema(
@@ -224,12 +315,15 @@ submission_viewset_schema = extend_schema_view(
         summary="List submissions",
         description=(
             "CENTER_ADMIN: all. TEACHER: submissions for groups they teach. "
-            "STUDENT/GUEST: own only. **Performance:** student_display is batch-fetched via user_map (public schema)."
+            "STUDENT/GUEST: own only. **Performance:** student_display is batch-fetched via user_map (public schema). "
+            "Returns a summary by default: `results` is omitted unless requested with `fields=` "
+            "(e.g. `?fields=id,status,score,results`)."
         ),
         parameters=[
             OpenApiParameter(name="exam_assignment_id", type=str, ),
             OpenApiParameter(name="homework_assignment_id", type=str, ),
             OpenApiParameter(name="ordering", type=str),
+            *PROJECTION_PARAMETERS,
         ],
         responses={200: SubmissionSerializer(many=True), 401: RESP_401, 403: RESP_403},
     ),
@@ -238,8 +332,9 @@ submission_viewset_schema = extend_schema_view(
         summary="Get submission",
         description=(
             "Retrieve a submission. **Security isolation:** students/guests can only access their own submissions; "
-            "cross-center access is forbidden."
+            "cross-center access is forbidden. Supports `fields=` / `exclude=`."
         ),
+        parameters=PROJECTION_PARAMETERS,
         responses={200: SubmissionSerializer, 401: RESP_401, 403: RESP_403, 404: RESP_404},
     ),
     update=extend_schema(
@@ -268,7 +363,10 @@ submission_viewset_schema = extend_schema_view(
             "without correct_option_index or is_correct). Only STUDENT/GUEST. "
             "**ExamAssignment.status must be OPEN** (enforced by CanStartExam). "
             "**Race-safe:** one attempt per user; if already STARTED, the existing attempt is resumed; "
-            "if already SUBMITTED/GRADED, returns 400."
+            "if already SUBMITTED/GRADED, returns 400. "
+            "**Shuffled rooms** (`ExamAssignment.shuffle`): questions within each group and the options "
+            "of each question come in a per-student order (stable across resumes); answers and "
+            "`saved_answers` use the displayed option indices."
         ),
         request={
             "application/json": {
@@ -286,6 +384,7 @@ submission_viewset_schema = extend_schema_view(
                         value={
                             "submission_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
                             "started_at": "2025-01-29T10:00:00Z",
+                            "saved_answers": {},
                             "exam_paper": {
                                 "id": "550e8400-e29b-41d4-a716-446655440000",
                                 "title": "JLPT N5 Mock",
@@ -304,6 +403,28 @@ submission_viewset_schema = extend_schema_view(
             400: RESP_400,
             401: RESP_401,
             403: RESP_403,
+            429: OpenApiResponse(
+                description=(
+                    "Waiting room: too many students are starting right now. Retry after the "
+                    "`Retry-After` header (seconds); `queue_position` is 0-based and keeps its place "
+                    "while the client keeps retrying."
+                ),
+                examples=[
+                    OpenApiExample(
+                        "Queued",
+                        value={
+                            "error": {
+                                "detail": "The exam room is busy. Please retry shortly.",
+                                "queue_position": 57,
+                                "retry_after": 3,
+                            },
+                            "message": "An error occurred",
+                            "status_code": 429,
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
         },
         examples=[
             OpenApiExample(
@@ -319,8 +440,12 @@ submission_viewset_schema = extend_schema_view(
         description=(
             "Submit exam answers. Only **STARTED** submissions; once submitted status becomes "
             "**GRADED** (immutable). Re-submit on GRADED returns 400. Grading is atomic. "
+            "When `ATTEMPTS_ASYNC_GRADING` is enabled the answers are recorded, status becomes "
+            "**SUBMITTED** and the endpoint returns **202**; grading runs on the `grading` Celery "
+            "queue and the student receives a SUBMISSION_GRADED WebSocket notification. "
             "**Security:** students can submit only their own submissions; cross-center rejected (403)."
         ),
+        parameters=IDEMPOTENCY_PARAMETERS,
         request={
             "application/json": {
                 "type": "object",
@@ -351,6 +476,9 @@ submission_viewset_schema = extend_schema_view(
                     ),
                 ],
             ),
+            202: OpenApiResponse(
+                description="Async mode: answers recorded (SUBMITTED); grading queued.",
+            ),
             400: RESP_400,
             401: RESP_401,
             403: RESP_403,
@@ -363,12 +491,345 @@ submission_viewset_schema = extend_schema_view(
             ),
         ],
     ),
+    autosave=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Autosave answers",
+        description=(
+            "Save one or more answers of a **STARTED** submission (exam or homework) while the "
+            "student works. Answers are buffered in Redis and flushed to the database in batches; "
+            "they are merged into the final answers at submit time and returned as `saved_answers` "
+            "when the attempt is resumed. Only the owner may autosave."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "required": ["submission_id", "answers"],
+                "properties": {
+                    "submission_id": {"type": "string", "format": "uuid"},
+                    "answers": {
+                        "type": "object",
+                        "additionalProperties": {"type": "integer"},
+                        "description": "Changed answers only. " + ANSWERS_DESCRIPTION,
+                    },
+                },
+            }
+        },
+        responses={
+            200: OpenApiResponse(
+                description="Answers saved.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={"submission_id": "uuid", "saved": 2},
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    regrade_exam=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Regrade exam room",
+        description=(
+            "Re-grade every **GRADED** submission of an exam assignment against the current "
+            "answer key (e.g. after a wrong key was fixed and the test re-published). All answers "
+            "are graded in one vectorized pass and written back in bulk. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "required": ["exam_assignment_id"],
+                "properties": {"exam_assignment_id": {"type": "string", "format": "uuid"}},
+            }
+        },
+        responses={
+            200: OpenApiResponse(
+                description="Regrade summary.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={
+                            "exam_assignment_id": "uuid",
+                            "regraded": 32,
+                            "changed": 5,
+                            "passed": 21,
+                            "message": "Exam regraded against the current answer key.",
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    export=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Export results (CSV / XLSX)",
+        description=(
+            "Stream a gradebook for one exam room (`exam_assignment_id`) or homework "
+            "(`homework_assignment_id`): one row per started submission with student name and email, "
+            "status, times, score, per-section scores, JLPT scoring-section scores and pass flags. "
+            "Rows are read with a server-side cursor and names resolved per chunk, so memory use does "
+            "not grow with room size. `file_format=xlsx` requires openpyxl on the server. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the assignment is assigned to."
+        ),
+        parameters=[
+            OpenApiParameter(name="exam_assignment_id", type=str, required=False),
+            OpenApiParameter(name="homework_assignment_id", type=str, required=False),
+            OpenApiParameter(
+                name="file_format", type=str, required=False, enum=["csv", "xlsx"],
+                description="Default: csv",
+            ),
+        ],
+        responses={
+            (200, "text/csv"): OpenApiResponse(description="CSV attachment (UTF-8 with BOM)."),
+            (200, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"): OpenApiResponse(
+                description="XLSX attachment."
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    room_summary=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Exam room summary",
+        description=(
+            "Score overview of an exam room: graded count, average score, the score distribution "
+            "(total in 10-point buckets, each JLPT scoring section in 5-point buckets) and the top 10 "
+            "students. Served from the room leaderboard, not by sorting submissions. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        parameters=[OpenApiParameter(name="exam_assignment_id", type=str, required=True)],
+        responses={
+            200: OpenApiResponse(
+                description="Room summary.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={
+                            "exam_assignment_id": "uuid",
+                            "is_published": False,
+                            "graded_count": 32,
+                            "average_score": 104.25,
+                            "distribution": {
+                                "total": [{"from": 90, "to": 100, "count": 6}, {"from": 100, "to": 110, "count": 9}],
+                                "listening": [{"from": 30, "to": 35, "count": 11}],
+                            },
+                            "top": [
+                                {"rank": 1, "user_id": 17, "score": 161.0, "student_display": "Aiko Tanaka"},
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    telemetry=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Report question timing events",
+        description=(
+            "Batch of client events for the student's own STARTED attempt (max 200 per request): "
+            "`view` (question shown), `change` (answer changed), `dwell` (time on question, "
+            "`duration_ms`). `at` is the client time in epoch milliseconds (optional). Events are "
+            "queued and stored within seconds; they are used for per-question timing statistics "
+            "(GET /mock-tests/{id}/question-timing/). **Access:** STUDENT, GUEST."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "submission_id": {"type": "string", "format": "uuid"},
+                    "events": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {"type": "string", "enum": ["view", "change", "dwell"]},
+                                "question_id": {"type": "string", "format": "uuid"},
+                                "duration_ms": {"type": "integer"},
+                                "at": {"type": "integer"},
+                            },
+                            "required": ["type", "question_id"],
+                        },
+                    },
+                },
+                "required": ["submission_id", "events"],
+            }
+        },
+        responses={
+            202: OpenApiResponse(
+                description="Events accepted.",
+                examples=[OpenApiExample("Accepted", value={"accepted": 12}, response_only=True)],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    collusion_scan=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Screen exam room for answer similarity",
+        description=(
+            "Re-run answer-similarity screening for a room (it also runs automatically after the room "
+            "is finalized). For every pair of graded submissions the number of identical wrong answers "
+            "is computed; pairs that are outliers for the room (z-score ≥ 4 and at least 5 shared wrong "
+            "answers) replace the room's PENDING flags. Reviewed flags are kept. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {"exam_assignment_id": {"type": "string", "format": "uuid"}},
+                "required": ["exam_assignment_id"],
+            }
+        },
+        responses={
+            200: OpenApiResponse(
+                description="Number of flagged pairs.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={"exam_assignment_id": "uuid", "flagged_pairs": 2},
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    collusion_flags=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Answer-similarity flags of an exam room",
+        description=(
+            "Flagged submission pairs of a room, most extreme first. `shared_wrong`: questions both "
+            "answered with the same wrong option; `both_wrong`: questions both answered wrongly; "
+            "`z_score`: shared_wrong relative to all pairs of the room. Flags are for review only "
+            "and never change grades. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        parameters=[
+            OpenApiParameter(name="exam_assignment_id", type=str, required=True),
+            OpenApiParameter(
+                name="status", type=str, required=False, enum=["PENDING", "DISMISSED", "CONFIRMED"],
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Flags.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={
+                            "exam_assignment_id": "uuid",
+                            "flags": [
+                                {
+                                    "id": 1,
+                                    "submission_a": {
+                                        "submission_id": "uuid", "user_id": 17,
+                                        "student_display": "Aiko Tanaka", "score": 98.0,
+                                    },
+                                    "submission_b": {
+                                        "submission_id": "uuid", "user_id": 23,
+                                        "student_display": "Kenji Sato", "score": 101.0,
+                                    },
+                                    "shared_wrong": 14,
+                                    "both_wrong": 16,
+                                    "z_score": 6.8,
+                                    "status": "PENDING",
+                                },
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    collusion_review=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Review an answer-similarity flag",
+        description=(
+            "Mark a flag DISMISSED or CONFIRMED (or back to PENDING). Reviewed flags survive re-screening. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "flag_id": {"type": "integer"},
+                    "status": {"type": "string", "enum": ["PENDING", "DISMISSED", "CONFIRMED"]},
+                },
+                "required": ["flag_id", "status"],
+            }
+        },
+        responses={
+            200: OpenApiResponse(description="Updated flag status."),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
+    admission_metrics=extend_schema(
+        tags=["Submissions – Exam"],
+        summary="Start-exam waiting room metrics",
+        description=(
+            "Admitted / rejected start counters (last 24h of activity), current queue length and "
+            "available start tokens for the room and for the whole center. `available` is false "
+            "when the server has no Redis. "
+            "**Access:** CENTER_ADMIN, or TEACHER of a group the exam is assigned to."
+        ),
+        parameters=[OpenApiParameter(name="exam_assignment_id", type=str, required=True)],
+        responses={
+            200: OpenApiResponse(
+                description="Admission metrics.",
+                examples=[
+                    OpenApiExample(
+                        "Success",
+                        value={
+                            "exam_assignment_id": "uuid",
+                            "enabled": True,
+                            "tenant_rate": 50.0,
+                            "tenant_burst": 100,
+                            "room_rate": 20.0,
+                            "room_burst": 40,
+                            "available": True,
+                            "queue_length": 12,
+                            "room": {"admitted": 188, "rejected": 342, "tokens": 0.4},
+                            "tenant": {"admitted": 240, "rejected": 342, "tokens": 61.2},
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
     my_results=extend_schema(
         tags=["Submissions – Exam"],
         summary="My exam results",
         description=(
             "GET student's own exam result. Only if **ExamAssignment.is_published** is True. "
             "Includes time_taken_seconds (completed_at − started_at) and percentage for dashboard. "
+            "`ranking` gives the student's rank in the exam room (equal scores share a rank), "
+            "the room size and the percentile (share of the room scoring lower, ties counted half). "
             f"{RESULTS_SCHEMA_DESCRIPTION}"
         ),
         parameters=[OpenApiParameter(name="exam_assignment_id", type=str, required=True)],
@@ -388,6 +849,7 @@ submission_viewset_schema = extend_schema_view(
                                 "time_taken_seconds": 3600,
                                 "percentage": 62.22,
                             },
+                            "ranking": {"rank": 4, "out_of": 32, "percentile": 87.5},
                             "is_published": True,
                         },
                         response_only=True,
@@ -427,6 +889,7 @@ submission_viewset_schema = extend_schema_view(
                         value={
                             "submission_id": "uuid",
                             "started_at": "2025-01-29T10:00:00Z",
+                            "saved_answers": {},
                             "item_data": {"id": "uuid", "title": "JLPT N5 Mock", "sections": []},
                             "item_type": "mock_test",
                             "message": "Homework item started successfully.",
@@ -512,6 +975,7 @@ submission_viewset_schema = extend_schema_view(
             "**Grace period:** 10 minutes after deadline before auto-submit lock. "
             f"{RESULTS_SCHEMA_DESCRIPTION}"
         ),
+        parameters=IDEMPOTENCY_PARAMETERS,
         request={
             "application/json": {
                 "type": "object",
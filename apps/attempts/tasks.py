@@ -1,14 +1,24 @@
 # apps/attempts/tasks.py
 from datetime import timedelta
 
+import logging
+
 from celery import shared_task
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from apps.core.tenant_utils import get_current_schema, schema_context, with_public_schema
+
 from .models import Submission
 from .services import GradingService
+from .timers import GRACE_PERIOD_MINUTES
+
 
+logger = logging.getLogger(__name__)
 
-GRACE_PERIOD_MINUTES = 10
+# Async-submitted attempts still SUBMITTED after this long are re-queued for grading.
+STALE_SUBMITTED_MINUTES = 10
 
 
 def _get_duration_minutes(submission: Submission):
@@ -21,13 +31,66 @@ def _get_duration_minutes(submission: Submission):
 	return None
 
 
+def _tenant_schema_names():
+	"""Schema names of active centers (read from the public schema)."""
+	from apps.centers.models import Center
+
+	# Center.is_active is a property over status (it shadows the old column), not a filterable field.
+	return with_public_schema(
+		lambda: list(
+			Center.objects.filter(status=Center.Status.ACTIVE, deleted_at__isnull=True)
+			.exclude(schema_name__isnull=True)
+			.exclude(schema_name="")
+			.values_list("schema_name", flat=True)
+		)
+	)
+
+
+def _expire_submission(submission):
+	"""Hand an expired STARTED attempt to grading (async queue when enabled)."""
+	if settings.ATTEMPTS_ASYNC_GRADING:
+		GradingService.submit_for_grading(submission, {})
+	else:
+		GradingService.grade_submission(submission, {})
+
+
 @shared_task
-def auto_submit_stuck_submissions():
+def expire_due_submissions():
 	"""
-	Auto-submit submissions stuck in STARTED beyond duration + grace period.
-	Runs periodically (scheduled in Celery Beat).
+	Grade attempts whose timer is due (see timers.py). Runs every few seconds;
+	cost is proportional to the number of expired attempts across all tenants.
 	"""
-	now = timezone.now()
+	from .timers import pop_due, retry_later
+
+	expired = 0
+	for schema_name, submission_ids in pop_due().items():
+		failed = []
+		try:
+			with schema_context(schema_name):
+				submissions = Submission.objects.select_related(
+					"exam_assignment__mock_test",
+					"homework_assignment",
+					"mock_test",
+					"quiz",
+				).filter(id__in=submission_ids, status=Submission.Status.STARTED)
+				for submission in submissions:
+					try:
+						_expire_submission(submission)
+						expired += 1
+					except ValidationError:
+						# Submitted by the student in the meantime.
+						continue
+					except Exception:
+						logger.exception("Expiry grading failed for %s in %s", submission.id, schema_name)
+						failed.append(str(submission.id))
+		except Exception:
+			logger.exception("Expiry sweep failed for schema %s", schema_name)
+			failed = submission_ids
+		retry_later(schema_name, failed)
+	return expired
+
+
+def _auto_submit_in_schema(now):
 	submissions = Submission.objects.select_related(
 		"exam_assignment__mock_test",
 		"homework_assignment",
@@ -40,6 +103,7 @@ def auto_submit_stuck_submissions():
 	).filter(
 		status=Submission.Status.STARTED,
 		started_at__isnull=False,
+		started_at__lte=now - timedelta(minutes=GRACE_PERIOD_MINUTES),
 	)
 
 	for submission in submissions:
@@ -51,6 +115,222 @@ def auto_submit_stuck_submissions():
 		)
 		if cutoff <= now:
 			try:
-				GradingService.grade_submission(submission, {})
+				_expire_submission(submission)
 			except Exception:
-				continue
\ No newline at end of file
+				continue
+
+	if settings.ATTEMPTS_ASYNC_GRADING:
+		stale_ids = Submission.objects.filter(
+			status=Submission.Status.SUBMITTED,
+			completed_at__lte=now - timedelta(minutes=STALE_SUBMITTED_MINUTES),
+		).values_list("id", flat=True)
+		schema_name = get_current_schema()
+		for submission_id in stale_ids:
+			grade_submission_task.delay(schema_name, str(submission_id))
+
+
+@shared_task
+def auto_submit_stuck_submissions():
+	"""
+	Reconciliation sweep: auto-submit submissions stuck in STARTED beyond duration +
+	grace period in every tenant schema, and re-queue async submissions whose grading
+	task was lost. Expiry normally happens within seconds via expire_due_submissions;
+	this catches attempts without a timer (no Redis, lost entries, older rows).
+	Runs periodically (scheduled in Celery Beat).
+	"""
+	now = timezone.now()
+	for schema_name in _tenant_schema_names():
+		try:
+			with schema_context(schema_name):
+				_auto_submit_in_schema(now)
+		except Exception:
+			logger.exception("Auto-submit sweep failed for schema %s", schema_name)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=5)
+def provision_exam_room_task(self, schema_name, exam_assignment_id):
+	"""
+	Pre-create Submission rows and warm caches when an exam room opens.
+	Queued from the ExamAssignment post_save signal after commit.
+	"""
+	from apps.assignments.models import ExamAssignment
+	from .provisioning import provision_exam_room
+
+	with schema_context(schema_name):
+		try:
+			exam_assignment = ExamAssignment.objects.select_related("mock_test").get(
+				id=exam_assignment_id
+			)
+		except ExamAssignment.DoesNotExist:
+			return 0
+		try:
+			return provision_exam_room(exam_assignment)
+		except Exception as exc:
+			logger.exception("Provisioning failed for exam %s in %s", exam_assignment_id, schema_name)
+			raise self.retry(exc=exc)
+
+
+@shared_task
+def flush_autosaved_answers():
+	"""
+	Persist buffered autosave answers (Redis) to SubmissionPayload.answers in batches.
+	Runs periodically (scheduled in Celery Beat).
+	"""
+	from .autosave import flush_dirty_answers
+
+	return flush_dirty_answers()
+
+
+@shared_task(bind=True, acks_late=True, max_retries=5, default_retry_delay=10)
+def grade_submission_task(self, schema_name, submission_id):
+	"""
+	Grade one SUBMITTED submission (async submit-exam). Routed to the "grading" queue.
+	Safe to deliver more than once: GradingService.grade_submitted is idempotent.
+	"""
+	with schema_context(schema_name):
+		try:
+			results = GradingService.grade_submitted(submission_id)
+		except Exception as exc:
+			logger.exception("Grading failed for submission %s in %s", submission_id, schema_name)
+			raise self.retry(exc=exc)
+	return bool(results)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def finalize_exam_room_task(self, schema_name, exam_assignment_id):
+	"""
+	Batch-grade all open attempts when an exam room closes (see batch_grading.py).
+	Queued from the ExamAssignment post_save signal after commit.
+	"""
+	from apps.assignments.models import ExamAssignment
+	from .batch_grading import finalize_exam_room
+
+	with schema_context(schema_name):
+		try:
+			exam_assignment = ExamAssignment.objects.select_related("mock_test").get(
+				id=exam_assignment_id
+			)
+		except ExamAssignment.DoesNotExist:
+			return 0
+		try:
+			graded = finalize_exam_room(exam_assignment)
+		except Exception as exc:
+			logger.exception("Room finalization failed for exam %s in %s", exam_assignment_id, schema_name)
+			raise self.retry(exc=exc)
+	# Every attempt is graded now: screen the room for copied answers.
+	detect_collusion_task.delay(schema_name, exam_assignment_id)
+	return graded
+
+
+@shared_task
+def detect_collusion_task(schema_name, exam_assignment_id):
+	"""
+	Screen a finalized exam room for answer-similarity outliers (see collusion.py).
+	Queued after room finalization; can also be run on demand.
+	"""
+	from apps.assignments.models import ExamAssignment
+	from .collusion import detect_collusion
+
+	with schema_context(schema_name):
+		try:
+			exam_assignment = ExamAssignment.objects.select_related("mock_test").get(
+				id=exam_assignment_id
+			)
+		except ExamAssignment.DoesNotExist:
+			return 0
+		try:
+			return detect_collusion(exam_assignment)
+		except Exception:
+			logger.exception("Collusion screening failed for exam %s in %s", exam_assignment_id, schema_name)
+			return 0
+
+
+@shared_task
+def aggregate_item_statistics():
+	"""
+	Fold new QuestionResponse rows into ItemStatistic in every tenant schema.
+	Runs periodically (scheduled in Celery Beat).
+	"""
+	from .item_stats import AGGREGATE_BATCH_SIZE, aggregate_pending
+
+	folded = 0
+	for schema_name in _tenant_schema_names():
+		try:
+			with schema_context(schema_name):
+				while True:
+					count = aggregate_pending()
+					folded += count
+					if count < AGGREGATE_BATCH_SIZE:
+						break
+		except Exception:
+			logger.exception("Item statistics aggregation failed for schema %s", schema_name)
+	return folded
+
+
+@shared_task
+def calibrate_score_scales():
+	"""
+	Fit 2PL item parameters and scaled-score tables for published mock tests with
+	enough new graded responses, in every tenant schema (see irt.py).
+	Runs periodically (scheduled in Celery Beat).
+	"""
+	from .irt import calibrate_mock_test, mock_tests_due_for_calibration
+
+	calibrated = 0
+	for schema_name in _tenant_schema_names():
+		try:
+			with schema_context(schema_name):
+				for mock_test in mock_tests_due_for_calibration():
+					try:
+						calibrated += calibrate_mock_test(mock_test)
+					except Exception:
+						logger.exception("Calibration failed for mock test %s in %s", mock_test.id, schema_name)
+		except Exception:
+			logger.exception("Score scale calibration failed for schema %s", schema_name)
+	return calibrated
+
+
+@shared_task
+def flush_telemetry():
+	"""
+	Copy buffered question timing events (Redis stream) into each tenant's
+	QuestionTimingEvent table. Runs periodically (scheduled in Celery Beat).
+	"""
+	from .telemetry import flush_lock, flush_telemetry as flush
+
+	written = 0
+	with flush_lock() as acquired:
+		if not acquired:
+			# The previous run is still draining.
+			return 0
+		# Drain a backlog in a few rounds rather than waiting for the next beat;
+		# failed entries are retried in the first round only.
+		for round_number in range(5):
+			count = flush(retry=round_number == 0)
+			written += count
+			if not count:
+				break
+	return written
+
+
+@shared_task
+def archive_submission_payloads():
+	"""
+	Move payloads of long-graded submissions to compressed objects on the default
+	storage, in every tenant schema (see archive.py). Runs daily (scheduled in Celery Beat).
+	"""
+	from .archive import ARCHIVE_BATCH_SIZE, archive_payloads
+
+	archived = 0
+	for schema_name in _tenant_schema_names():
+		try:
+			with schema_context(schema_name):
+				# Bounded per run; a large backlog is worked off over several days.
+				for _ in range(20):
+					count = archive_payloads()
+					archived += count
+					if count < ARCHIVE_BATCH_SIZE:
+						break
+		except Exception:
+			logger.exception("Payload archiving failed for schema %s", schema_name)
+	return archived
@@ -0,0 +1,363 @@
+# apps/attempts/telemetry.py
+"""
+Per-question timing telemetry.
+
+POST /submissions/telemetry/ accepts batches of client events for a STARTED
+attempt: question viewed, answer changed, time spent on a question. The request
+only validates the batch and appends it as one entry to a Redis stream; the
+attempt's owner and test are read once and cached, and the Submission row is
+never written or locked.
+
+The flush_telemetry task drains the stream through a consumer group and writes
+each tenant's events into the append-only QuestionTimingEvent table with one
+COPY per tenant. Only one flush runs at a time (Redis lock). Entries are
+acknowledged only after COPY commits; failed entries are retried once they have
+been idle for TELEMETRY_RETRY_IDLE_MS and dropped after TELEMETRY_MAX_DELIVERIES
+attempts.
+Without Redis (dev/tests) events are inserted directly.
+
+get_timing_statistics aggregates per question: per-attempt totals first, then
+students, mean / median / p90 time, mean views and answer changes.
+"""
+import io
+import json
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core.cache_utils import get_redis_client, tenant_cache_key
+from apps.core.tenant_utils import get_current_schema, schema_context
+from .answer_keys import get_answer_key
+from .models import QuestionTimingEvent, Submission
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_STREAM = "attempts:telemetry"
+TELEMETRY_GROUP = "flush"
+TELEMETRY_CONSUMER = "flusher"
+# Approximate cap on buffered batches if the flush task stops running.
+TELEMETRY_STREAM_MAXLEN = 200000
+TELEMETRY_FLUSH_BATCH = 2000
+TELEMETRY_MAX_DELIVERIES = 5
+# Unacknowledged entries are retried once they have been idle this long, so the
+# delivery budget of a failing tenant spans minutes, not consecutive rounds.
+TELEMETRY_RETRY_IDLE_MS = 60 * 1000
+# One flush at a time; the lock outlives any run and is released when it ends.
+TELEMETRY_LOCK_KEY = "attempts:telemetry:flush-lock"
+TELEMETRY_LOCK_TTL = 120
+TELEMETRY_MAX_EVENTS = 200
+TELEMETRY_MAX_DURATION_MS = 30 * 60 * 1000
+TELEMETRY_CONTEXT_PREFIX = "attempts:telemetry:ctx"
+TELEMETRY_CONTEXT_TTL = 5 * 60
+TELEMETRY_STATS_PREFIX = "attempts:telemetry:stats"
+TELEMETRY_STATS_TTL = 60
+
+EVENT_TYPES = {
+    "view": QuestionTimingEvent.EventType.VIEW,
+    "change": QuestionTimingEvent.EventType.CHANGE,
+    "dwell": QuestionTimingEvent.EventType.DWELL,
+}
+
+# Column order of stream rows and of the COPY statement
+_COLUMNS = (
+    "submission_id", "user_id", "mock_test_id", "quiz_id",
+    "question_id", "event_type", "duration_ms", "occurred_at",
+)
+
+
+def get_submission_context(submission_id, user_id):
+    """
+    (user_id, mock_test_id, quiz_id) of the user's STARTED attempt, or None.
+    Cached briefly so a stream of telemetry batches reads the attempt once.
+    """
+    key = tenant_cache_key(TELEMETRY_CONTEXT_PREFIX, submission_id)
+    context = cache.get(key)
+    if context is None:
+        try:
+            row = Submission.objects.filter(
+                id=submission_id, status=Submission.Status.STARTED, started_at__isnull=False,
+            ).values_list("user_id", "mock_test_id", "quiz_id", "exam_assignment__mock_test_id").first()
+        except (ValueError, DjangoValidationError):
+            return None
+        if row is None:
+            return None
+        owner, mock_test_id, quiz_id, exam_mock_test_id = row
+        context = (owner, str(mock_test_id or exam_mock_test_id or "") or None, str(quiz_id) if quiz_id else None)
+        cache.set(key, context, TELEMETRY_CONTEXT_TTL)
+    if context[0] != user_id:
+        return None
+    return context
+
+
+def _occurred_at_ms(value, now_ms):
+    """Client timestamp (epoch ms) if plausible, else the receive time."""
+    if isinstance(value, (int, float)) and abs(now_ms - value) <= 24 * 60 * 60 * 1000:
+        return int(value)
+    return now_ms
+
+
+def parse_events(events):
+    """Validate a batch; returns [(question_id, event_type, duration_ms, occurred_ms)]. Raises ValueError."""
+    if not isinstance(events, list) or not events:
+        raise ValueError("Must be a non-empty list.")
+    if len(events) > TELEMETRY_MAX_EVENTS:
+        raise ValueError(f"At most {TELEMETRY_MAX_EVENTS} events per request.")
+    now_ms = int(timezone.now().timestamp() * 1000)
+    parsed = []
+    for idx, event in enumerate(events):
+        if not isinstance(event, dict):
+            raise ValueError(f"Event at index {idx} must be an object.")
+        event_type = EVENT_TYPES.get(event.get("type"))
+        if event_type is None:
+            raise ValueError(f"Event at index {idx}: type must be one of {', '.join(EVENT_TYPES)}.")
+        try:
+            question_id = str(uuid.UUID(str(event.get("question_id"))))
+        except ValueError:
+            raise ValueError(f"Event at index {idx}: question_id must be a UUID.")
+        duration = event.get("duration_ms", 0)
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0:
+            raise ValueError(f"Event at index {idx}: duration_ms must be a non-negative number.")
+        parsed.append((
+            question_id, int(event_type), min(int(duration), TELEMETRY_MAX_DURATION_MS),
+            _occurred_at_ms(event.get("at"), now_ms),
+        ))
+    return parsed
+
+
+def record_events(context, submission_id, events) -> None:
+    """Append a validated batch: one XADD (or a direct insert without Redis)."""
+    user_id, mock_test_id, quiz_id = context
+    rows = [
+        [str(submission_id), user_id, mock_test_id, quiz_id, question_id, event_type, duration, occurred]
+        for question_id, event_type, duration, occurred in events
+    ]
+    client = get_redis_client()
+    if client is None:
+        _insert_rows(rows)
+        return
+    client.xadd(
+        TELEMETRY_STREAM,
+        {"s": get_current_schema(), "e": json.dumps(rows, separators=(",", ":"))},
+        maxlen=TELEMETRY_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def _timestamp(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=dt_timezone.utc)
+
+
+def _insert_rows(rows):
+    QuestionTimingEvent.objects.bulk_create([
+        QuestionTimingEvent(**{**dict(zip(_COLUMNS, row)), "occurred_at": _timestamp(row[7])})
+        for row in rows
+    ])
+
+
+def _copy_rows(rows):
+    """COPY rows into the current schema's event table (text format, NULL = \\N)."""
+    buffer = io.StringIO()
+    for row in rows:
+        values = list(row[:7]) + [_timestamp(row[7]).isoformat()]
+        buffer.write("\t".join("\\N" if v is None else str(v) for v in values))
+        buffer.write("\n")
+    buffer.seek(0)
+    table = connection.ops.quote_name(QuestionTimingEvent._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(_COLUMNS)}) FROM STDIN", buffer)
+
+
+def _ensure_group(client):
+    from redis.exceptions import ResponseError
+
+    try:
+        client.xgroup_create(TELEMETRY_STREAM, TELEMETRY_GROUP, id="0", mkstream=True)
+    except ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _id_order(entry_id):
+    """Stream ids ("<ms>-<seq>") compare numerically, not as strings."""
+    ms, _, seq = _decode(entry_id).partition("-")
+    return int(ms), int(seq or 0)
+
+
+def _acknowledge(client, entry_ids):
+    pipe = client.pipeline()
+    pipe.xack(TELEMETRY_STREAM, TELEMETRY_GROUP, *entry_ids)
+    pipe.xdel(TELEMETRY_STREAM, *entry_ids)
+    pipe.execute()
+
+
+def _drop_exhausted(client, entry_ids):
+    """Acknowledge entries that have failed TELEMETRY_MAX_DELIVERIES times."""
+    ids = set(entry_ids)
+    pending = client.xpending_range(
+        TELEMETRY_STREAM, TELEMETRY_GROUP,
+        min=min(entry_ids, key=_id_order),
+        max=max(entry_ids, key=_id_order),
+        count=2 * TELEMETRY_FLUSH_BATCH,
+    )
+    exhausted = [
+        p["message_id"] for p in pending
+        if p["message_id"] in ids and p["times_delivered"] >= TELEMETRY_MAX_DELIVERIES
+    ]
+    if exhausted:
+        logger.error("Dropping %d telemetry batches after repeated flush failures", len(exhausted))
+        _acknowledge(client, exhausted)
+
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@contextmanager
+def flush_lock():
+    """
+    Yields True if this process holds the flush lock (SET NX EX), False if another
+    flush is running. Overlapping runs would otherwise COPY the same entries twice.
+    """
+    client = get_redis_client()
+    if client is None:
+        yield True
+        return
+    token = uuid.uuid4().hex
+    if not client.set(TELEMETRY_LOCK_KEY, token, nx=True, ex=TELEMETRY_LOCK_TTL):
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        client.eval(_RELEASE_SCRIPT, 1, TELEMETRY_LOCK_KEY, token)
+
+
+def _retry_entries(client, limit):
+    """Unacknowledged entries idle for TELEMETRY_RETRY_IDLE_MS (XAUTOCLAIM, counts a delivery)."""
+    reply = client.xautoclaim(
+        TELEMETRY_STREAM, TELEMETRY_GROUP, TELEMETRY_CONSUMER,
+        min_idle_time=TELEMETRY_RETRY_IDLE_MS, start_id="0-0", count=limit,
+    )
+    return list(reply[1]) if reply else []
+
+
+def flush_telemetry(limit=TELEMETRY_FLUSH_BATCH, retry=True) -> int:
+    """
+    Move up to `limit` new stream entries (batches) into Postgres, plus, with
+    `retry`, earlier failed entries that are due again. Returns events written.
+    Call under flush_lock().
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    _ensure_group(client)
+    entries = _retry_entries(client, limit) if retry else []
+    for _stream, items in client.xreadgroup(
+        TELEMETRY_GROUP, TELEMETRY_CONSUMER, {TELEMETRY_STREAM: ">"}, count=limit,
+    ) or []:
+        entries.extend(items)
+
+    by_schema = {}
+    malformed = []
+    for entry_id, fields in entries:
+        fields = {_decode(k): _decode(v) for k, v in (fields or {}).items()}
+        try:
+            schema_name, rows = fields["s"], json.loads(fields["e"])
+        except (KeyError, TypeError, ValueError):
+            malformed.append(entry_id)
+            continue
+        ids, batch = by_schema.setdefault(schema_name, ([], []))
+        ids.append(entry_id)
+        batch.extend(rows)
+    if malformed:
+        _acknowledge(client, malformed)
+
+    written = 0
+    for schema_name, (entry_ids, rows) in by_schema.items():
+        try:
+            with schema_context(schema_name):
+                _copy_rows(rows)
+        except Exception:
+            logger.exception("Telemetry flush failed for %s; will retry", schema_name)
+            _drop_exhausted(client, entry_ids)
+            continue
+        _acknowledge(client, entry_ids)
+        written += len(rows)
+    return written
+
+
+_STATS_SQL = """
+SELECT question_id,
+       COUNT(*) AS students,
+       AVG(dwell) AS mean_ms,
+       percentile_cont(0.5) WITHIN GROUP (ORDER BY dwell) AS median_ms,
+       percentile_cont(0.9) WITHIN GROUP (ORDER BY dwell) AS p90_ms,
+       AVG(views) AS mean_views,
+       AVG(changes) AS mean_changes
+FROM (
+    SELECT question_id, submission_id,
+           COALESCE(SUM(duration_ms) FILTER (WHERE event_type = %s), 0) AS dwell,
+           COUNT(*) FILTER (WHERE event_type = %s) AS views,
+           COUNT(*) FILTER (WHERE event_type = %s) AS changes
+    FROM {table}
+    WHERE mock_test_id = %s
+    GROUP BY question_id, submission_id
+) AS per_attempt
+GROUP BY question_id
+"""
+
+
+def _aggregate(mock_test_id):
+    table = connection.ops.quote_name(QuestionTimingEvent._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _STATS_SQL.format(table=table),
+            [
+                QuestionTimingEvent.EventType.DWELL,
+                QuestionTimingEvent.EventType.VIEW,
+                QuestionTimingEvent.EventType.CHANGE,
+                mock_test_id,
+            ],
+        )
+        return {str(row[0]): row[1:] for row in cursor.fetchall()}
+
+
+def get_timing_statistics(mock_test):
+    """Per-question time statistics in paper order (questions without events omitted)."""
+    key = tenant_cache_key(TELEMETRY_STATS_PREFIX, mock_test.id)
+    items = cache.get(key)
+    if items is not None:
+        return items
+    stats = _aggregate(mock_test.id)
+    items = []
+    for q in get_answer_key(mock_test).questions:
+        row = stats.get(q.question_id)
+        if row is None:
+            continue
+        students, mean_ms, median_ms, p90_ms, mean_views, mean_changes = row
+        items.append({
+            "question_id": q.question_id,
+            "section_type": q.section_type,
+            "students": students,
+            "mean_time_ms": round(float(mean_ms)),
+            "median_time_ms": round(float(median_ms)),
+            "p90_time_ms": round(float(p90_ms)),
+            "mean_views": round(float(mean_views), 2),
+            "mean_answer_changes": round(float(mean_changes), 2),
+        })
+    cache.set(key, items, TELEMETRY_STATS_TTL)
+    return items
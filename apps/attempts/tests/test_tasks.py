@@ -0,0 +1,130 @@
+# apps/attempts/tests/test_tasks.py
+"""
+Periodic attempts tasks that loop over tenant schemas.
+
+Run with: python manage.py test apps.attempts --settings=config.settings.test
+"""
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.centers.models import Center
+from apps.attempts.tasks import (
+    _tenant_schema_names,
+    aggregate_item_statistics,
+    archive_submission_payloads,
+    calibrate_score_scales,
+)
+from apps.core.tenant_utils import get_current_schema
+
+
+def make_centers():
+    """Centers in every state; only tenant_active must be visited by the tasks."""
+    # bulk_create: Center.save / post_save would create and migrate real schemas.
+    Center.objects.bulk_create([
+        Center(name="Active", slug="active", schema_name="tenant_active", status=Center.Status.ACTIVE),
+        Center(name="Trial", slug="trial", schema_name="tenant_trial", status=Center.Status.TRIAL),
+        Center(name="Suspended", slug="suspended", schema_name="tenant_suspended", status=Center.Status.SUSPENDED),
+        Center(name="No schema", slug="no-schema", schema_name=None, status=Center.Status.ACTIVE),
+        Center(name="Blank schema", slug="blank-schema", schema_name="", status=Center.Status.ACTIVE),
+        Center(
+            name="Deleted", slug="deleted", schema_name="tenant_deleted",
+            status=Center.Status.ACTIVE, deleted_at=timezone.now(),
+        ),
+    ])
+
+
+class TenantSchemaNamesTests(TestCase):
+    def setUp(self):
+        make_centers()
+
+    def test_returns_only_active_centers_with_a_schema(self):
+        self.assertEqual(_tenant_schema_names(), ["tenant_active"])
+
+
+class AggregateItemStatisticsTests(TestCase):
+    def setUp(self):
+        make_centers()
+
+    def test_folds_pending_responses_in_each_active_schema(self):
+        schemas = []
+
+        def aggregate_pending():
+            schemas.append(get_current_schema())
+            return 7
+
+        with mock.patch("apps.attempts.item_stats.aggregate_pending", side_effect=aggregate_pending):
+            folded = aggregate_item_statistics()
+
+        self.assertEqual(schemas, ["tenant_active"])
+        self.assertEqual(folded, 7)
+
+    def test_runs_against_the_tables(self):
+        # No responses yet: nothing to fold, and no error from the schema lookup.
+        self.assertEqual(aggregate_item_statistics(), 0)
+
+
+class RebuildSubmissionVisibilityCommandTests(TestCase):
+    def setUp(self):
+        make_centers()
+
+    def test_rebuilds_every_active_schema_without_schema_argument(self):
+        schemas = []
+
+        def rebuild_visibility():
+            schemas.append(get_current_schema())
+            return 2
+
+        with mock.patch(
+            "apps.attempts.management.commands.rebuild_submission_visibility.rebuild_visibility",
+            side_effect=rebuild_visibility,
+        ):
+            call_command("rebuild_submission_visibility", stdout=mock.MagicMock())
+
+        self.assertEqual(schemas, ["tenant_active"])
+
+
+class CalibrateScoreScalesTests(TestCase):
+    def setUp(self):
+        make_centers()
+
+    def test_calibrates_due_tests_in_each_active_schema(self):
+        calls = []
+        due = [mock.Mock(id="mt-1"), mock.Mock(id="mt-2")]
+
+        def calibrate_mock_test(mock_test):
+            calls.append((get_current_schema(), mock_test.id))
+            return True
+
+        with mock.patch("apps.attempts.irt.mock_tests_due_for_calibration", return_value=due), \
+                mock.patch("apps.attempts.irt.calibrate_mock_test", side_effect=calibrate_mock_test):
+            calibrated = calibrate_score_scales()
+
+        self.assertEqual(calls, [("tenant_active", "mt-1"), ("tenant_active", "mt-2")])
+        self.assertEqual(calibrated, 2)
+
+
+class ArchiveSubmissionPayloadsTests(TestCase):
+    def setUp(self):
+        make_centers()
+
+    def test_archives_each_active_schema_until_a_short_batch(self):
+        from apps.attempts.archive import ARCHIVE_BATCH_SIZE
+
+        schemas = []
+        batches = iter([ARCHIVE_BATCH_SIZE, 3])
+
+        def archive_payloads():
+            schemas.append(get_current_schema())
+            return next(batches)
+
+        with mock.patch("apps.attempts.archive.archive_payloads", side_effect=archive_payloads):
+            archived = archive_submission_payloads()
+
+        self.assertEqual(schemas, ["tenant_active", "tenant_active"])
+        self.assertEqual(archived, ARCHIVE_BATCH_SIZE + 3)
+
+    def test_runs_against_the_tables(self):
+        self.assertEqual(archive_submission_payloads(), 0)
@@ -0,0 +1,121 @@
+# apps/attempts/timers.py
+"""
+Attempt expiry timers.
+
+Starting an attempt registers its deadline (started_at + total duration + grace
+period) in one Redis sorted set shared by all tenants: member "<schema>:<submission_id>",
+score = deadline as a Unix timestamp. The expire_due_submissions task (every few
+seconds) pops only the entries that are due and hands them to grading, so sweep
+cost is proportional to expired attempts rather than to every STARTED row.
+
+Entries are claimed with ZREM, so concurrent sweepers never grade the same attempt
+twice. Grading removes the entry. Without Redis, or if an entry is lost, the hourly
+auto_submit_stuck_submissions reconciliation still catches the attempt.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db.models import Sum
+
+from apps.core.cache_utils import get_redis_client
+from apps.mock_tests.models import TestSection, QuizQuestion
+
+logger = logging.getLogger(__name__)
+
+TIMER_KEY = "attempts:timers"
+GRACE_PERIOD_MINUTES = 10
+# Retry delay when grading a popped attempt fails.
+TIMER_RETRY_SECONDS = 60
+
+
+def _member(schema_name, submission_id):
+    return f"{schema_name}:{submission_id}"
+
+
+def get_duration_minutes(submission):
+    """Total allowed minutes for the submission's resource (None when unknown)."""
+    mock_test_id = submission.mock_test_id
+    if submission.exam_assignment_id and not mock_test_id:
+        mock_test_id = submission.exam_assignment.mock_test_id
+    if mock_test_id:
+        return TestSection.objects.filter(mock_test_id=mock_test_id).aggregate(
+            total=Sum("duration")
+        )["total"]
+    if submission.quiz_id:
+        return QuizQuestion.objects.filter(quiz_id=submission.quiz_id).aggregate(
+            total=Sum("duration")
+        )["total"]
+    return None
+
+
+def get_deadline(submission, duration_minutes=None):
+    """started_at + duration + grace, or None if the attempt has no time limit."""
+    if not submission.started_at:
+        return None
+    if duration_minutes is None:
+        duration_minutes = get_duration_minutes(submission)
+    if not duration_minutes:
+        return None
+    return submission.started_at + timedelta(minutes=duration_minutes + GRACE_PERIOD_MINUTES)
+
+
+def schedule_expiry(schema_name, submission) -> None:
+    """Register (or refresh) the attempt's deadline. Idempotent for a given started_at."""
+    client = get_redis_client()
+    if client is None:
+        return
+    deadline = get_deadline(submission)
+    if deadline is None:
+        return
+    try:
+        client.zadd(TIMER_KEY, {_member(schema_name, submission.id): deadline.timestamp()})
+    except Exception:
+        # Best effort: the reconciliation sweep still expires the attempt.
+        logger.warning("Could not schedule expiry for %s", submission.id, exc_info=True)
+
+
+def cancel_expiry(schema_name, submission_ids) -> None:
+    """Forget timers of attempts that were submitted or graded."""
+    client = get_redis_client()
+    if client is None or not submission_ids:
+        return
+    try:
+        client.zrem(TIMER_KEY, *[_member(schema_name, sid) for sid in submission_ids])
+    except Exception:
+        # A leftover timer is harmless: the sweeper skips attempts that are no longer STARTED.
+        logger.warning("Could not cancel expiry timers in %s", schema_name, exc_info=True)
+
+
+def pop_due(limit=500, now=None):
+    """
+    Claim up to `limit` due timers. Returns {schema_name: [submission_id, ...]}.
+    Each member is claimed by whichever sweeper's ZREM removes it.
+    """
+    client = get_redis_client()
+    if client is None:
+        return {}
+    now = time.time() if now is None else now
+    due = client.zrangebyscore(TIMER_KEY, "-inf", now, start=0, num=limit)
+    if not due:
+        return {}
+    pipe = client.pipeline()
+    for member in due:
+        pipe.zrem(TIMER_KEY, member)
+    claimed = {}
+    for member, removed in zip(due, pipe.execute()):
+        if not removed:
+            continue
+        member = member.decode() if isinstance(member, bytes) else member
+        schema_name, _, submission_id = member.rpartition(":")
+        claimed.setdefault(schema_name, []).append(submission_id)
+    return claimed
+
+
+def retry_later(schema_name, submission_ids, delay=TIMER_RETRY_SECONDS) -> None:
+    """Put claimed timers back so a failed grading is retried by a later sweep."""
+    client = get_redis_client()
+    if client is None or not submission_ids:
+        return
+    score = time.time() + delay
+    client.zadd(TIMER_KEY, {_member(schema_name, sid): score for sid in submission_ids})
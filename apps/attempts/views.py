@@ -4,6 +4,7 @@ Thin ViewSet for Submissions. JLPT grading, snapshot, security, and OpenAPI
 schemas are documented in apps/attempts/swagger.py and services.py.
 """
 
+from django.conf import settings
 from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -11,20 +12,27 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError as DRFValidationError, PermissionDenied
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db.models import Q
 from .models import Submission
 from .serializers import (
     SubmissionSerializer,
     SubmissionResultSerializer,
     SubmissionAnswerSerializer,
 )
-from .permissions import IsSubmissionOwnerOrTeacher, CanStartExam
+from .permissions import IsSubmissionOwnerOrTeacher, CanStartExam, ExamStartAdmission
 from .services import StartExamService, StartHomeworkService, GradingService
+from .paper_cache import paper_response
+from .autosave import save_answers, get_saved_answers
 from .swagger import submission_viewset_schema
+from apps.core.idempotency import idempotent
+from apps.core.projection import project_queryset, requested_fields
 from apps.assignments.models import ExamAssignment, HomeworkAssignment
 from apps.core.tenant_utils import get_current_schema
 
 
+# Heavy fields left out of the list view unless requested with ?fields=
+SUMMARY_EXCLUDED_FIELDS = ("results",)
+
+
 @submission_viewset_schema
 class SubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
@@ -39,31 +47,23 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         queryset = Submission.objects.select_related(
             'exam_assignment', 'homework_assignment'
-        ).prefetch_related(
-            'exam_assignment__assigned_groups',
-            'homework_assignment__assigned_groups'
+        ).exclude(
+            # Pre-provisioned at room open but never started by the student
+            status=Submission.Status.STARTED, started_at__isnull=True,
         ).order_by('-created_at')
         
+        if self.action in ("list", "retrieve"):
+            queryset = project_queryset(queryset, SubmissionSerializer, self._projection())
+        
         # CENTER_ADMIN: See all submissions
         if user.role == "CENTER_ADMIN":
             return queryset
         
-        # TEACHER: See submissions for their groups
+        # TEACHER: See submissions for their groups (semi-join on the visibility index)
         if user.role == "TEACHER":
-            from apps.groups.models import GroupMembership
-            
-            teaching_group_ids = GroupMembership.objects.filter(
-                user_id=user.id,
-                role_in_group="TEACHER"
-            ).values_list('group_id', flat=True)
+            from .visibility import teacher_visible_submission_ids
             
-            if teaching_group_ids:
-                return queryset.filter(
-                    Q(exam_assignment__assigned_groups__id__in=teaching_group_ids) |
-                    Q(homework_assignment__assigned_groups__id__in=teaching_group_ids)
-                ).distinct()
-            else:
-                return Submission.objects.none()
+            return queryset.filter(id__in=teacher_visible_submission_ids(user.id))
         
         # STUDENT/GUEST: See only their own submissions
         if user.role in ("STUDENT", "GUEST"):
@@ -71,6 +71,22 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         return Submission.objects.none()
 
+    def _projection(self):
+        """Requested SubmissionSerializer fields; list defaults to the summary (no results)."""
+        if not hasattr(self, "_projected_fields"):
+            self._projected_fields = requested_fields(
+                self.request,
+                SubmissionSerializer,
+                default_exclude=SUMMARY_EXCLUDED_FIELDS if self.action == "list" else (),
+            )
+        return self._projected_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("list", "retrieve"):
+            context["projection"] = self._projection()
+        return context
+
     def get_serializer_class(self):
         if self.action == "my_results":
             return SubmissionResultSerializer
@@ -90,7 +106,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             )
         instance.delete()
 
-    @action(detail=False, methods=["post"], url_path="start-exam", permission_classes=[IsAuthenticated, CanStartExam])
+    @action(detail=False, methods=["post"], url_path="start-exam", permission_classes=[IsAuthenticated, ExamStartAdmission, CanStartExam])
     def start_exam(self, request):
         user = request.user
         
@@ -102,18 +118,19 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if not exam_assignment_id:
             raise DRFValidationError({"exam_assignment_id": "This field is required."})
         try:
-            submission, exam_paper_data = StartExamService.start_exam(user, exam_assignment_id)
+            submission, exam_paper = StartExamService.start_exam(user, exam_assignment_id)
         except DjangoValidationError as e:
             raise DRFValidationError({"detail": str(e)})
         
-        return Response({
+        return paper_response({
             "submission_id": str(submission.id),
             "started_at": submission.started_at,
-            "exam_paper": exam_paper_data,
+            "saved_answers": get_saved_answers(submission),
             "message": "Exam started successfully. Timer begins now."
-        }, status=status.HTTP_201_CREATED)
+        }, "exam_paper", exam_paper, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=["post"], url_path="submit-exam")
+    @idempotent
     def submit_exam(self, request):
         user = request.user
         
@@ -125,8 +142,9 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if not submission_id:
             raise DRFValidationError({"submission_id": "This field is required."})
         try:
+            # payload: grading merges the saved answers
             submission = Submission.objects.select_related(
-                "exam_assignment", "homework_assignment",
+                "exam_assignment__mock_test", "homework_assignment", "payload",
             ).get(id=submission_id, user_id=user.id)
         except Submission.DoesNotExist:
             raise DRFValidationError({"submission_id": "Submission not found."})
@@ -141,12 +159,24 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 {"detail": "Only STARTED submissions can be submitted. This attempt is already submitted or graded."}
             )
         answers_data = request.data.get("answers")
-        if not answers_data:
+        # {} is allowed: autosaved answers are merged in at grading time.
+        if answers_data is None:
             raise DRFValidationError({"answers": "This field is required."})
         answer_serializer = SubmissionAnswerSerializer(data=answers_data)
         if not answer_serializer.is_valid():
             raise DRFValidationError({"answers": answer_serializer.errors})
         student_answers = answer_serializer.validated_data
+        if settings.ATTEMPTS_ASYNC_GRADING:
+            try:
+                GradingService.submit_for_grading(submission, student_answers)
+            except DjangoValidationError as e:
+                raise DRFValidationError({"detail": str(e)})
+            return Response({
+                "submission_id": str(submission.id),
+                "status": submission.status,
+                "message": "Submission received. Your result is under review.",
+                "note": "Results will be visible after the teacher publishes them.",
+            }, status=status.HTTP_202_ACCEPTED)
         try:
             GradingService.grade_submission(submission, student_answers)
         except DjangoValidationError as e:
@@ -158,6 +188,266 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             "note": "Results will be visible after the teacher publishes them.",
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["patch"], url_path="autosave")
+    def autosave(self, request):
+        user = request.user
+        
+        # Only students/guests autosave their own attempts
+        if user.role not in ("STUDENT", "GUEST"):
+            raise PermissionDenied("Only students can save answers.")
+        
+        submission_id = request.data.get("submission_id")
+        if not submission_id:
+            raise DRFValidationError({"submission_id": "This field is required."})
+        answers_data = request.data.get("answers")
+        if not answers_data:
+            raise DRFValidationError({"answers": "This field is required."})
+        answer_serializer = SubmissionAnswerSerializer(data=answers_data)
+        if not answer_serializer.is_valid():
+            raise DRFValidationError({"answers": answer_serializer.errors})
+        try:
+            submission = Submission.objects.select_related("homework_assignment").only(
+                "id", "user_id", "status", "started_at",
+                "homework_assignment__id", "homework_assignment__deadline",
+            ).get(id=submission_id, user_id=user.id)
+        except Submission.DoesNotExist:
+            raise DRFValidationError({"submission_id": "Submission not found."})
+        if submission.status != Submission.Status.STARTED or not submission.started_at:
+            raise DRFValidationError(
+                {"detail": "Only STARTED submissions accept answers. This attempt is already submitted or graded."}
+            )
+        if submission.homework_assignment and submission.homework_assignment.deadline <= timezone.now():
+            raise DRFValidationError({"detail": "Homework deadline has passed."})
+        save_answers(submission, answer_serializer.validated_data)
+        return Response({
+            "submission_id": str(submission.id),
+            "saved": len(answer_serializer.validated_data),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="telemetry")
+    def telemetry(self, request):
+        user = request.user
+        
+        # Only students/guests report telemetry for their own attempts
+        if user.role not in ("STUDENT", "GUEST"):
+            raise PermissionDenied("Only students can report telemetry.")
+        
+        from .telemetry import get_submission_context, parse_events, record_events
+        submission_id = request.data.get("submission_id")
+        if not submission_id:
+            raise DRFValidationError({"submission_id": "This field is required."})
+        try:
+            events = parse_events(request.data.get("events"))
+        except ValueError as e:
+            raise DRFValidationError({"events": str(e)})
+        context = get_submission_context(submission_id, user.id)
+        if context is None:
+            raise DRFValidationError({"submission_id": "No STARTED submission found."})
+        record_events(context, submission_id, events)
+        return Response({"accepted": len(events)}, status=status.HTTP_202_ACCEPTED)
+
+    def _get_managed_assignment(self, queryset, field, assignment_id, verb, noun):
+        """
+        Exam/homework assignment the requesting center admin / group teacher may manage.
+        field: request parameter name; verb/noun: for messages ("regrade", "exams").
+        """
+        user = self.request.user
+        
+        # Only center admins and the assignment's teachers
+        if user.role not in ("CENTER_ADMIN", "TEACHER"):
+            raise PermissionDenied(f"Only teachers and center admins can {verb} {noun}.")
+        
+        if not assignment_id:
+            raise DRFValidationError({field: "This field is required."})
+        try:
+            assignment = queryset.get(id=assignment_id)
+        except (queryset.model.DoesNotExist, DjangoValidationError):
+            raise DRFValidationError({field: f"{queryset.model._meta.verbose_name.capitalize()} not found."})
+        if user.role == "TEACHER":
+            from apps.groups.models import GroupMembership
+            
+            teaching_group_ids = GroupMembership.objects.filter(
+                user_id=user.id,
+                role_in_group="TEACHER"
+            ).values_list('group_id', flat=True)
+            if not assignment.assigned_groups.filter(id__in=teaching_group_ids).exists():
+                raise PermissionDenied(f"You can only {verb} {noun} assigned to your groups.")
+        return assignment
+
+    def _get_managed_exam_assignment(self, exam_assignment_id, verb):
+        return self._get_managed_assignment(
+            ExamAssignment.objects.select_related("mock_test"),
+            "exam_assignment_id", exam_assignment_id, verb, "exams",
+        )
+
+    @action(detail=False, methods=["post"], url_path="regrade-exam")
+    def regrade_exam(self, request):
+        exam_assignment = self._get_managed_exam_assignment(
+            request.data.get("exam_assignment_id"), "regrade",
+        )
+        if not exam_assignment.mock_test:
+            raise DRFValidationError({"detail": "Exam assignment has no mock test assigned."})
+        
+        from .batch_grading import regrade_exam_room
+        summary = regrade_exam_room(exam_assignment)
+        return Response({
+            "exam_assignment_id": str(exam_assignment.id),
+            **summary,
+            "message": "Exam regraded against the current answer key.",
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="room-summary")
+    def room_summary(self, request):
+        exam_assignment = self._get_managed_exam_assignment(
+            request.query_params.get("exam_assignment_id"), "view",
+        )
+        from .leaderboard import get_room_summary
+        summary = get_room_summary(exam_assignment.id)
+        user_ids = {entry["user_id"] for entry in summary["top"]}
+        user_map = {}
+        if user_ids:
+            from apps.core.tenant_utils import with_public_schema
+            from apps.authentication.models import User
+            user_map = with_public_schema(
+                lambda: {u.id: u for u in User.objects.filter(id__in=user_ids)}
+            )
+        from apps.core.serializers import user_display_from_map
+        for entry in summary["top"]:
+            entry["student_display"] = user_display_from_map(user_map, entry["user_id"])
+        return Response({
+            "exam_assignment_id": str(exam_assignment.id),
+            "is_published": exam_assignment.is_published,
+            **summary,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        from .exports import EXPORT_FORMATS, HAS_OPENPYXL, csv_response, xlsx_response
+        
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            raise DRFValidationError({"file_format": f"Must be one of: {', '.join(EXPORT_FORMATS)}."})
+        if file_format == "xlsx" and not HAS_OPENPYXL:
+            raise DRFValidationError({"file_format": "XLSX export is not available on this server; use csv."})
+        
+        exam_assignment_id = request.query_params.get("exam_assignment_id")
+        homework_assignment_id = request.query_params.get("homework_assignment_id")
+        if bool(exam_assignment_id) == bool(homework_assignment_id):
+            raise DRFValidationError(
+                {"detail": "Provide exactly one of exam_assignment_id or homework_assignment_id."}
+            )
+        if exam_assignment_id:
+            kind = "exam"
+            assignment = self._get_managed_exam_assignment(exam_assignment_id, "export")
+        else:
+            kind = "homework"
+            assignment = self._get_managed_assignment(
+                HomeworkAssignment.objects.all(),
+                "homework_assignment_id", homework_assignment_id, "export", "homework",
+            )
+        if file_format == "xlsx":
+            return xlsx_response(get_current_schema(), kind, assignment)
+        return csv_response(get_current_schema(), kind, assignment)
+
+    @action(detail=False, methods=["post"], url_path="collusion-scan")
+    def collusion_scan(self, request):
+        exam_assignment = self._get_managed_exam_assignment(
+            request.data.get("exam_assignment_id"), "screen",
+        )
+        if not exam_assignment.mock_test:
+            raise DRFValidationError({"detail": "Exam assignment has no mock test assigned."})
+        
+        from .collusion import detect_collusion
+        flagged = detect_collusion(exam_assignment)
+        return Response({
+            "exam_assignment_id": str(exam_assignment.id),
+            "flagged_pairs": flagged,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="collusion-flags")
+    def collusion_flags(self, request):
+        exam_assignment = self._get_managed_exam_assignment(
+            request.query_params.get("exam_assignment_id"), "view",
+        )
+        from .models import CollusionFlag
+        flags = CollusionFlag.objects.filter(exam_assignment=exam_assignment)
+        status_filter = request.query_params.get("status")
+        if status_filter:
+            flags = flags.filter(status=status_filter)
+        flags = list(
+            flags.select_related("submission_a", "submission_b")
+            .only(
+                "id", "shared_wrong", "both_wrong", "z_score", "status",
+                "submission_a", "submission_b",
+                "submission_a__id", "submission_a__user_id", "submission_a__score",
+                "submission_b__id", "submission_b__user_id", "submission_b__score",
+            )
+        )
+        user_ids = {s.user_id for f in flags for s in (f.submission_a, f.submission_b)}
+        user_map = {}
+        if user_ids:
+            from apps.core.tenant_utils import with_public_schema
+            from apps.authentication.models import User
+            user_map = with_public_schema(
+                lambda: {u.id: u for u in User.objects.filter(id__in=user_ids)}
+            )
+        from apps.core.serializers import user_display_from_map
+
+        def describe(submission):
+            return {
+                "submission_id": str(submission.id),
+                "user_id": submission.user_id,
+                "student_display": user_display_from_map(user_map, submission.user_id),
+                "score": float(submission.score) if submission.score is not None else None,
+            }
+
+        return Response({
+            "exam_assignment_id": str(exam_assignment.id),
+            "flags": [
+                {
+                    "id": f.id,
+                    "submission_a": describe(f.submission_a),
+                    "submission_b": describe(f.submission_b),
+                    "shared_wrong": f.shared_wrong,
+                    "both_wrong": f.both_wrong,
+                    "z_score": f.z_score,
+                    "status": f.status,
+                }
+                for f in flags
+            ],
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="collusion-review")
+    def collusion_review(self, request):
+        from .models import CollusionFlag
+        
+        review_status = request.data.get("status")
+        if review_status not in CollusionFlag.ReviewStatus.values:
+            raise DRFValidationError(
+                {"status": f"Must be one of: {', '.join(CollusionFlag.ReviewStatus.values)}."}
+            )
+        try:
+            flag = CollusionFlag.objects.get(id=request.data.get("flag_id"))
+        except (CollusionFlag.DoesNotExist, ValueError, TypeError):
+            raise DRFValidationError({"flag_id": "Collusion flag not found."})
+        # Same access rule as the room itself
+        self._get_managed_exam_assignment(flag.exam_assignment_id, "review")
+        flag.status = review_status
+        flag.reviewed_by_id = request.user.id
+        flag.save(update_fields=["status", "reviewed_by_id", "updated_at"])
+        return Response({"id": flag.id, "status": flag.status}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="admission-metrics")
+    def admission_metrics(self, request):
+        exam_assignment = self._get_managed_exam_assignment(
+            request.query_params.get("exam_assignment_id"), "view",
+        )
+        from .admission import get_room_metrics
+        return Response({
+            "exam_assignment_id": str(exam_assignment.id),
+            **get_room_metrics(exam_assignment.id),
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"], url_path="my-results")
     def my_results(self, request):
         user = request.user
@@ -184,7 +474,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         # Get submission
         try:
             submission = Submission.objects.select_related(
-                'exam_assignment', 'homework_assignment'
+                'exam_assignment', 'homework_assignment', 'payload'
             ).get(
                 user_id=user.id,
                 exam_assignment=exam_assignment,
@@ -198,8 +488,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         # Serialize and return results
         serializer = SubmissionResultSerializer(submission, context={'request': request})
+        from .leaderboard import get_ranking
         return Response({
             "submission": serializer.data,
+            "ranking": get_ranking(exam_assignment.id, user.id, submission.score),
             "is_published": True
         }, status=status.HTTP_200_OK)
 
@@ -213,7 +505,9 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(homework_assignment_id=homework_assignment_id)
         page = self.paginate_queryset(queryset)
         items = page if page is not None else list(queryset)
-        user_ids = {s.user_id for s in items if s.user_id}
+        user_ids = (
+            {s.user_id for s in items if s.user_id} if "student_display" in self._projection() else set()
+        )
         user_map = {}
         if user_ids:
             from apps.core.tenant_utils import with_public_schema
@@ -222,7 +516,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 lambda: {u.id: u for u in User.objects.filter(id__in=user_ids)}
             )
         serializer = self.get_serializer(
-            items, many=True, context={"request": request, "user_map": user_map}
+            items, many=True, context={**self.get_serializer_context(), "user_map": user_map}
         )
         if page is not None:
             return self.get_paginated_response(serializer.data)
@@ -255,13 +549,13 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         except DjangoValidationError as e:
             raise DRFValidationError({"detail": str(e)})
         
-        return Response({
+        return paper_response({
             "submission_id": str(submission.id),
             "started_at": submission.started_at,
-            "item_data": item_data,
             "item_type": item_type,
+            "saved_answers": get_saved_answers(submission),
             "message": "Homework item started successfully."
-        }, status=status.HTTP_201_CREATED)
+        }, "item_data", item_data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=["post"], url_path="show-result")
     def show_result(self, request):
@@ -313,6 +607,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"], url_path="submit-homework")
+    @idempotent
     def submit_homework(self, request):
         user = request.user
         
@@ -325,7 +620,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             raise DRFValidationError({"submission_id": "This field is required."})
         try:
             submission = Submission.objects.select_related(
-                "homework_assignment", "mock_test", "quiz",
+                "homework_assignment", "mock_test", "quiz", "payload",
             ).get(id=submission_id, user_id=user.id)
         except Submission.DoesNotExist:
             raise DRFValidationError({"submission_id": "Submission not found."})
@@ -342,7 +637,8 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if submission.homework_assignment.deadline <= timezone.now():
             raise DRFValidationError({"detail": "Homework deadline has passed."})
         answers_data = request.data.get("answers")
-        if not answers_data:
+        # {} is allowed: autosaved answers are merged in at grading time.
+        if answers_data is None:
             raise DRFValidationError({"answers": "This field is required."})
         answer_serializer = SubmissionAnswerSerializer(data=answers_data)
         if not answer_serializer.is_valid():
@@ -394,6 +690,8 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             homework_assignment=homework,
             status=Submission.Status.GRADED
         ).select_related('mock_test', 'quiz')
+        if homework.show_results_immediately:
+            submissions = submissions.select_related('payload')
         
         results = []
         for submission in submissions:
@@ -412,7 +710,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 "time_taken_seconds": time_taken_seconds,
             }
             if homework.show_results_immediately:
-                item_data["results"] = submission.results
+                item_data["results"] = submission.get_results()
             results.append(item_data)
         
         return Response({
@@ -0,0 +1,125 @@
+# apps/attempts/visibility.py
+"""
+Teacher visibility index for submissions.
+
+SubmissionVisibility holds one (submission, group) row for every group the
+submission's exam/homework assignment is assigned to. Rows are added when a
+submission is created (post_save, or explicitly after bulk_create) and added or
+removed when an assignment's assigned_groups change (m2m_changed, see signals.py).
+
+A teacher then sees a submission iff one of their teaching groups has a row for it,
+which is a single indexed semi-join:
+
+    submission.id IN (SELECT submission_id FROM submission_visibility
+                      WHERE group_id IN (<teacher's groups>))
+"""
+from django.db import transaction
+
+from apps.assignments.models import ExamAssignment, HomeworkAssignment
+from apps.groups.models import GroupMembership
+from .models import Submission, SubmissionVisibility
+
+VISIBILITY_BATCH_SIZE = 1000
+
+# Submission FK field -> assignment model whose assigned_groups grant visibility
+ASSIGNMENT_MODELS = {
+    "exam_assignment": ExamAssignment,
+    "homework_assignment": HomeworkAssignment,
+}
+
+
+def _assignment_group_ids(field, assignment_id):
+    m2m = ASSIGNMENT_MODELS[field].assigned_groups
+    return list(
+        m2m.through.objects.filter(**{f"{m2m.field.m2m_field_name()}_id": assignment_id})
+        .values_list("group_id", flat=True)
+    )
+
+
+def _insert(pairs):
+    SubmissionVisibility.objects.bulk_create(
+        [SubmissionVisibility(submission_id=s, group_id=g) for s, g in pairs],
+        batch_size=VISIBILITY_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def grant_submission(submission) -> None:
+    """Index a newly created submission for its assignment's groups."""
+    for field in ASSIGNMENT_MODELS:
+        assignment_id = getattr(submission, f"{field}_id")
+        if assignment_id:
+            _insert((submission.id, group_id) for group_id in _assignment_group_ids(field, assignment_id))
+
+
+def grant_assignment(field, assignment_id, group_ids=None) -> None:
+    """Index every submission of an assignment for group_ids (default: all its groups)."""
+    if group_ids is None:
+        group_ids = _assignment_group_ids(field, assignment_id)
+    group_ids = list(group_ids)
+    if not group_ids:
+        return
+    submissions = Submission.objects.filter(**{f"{field}_id": assignment_id}).order_by("id")
+    # Keyset pages rather than QuerySet.iterator(): a server-side cursor outside a
+    # transaction does not survive PgBouncer transaction pooling.
+    last_id = None
+    while True:
+        page = submissions if last_id is None else submissions.filter(id__gt=last_id)
+        submission_ids = list(page.values_list("id", flat=True)[:VISIBILITY_BATCH_SIZE])
+        if not submission_ids:
+            break
+        _insert((submission_id, group_id) for submission_id in submission_ids for group_id in group_ids)
+        last_id = submission_ids[-1]
+
+
+def revoke_assignment(field, assignment_id, group_ids=None) -> None:
+    """Drop the rows of an assignment's submissions for group_ids (default: all groups)."""
+    rows = SubmissionVisibility.objects.filter(**{f"submission__{field}_id": assignment_id})
+    if group_ids is not None:
+        rows = rows.filter(group_id__in=list(group_ids))
+    rows.delete()
+
+
+def revoke_group(field, group_id) -> None:
+    """A group lost all its assignments of one kind (group.exam_tasks.clear())."""
+    SubmissionVisibility.objects.filter(
+        group_id=group_id, **{f"submission__{field}__isnull": False}
+    ).delete()
+
+
+def rebuild_visibility() -> int:
+    """
+    Recreate the whole index for the current schema. Returns the number of assignments indexed.
+    One transaction: teachers keep seeing the old index until the new one commits, and a
+    failure part-way leaves the old index in place.
+    """
+    count = 0
+    with transaction.atomic():
+        SubmissionVisibility.objects.all().delete()
+        for field, model in ASSIGNMENT_MODELS.items():
+            for assignment_id in model.objects.filter(assigned_groups__isnull=False).values_list(
+                "id", flat=True
+            ).distinct():
+                grant_assignment(field, assignment_id)
+                count += 1
+    return count
+
+
+def teacher_visible_submission_ids(user_id):
+    """Subquery of submission ids visible to a teacher through their teaching groups."""
+    return SubmissionVisibility.objects.filter(
+        group_id__in=GroupMembership.objects.filter(
+            user_id=user_id,
+            role_in_group=GroupMembership.ROLE_TEACHER,
+        ).values("group_id")
+    ).values("submission_id")
+
+
+def is_visible_to_teacher(submission_id, user_id) -> bool:
+    return SubmissionVisibility.objects.filter(
+        submission_id=submission_id,
+        group_id__in=GroupMembership.objects.filter(
+            user_id=user_id,
+            role_in_group=GroupMembership.ROLE_TEACHER,
+        ).values("group_id"),
+    ).exists()
@@ -0,0 +1,115 @@
+# apps/core/cache_utils.py
+"""
+Shared caching helpers.
+
+- LRUCache: small thread-safe in-process LRU used as a first tier in front of the
+  Django cache (Redis in production). Cached values must be treated as read-only
+  because the same object is handed to every caller in the process.
+- tenant_cache_key: builds keys namespaced by the current tenant schema so two
+  centers never share an entry.
+- single_flight: read-through cache fill where only one worker (across processes)
+  runs the expensive builder and concurrent callers wait for its result.
+- get_redis_client: raw Redis connection behind the default cache (django_redis in
+  production) for hashes/sets/sorted sets; None when the cache is not Redis, so
+  callers must keep a database fallback.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from apps.core.tenant_utils import get_current_schema
+
+
+class LRUCache:
+    """Bounded, thread-safe least-recently-used mapping (per process)."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def tenant_cache_key(prefix, *parts):
+    """Return "<prefix>:<schema>:<part>:<part>..." for the current tenant schema."""
+    schema_name = get_current_schema() or "public"
+    suffix = ":".join(str(p) for p in parts if p is not None)
+    return f"{prefix}:{schema_name}:{suffix}" if suffix else f"{prefix}:{schema_name}"
+
+
+def single_flight(key, builder, timeout, lock_timeout=30, wait_timeout=10, poll_interval=0.05):
+    """
+    Return cache[key], computing it with builder() at most once across workers.
+
+    The first caller takes a short-lived lock (cache.add is atomic on Redis and
+    locmem) and fills the cache; the others poll until the value appears. If the
+    lock holder dies or the wait runs out, the caller builds the value itself so a
+    request never fails just because another worker is slow.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, "1", lock_timeout):
+        try:
+            value = builder()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:
+            # Holder finished without storing (builder raised); stop waiting.
+            break
+
+    value = builder()
+    cache.set(key, value, timeout)
+    return value
+
+
+def get_redis_client():
+    """Return the raw Redis client of the default cache, or None if it is not django_redis."""
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:
+        return None
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        # Default cache is not a django_redis backend (locmem in dev, dummy in tests).
+        return None
@@ -31,6 +31,8 @@ def custom_exception_handler(exc, context):
                 "status_code": response.status_code,
             },
             status=response.status_code,
+            # Keep Retry-After (429) and WWW-Authenticate (401) set by DRF.
+            headers={k: v for k, v in response.items() if k in ("Retry-After", "WWW-Authenticate")},
         )
 
     # --- Unhandled exception (500) -----------------------------------------
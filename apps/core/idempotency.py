@@ -0,0 +1,139 @@
+# apps/core/idempotency.py
+"""
+Idempotency-Key support for retry-prone POST actions.
+
+Decorate a ViewSet action with @idempotent. When the request carries an
+Idempotency-Key header:
+
+- the first request claims the key (cache.add, atomic on Redis and locmem), runs
+  the action, and stores the rendered response (status, content type, body) for
+  IDEMPOTENCY_TTL seconds, keyed by tenant, user, action and key;
+- a retry replays the stored bytes without entering the action (header
+  Idempotent-Replayed: true);
+- a duplicate arriving while the first is still running waits for its response
+  (up to IDEMPOTENCY_WAIT seconds), so in-flight duplicates collapse onto it;
+  if the wait runs out it gets 409 with Retry-After;
+- reusing a key with a different request body is rejected with 422.
+
+Server errors (5xx) and unhandled exceptions release the key so the client can
+retry for real. Requests without the header are not affected.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache_utils import tenant_cache_key
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+IDEMPOTENCY_KEY_PREFIX = "core:idempotency"
+IDEMPOTENCY_TTL = getattr(settings, "IDEMPOTENCY_TTL", 10 * 60)
+# Upper bound for one execution of the action; a crashed holder frees the key after this.
+IDEMPOTENCY_LOCK_TTL = getattr(settings, "IDEMPOTENCY_LOCK_TTL", 60)
+IDEMPOTENCY_WAIT = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+_PENDING = "pending"
+_DONE = "done"
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method}:{request.path}:{body}".encode("utf-8")).hexdigest()
+
+
+def _replay(record):
+    response = HttpResponse(record["body"], status=record["status"], content_type=record["content_type"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _wait_for(cache_key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        record = cache.get(cache_key)
+        if record is None or record["state"] == _DONE:
+            return record
+    return cache.get(cache_key)
+
+
+def _conflict(detail, code, retry_after=None):
+    response = Response({"detail": detail}, status=code)
+    if retry_after is not None:
+        response["Retry-After"] = str(retry_after)
+    return response
+
+
+def idempotent(action):
+    """ViewSet action decorator; see module docstring."""
+    @functools.wraps(action)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return action(view, request, *args, **kwargs)
+        if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return _conflict(
+                f"Idempotency-Key must be at most {IDEMPOTENCY_MAX_KEY_LENGTH} characters.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+        cache_key = tenant_cache_key(IDEMPOTENCY_KEY_PREFIX, request.user.id, action.__name__, key)
+        fingerprint = _fingerprint(request)
+
+        if not cache.add(cache_key, {"state": _PENDING, "fingerprint": fingerprint}, IDEMPOTENCY_LOCK_TTL):
+            record = cache.get(cache_key)
+            if record is not None and record["fingerprint"] != fingerprint:
+                return _conflict(
+                    "Idempotency-Key was already used for a different request.",
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record is not None and record["state"] == _PENDING:
+                record = _wait_for(cache_key)
+            if record is not None and record["state"] == _DONE:
+                return _replay(record)
+            if record is not None:
+                return _conflict(
+                    "A request with this Idempotency-Key is still being processed.",
+                    status.HTTP_409_CONFLICT,
+                    retry_after=1,
+                )
+            # The original failed and released the key: run this one instead.
+            if not cache.add(cache_key, {"state": _PENDING, "fingerprint": fingerprint}, IDEMPOTENCY_LOCK_TTL):
+                return _conflict(
+                    "A request with this Idempotency-Key is still being processed.",
+                    status.HTTP_409_CONFLICT,
+                    retry_after=1,
+                )
+
+        try:
+            try:
+                response = action(view, request, *args, **kwargs)
+            except Exception as exc:
+                # API errors (validation, permission) become responses and are stored;
+                # anything else propagates below and releases the key.
+                response = view.handle_exception(exc)
+            response = view.finalize_response(request, response, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500 or getattr(response, "streaming", False):
+            cache.delete(cache_key)
+            return response
+        cache.set(cache_key, {
+            "state": _DONE,
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "content_type": response.get("Content-Type"),
+            "body": response.content,
+        }, IDEMPOTENCY_TTL)
+        return response
+    return wrapper
@@ -0,0 +1,79 @@
+# apps/core/projection.py
+"""
+Sparse fieldsets for read endpoints: ?fields=a,b,c / ?exclude=x,y.
+
+The requested serializer fields decide both what is emitted and what is loaded:
+project_queryset() turns them into QuerySet.only(), so unrequested heavy columns
+(large JSONB blobs) are neither transferred from Postgres nor decoded.
+
+Serializers opt in with ProjectedFieldsMixin and describe, in Meta, which model
+columns each non-trivial field reads:
+
+    class Meta:
+        projection_sources = {"results": ("payload__results",)}
+        projection_related = {"results": ("payload",)}  # joined only when selected
+        projection_always = ("id", "exam_assignment")  # e.g. select_related FKs
+
+Fields without an entry read the model field of the same name (if any).
+"""
+from rest_framework.exceptions import ValidationError
+
+
+def _split(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def requested_fields(request, serializer_class, default_exclude=()):
+    """
+    Serializer field names to emit for this request, in declaration order.
+    Without ?fields=, all fields except default_exclude (the endpoint's summary view).
+    """
+    available = list(serializer_class().fields)
+    fields = _split(request.query_params.get("fields"))
+    exclude = _split(request.query_params.get("exclude"))
+    unknown = sorted(set(fields + exclude) - set(available))
+    if unknown:
+        raise ValidationError({
+            "fields": f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."
+        })
+    selected = set(fields) if fields else set(available) - set(default_exclude)
+    selected -= set(exclude)
+    return [name for name in available if name in selected]
+
+
+def projected_columns(serializer_class, selected):
+    """Model column paths needed to render `selected` fields."""
+    meta = serializer_class.Meta
+    sources = getattr(meta, "projection_sources", {})
+    model_fields = {f.name for f in meta.model._meta.concrete_fields}
+    columns = list(getattr(meta, "projection_always", ("id",)))
+    for name in selected:
+        if name in sources:
+            columns.extend(sources[name])
+        elif name in model_fields:
+            columns.append(name)
+    return list(dict.fromkeys(columns))
+
+
+def projected_relations(serializer_class, selected):
+    """Relations to select_related for `selected` fields (Meta.projection_related)."""
+    related = getattr(serializer_class.Meta, "projection_related", {})
+    return list(dict.fromkeys(path for name in selected for path in related.get(name, ())))
+
+
+def project_queryset(queryset, serializer_class, selected):
+    relations = projected_relations(serializer_class, selected)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*projected_columns(serializer_class, selected))
+
+
+class ProjectedFieldsMixin:
+    """Serializer mixin: keep only the fields listed in context["projection"] (if given)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        projection = self.context.get("projection")
+        if projection is not None:
+            for name in set(self.fields) - set(projection):
+                self.fields.pop(name)
@@ -0,0 +1,448 @@
+# apps/mock_tests/importer.py
+"""
+Bulk import of a whole MockTest (sections, question groups, questions, media)
+from one package, instead of hundreds of separate POSTs.
+
+A package is either a JSON document or a ZIP holding `test.json` plus the media
+files it references by their path inside the ZIP:
+
+    {
+      "title": "JLPT N1 Mock 2026", "level": "N1", "description": "", "pass_score": 100,
+      "sections": [{
+        "name": "Listening", "section_type": "LISTENING", "duration": 55,
+        "question_groups": [{
+          "mondai_number": 1, "title": "Task-based comprehension", "instruction": "...",
+          "reading_text": null, "audio_file": "media/mondai1.mp3", "image": null,
+          "questions": [{
+            "text": "...", "score": 1, "image": "media/q1.png", "audio_file": null,
+            "options": [{"text": "...", "is_correct": true}, {"text": "...", "is_correct": false}]
+          }]
+        }]
+      }]
+    }
+
+`order` (sections, groups, questions) and `question_number` default to the
+position in the list. The import runs in three steps:
+
+1. The whole tree is validated in memory (same rules as the serializers); all
+   errors are reported at once with their path, nothing is written.
+2. Referenced media are uploaded to storage in parallel (IMPORT_MEDIA_WORKERS),
+   each ZIP member once.
+3. One transaction: one bulk_create per level (test, sections, groups,
+   questions). correct_option_index and the section / test total scores are
+   computed while building the rows (bulk_create skips Question.save and the
+   recalc signal), so the number of queries does not depend on the test size.
+
+The test is created as DRAFT. Uploaded files are deleted again if the
+transaction fails.
+"""
+import io
+import json
+import logging
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+from .models import MockTest, TestSection, QuestionGroup, Question
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MANIFEST = "test.json"
+IMPORT_MAX_PACKAGE_SIZE = getattr(settings, "MOCK_TESTS_IMPORT_MAX_SIZE_MB", 100) * 1024 * 1024
+IMPORT_MAX_QUESTIONS = 1000
+IMPORT_MAX_ERRORS = 50
+IMPORT_MEDIA_WORKERS = getattr(settings, "MOCK_TESTS_IMPORT_MEDIA_WORKERS", 8)
+IMPORT_BATCH_SIZE = 500
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".aac"}
+
+# (model, field) -> allowed extensions
+_MEDIA_FIELDS = {
+    (QuestionGroup, "audio_file"): AUDIO_EXTENSIONS,
+    (QuestionGroup, "image"): IMAGE_EXTENSIONS,
+    (Question, "audio_file"): AUDIO_EXTENSIONS,
+    (Question, "image"): IMAGE_EXTENSIONS,
+}
+
+
+class _Errors(list):
+    def add(self, path, message):
+        if len(self) < IMPORT_MAX_ERRORS:
+            self.append(f"{path}: {message}")
+
+
+class Package:
+    """Parsed package: the test tree and, for ZIP packages, the archive and its base directory."""
+
+    def __init__(self, tree, archive=None, base=""):
+        self.tree = tree
+        self.archive = archive
+        self.base = base
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+    def member(self, reference):
+        """ZIP member name of a media reference, or None if it is not in the package."""
+        if self.archive is None:
+            return None
+        name = posixpath.normpath(posixpath.join(self.base, reference.lstrip("/")))
+        if name.startswith("../") or name == "..":
+            return None
+        try:
+            self.archive.getinfo(name)
+        except KeyError:
+            return None
+        return name
+
+
+def read_package(fileobj) -> Package:
+    """Parse an uploaded ZIP or JSON package. Raises ValidationError."""
+    size = getattr(fileobj, "size", None)
+    if size is not None and size > IMPORT_MAX_PACKAGE_SIZE:
+        raise ValidationError(f"Package is larger than {IMPORT_MAX_PACKAGE_SIZE // (1024 * 1024)} MB.")
+    data = fileobj.read(IMPORT_MAX_PACKAGE_SIZE + 1)
+    if len(data) > IMPORT_MAX_PACKAGE_SIZE:
+        raise ValidationError(f"Package is larger than {IMPORT_MAX_PACKAGE_SIZE // (1024 * 1024)} MB.")
+
+    buffer = io.BytesIO(data)
+    if not zipfile.is_zipfile(buffer):
+        return Package(_load_json(data))
+
+    try:
+        archive = zipfile.ZipFile(buffer)
+    except zipfile.BadZipFile:
+        raise ValidationError("File is not a valid ZIP archive.")
+    manifests = sorted(
+        (name for name in archive.namelist() if posixpath.basename(name) == IMPORT_MANIFEST),
+        key=lambda name: name.count("/"),
+    )
+    if not manifests:
+        archive.close()
+        raise ValidationError(f"ZIP package must contain {IMPORT_MANIFEST}.")
+    if sum(info.file_size for info in archive.infolist()) > IMPORT_MAX_PACKAGE_SIZE:
+        archive.close()
+        raise ValidationError("Package content is too large when uncompressed.")
+    try:
+        tree = _load_json(archive.read(manifests[0]))
+    except ValidationError:
+        archive.close()
+        raise
+    # Media paths are relative to the directory holding test.json.
+    return Package(tree, archive, posixpath.dirname(manifests[0]))
+
+
+def _load_json(data):
+    try:
+        return json.loads(data)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValidationError(f"{IMPORT_MANIFEST} is not valid JSON: {e}")
+
+
+# -----------------------------------------------------------------------------
+# Validation
+# -----------------------------------------------------------------------------
+
+def _string(errors, path, node, key, required=False, max_length=None, nullable=False):
+    value = node.get(key)
+    if value is None:
+        if required:
+            errors.add(path, f"'{key}' is required.")
+        return None if nullable else ""
+    if not isinstance(value, str):
+        errors.add(path, f"'{key}' must be a string.")
+        return ""
+    if required and not value.strip():
+        errors.add(path, f"'{key}' must not be empty.")
+    if max_length is not None and len(value) > max_length:
+        errors.add(path, f"'{key}' must be at most {max_length} characters.")
+    return value
+
+
+def _integer(errors, path, node, key, default=None, minimum=0):
+    value = node.get(key, default)
+    if value is None:
+        errors.add(path, f"'{key}' is required.")
+        return 0
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        errors.add(path, f"'{key}' must be an integer >= {minimum}.")
+        return 0
+    return value
+
+
+def _list(errors, path, node, key):
+    value = node.get(key)
+    if not isinstance(value, list) or not value:
+        errors.add(path, f"'{key}' must be a non-empty list.")
+        return []
+    return value
+
+
+def _objects(errors, path, items):
+    for idx, item in enumerate(items):
+        item_path = f"{path}[{idx}]"
+        if not isinstance(item, dict):
+            errors.add(item_path, "must be an object.")
+            continue
+        yield idx, item_path, item
+
+
+def _options(errors, path, value):
+    """Same rules as QuestionSerializer.validate_options; returns the correct option index."""
+    if not isinstance(value, list) or not value:
+        errors.add(path, "'options' must be a non-empty list.")
+        return None
+    for idx, opt in enumerate(value):
+        if not isinstance(opt, dict):
+            errors.add(path, f"Option at index {idx} must be a dictionary.")
+            return None
+        if "text" not in opt:
+            errors.add(path, f"Option at index {idx} must have a 'text' field.")
+            return None
+        if not isinstance(opt.get("is_correct"), bool):
+            errors.add(path, f"Option at index {idx} 'is_correct' must be a boolean.")
+            return None
+    correct = [idx for idx, opt in enumerate(value) if opt["is_correct"]]
+    if len(correct) != 1:
+        errors.add(path, f"There must be exactly one correct option. Found {len(correct)}.")
+        return None
+    return correct[0]
+
+
+def _media(errors, path, node, key, model, package, media):
+    reference = node.get(key)
+    if reference is None or reference == "":
+        return
+    if not isinstance(reference, str):
+        errors.add(path, f"'{key}' must be a path inside the ZIP package.")
+        return
+    member = package.member(reference)
+    if member is None:
+        errors.add(path, f"'{key}' file '{reference}' is not in the package.")
+        return
+    extension = posixpath.splitext(member)[1].lower()
+    allowed = _MEDIA_FIELDS[(model, key)]
+    if extension not in allowed:
+        errors.add(path, f"'{key}' must be one of {', '.join(sorted(allowed))}.")
+        return
+    media.append((model, key, member))
+
+
+def validate_tree(package):
+    """
+    Validate the whole tree in memory. Returns the list of media references
+    [(model, field, member)] in tree order; raises ValidationError with every
+    problem found (up to IMPORT_MAX_ERRORS).
+    """
+    tree = package.tree
+    errors = _Errors()
+    media = []
+    if not isinstance(tree, dict):
+        raise ValidationError("Package must be a JSON object describing one mock test.")
+
+    _string(errors, "test", tree, "title", required=True, max_length=255)
+    _string(errors, "test", tree, "description")
+    if tree.get("level") not in MockTest.Level.values:
+        errors.add("test", f"'level' must be one of {', '.join(MockTest.Level.values)}.")
+    _integer(errors, "test", tree, "pass_score", default=90)
+
+    n_questions = 0
+    sections = _list(errors, "test", tree, "sections")
+    for _, s_path, section in _objects(errors, "sections", sections):
+        _string(errors, s_path, section, "name", required=True, max_length=255)
+        if section.get("section_type") not in TestSection.SectionType.values:
+            errors.add(s_path, f"'section_type' must be one of {', '.join(TestSection.SectionType.values)}.")
+        _integer(errors, s_path, section, "duration", minimum=1)
+        _integer(errors, s_path, section, "order", default=1)
+
+        groups = _list(errors, s_path, section, "question_groups")
+        for _, g_path, group in _objects(errors, f"{s_path}.question_groups", groups):
+            _integer(errors, g_path, group, "mondai_number", default=1)
+            _integer(errors, g_path, group, "order", default=1)
+            _string(errors, g_path, group, "title", max_length=255)
+            _string(errors, g_path, group, "instruction")
+            _string(errors, g_path, group, "reading_text", nullable=True)
+            _media(errors, g_path, group, "audio_file", QuestionGroup, package, media)
+            _media(errors, g_path, group, "image", QuestionGroup, package, media)
+
+            questions = _list(errors, g_path, group, "questions")
+            n_questions += len(questions)
+            for _, q_path, question in _objects(errors, f"{g_path}.questions", questions):
+                _string(errors, q_path, question, "text")
+                _integer(errors, q_path, question, "question_number", default=1)
+                _integer(errors, q_path, question, "score", default=1)
+                _integer(errors, q_path, question, "order", default=1)
+                _options(errors, q_path, question.get("options"))
+                _media(errors, q_path, question, "audio_file", Question, package, media)
+                _media(errors, q_path, question, "image", Question, package, media)
+
+    if n_questions > IMPORT_MAX_QUESTIONS:
+        errors.add("test", f"At most {IMPORT_MAX_QUESTIONS} questions per package.")
+    if errors:
+        raise ValidationError(list(errors))
+    return media
+
+
+# -----------------------------------------------------------------------------
+# Media upload
+# -----------------------------------------------------------------------------
+
+def _upload_names(media):
+    """
+    Storage name for each distinct (model, field, member). The tenant directory
+    is resolved once per field here, in the request thread (the upload_to
+    callables read the current schema, which worker threads do not inherit).
+    """
+    prefixes, taken, names = {}, set(), {}
+    for model, field_name, member in media:
+        key = (model, field_name, member)
+        if key in names:
+            continue
+        field = model._meta.get_field(field_name)
+        if (model, field_name) not in prefixes:
+            prefixes[(model, field_name)] = posixpath.dirname(field.upload_to(None, "file"))
+        stem, extension = posixpath.splitext(get_valid_filename(posixpath.basename(member)))
+        name = posixpath.join(prefixes[(model, field_name)], f"{stem}{extension}")
+        suffix = 1
+        # Same file name from different ZIP folders: keep both (parallel saves would race).
+        while name in taken:
+            suffix += 1
+            name = posixpath.join(prefixes[(model, field_name)], f"{stem}_{suffix}{extension}")
+        taken.add(name)
+        names[key] = (field.storage, name)
+    return names
+
+
+def upload_media(package, media):
+    """Upload every referenced file in parallel; returns {(model, field, member): stored name}."""
+    targets = _upload_names(media)
+    if not targets:
+        return {}
+
+    def upload(member, storage, name):
+        return storage.save(name, ContentFile(package.archive.read(member)))
+
+    stored, failure = {}, None
+    with ThreadPoolExecutor(max_workers=IMPORT_MEDIA_WORKERS) as pool:
+        futures = [
+            (key, pool.submit(upload, key[2], storage, name))
+            for key, (storage, name) in targets.items()
+        ]
+        for key, future in futures:
+            try:
+                stored[key] = future.result()
+            except Exception as e:
+                failure = failure or e
+    if failure is not None:
+        delete_media(stored)
+        raise failure
+    return stored
+
+
+def delete_media(stored):
+    """Remove uploaded files of an import that did not complete."""
+    for (model, field_name, _member), name in stored.items():
+        try:
+            model._meta.get_field(field_name).storage.delete(name)
+        except Exception:
+            logger.warning("Could not delete imported media %s", name, exc_info=True)
+
+
+# -----------------------------------------------------------------------------
+# Import
+# -----------------------------------------------------------------------------
+
+def _media_value(node, key, model, package, stored):
+    reference = node.get(key)
+    if not reference:
+        return None
+    return stored[(model, key, package.member(reference))]
+
+
+def build_tree(package, stored, created_by_id=None):
+    """Unsaved model instances of every level, with ids, links and totals set."""
+    tree = package.tree
+    mock_test = MockTest(
+        title=tree["title"],
+        level=tree["level"],
+        description=tree.get("description") or "",
+        status=MockTest.Status.DRAFT,
+        created_by_id=created_by_id,
+        pass_score=tree.get("pass_score", 90),
+        total_score=0,
+    )
+    sections, groups, questions = [], [], []
+    for s_idx, s_node in enumerate(tree["sections"], start=1):
+        section = TestSection(
+            mock_test=mock_test,
+            name=s_node["name"],
+            section_type=s_node["section_type"],
+            duration=s_node["duration"],
+            order=s_node.get("order", s_idx),
+            total_score=0,
+        )
+        sections.append(section)
+        for g_idx, g_node in enumerate(s_node["question_groups"], start=1):
+            group = QuestionGroup(
+                section=section,
+                mondai_number=g_node.get("mondai_number", g_idx),
+                title=g_node.get("title") or "",
+                instruction=g_node.get("instruction") or "",
+                reading_text=g_node.get("reading_text"),
+                audio_file=_media_value(g_node, "audio_file", QuestionGroup, package, stored),
+                image=_media_value(g_node, "image", QuestionGroup, package, stored),
+                order=g_node.get("order", g_idx),
+            )
+            groups.append(group)
+            for q_idx, q_node in enumerate(g_node["questions"], start=1):
+                options = q_node["options"]
+                question = Question(
+                    group=group,
+                    text=q_node.get("text") or "",
+                    question_number=q_node.get("question_number", q_idx),
+                    image=_media_value(q_node, "image", Question, package, stored),
+                    audio_file=_media_value(q_node, "audio_file", Question, package, stored),
+                    score=q_node.get("score", 1),
+                    order=q_node.get("order", q_idx),
+                    options=options,
+                    # What Question.save() would set; bulk_create does not call save().
+                    correct_option_index=next(i for i, opt in enumerate(options) if opt["is_correct"]),
+                )
+                questions.append(question)
+                # Same totals recalc_section_and_mock_scores would compute afterwards.
+                section.total_score += question.score
+        mock_test.total_score += section.total_score
+    return mock_test, sections, groups, questions
+
+
+def import_mock_test(package, created_by_id=None):
+    """
+    Validate, upload media, and create the whole test in one transaction.
+    Returns (mock_test, counts). Raises ValidationError for invalid packages.
+    """
+    media = validate_tree(package)
+    stored = upload_media(package, media)
+    try:
+        mock_test, sections, groups, questions = build_tree(package, stored, created_by_id)
+        with transaction.atomic():
+            MockTest.objects.bulk_create([mock_test])
+            TestSection.objects.bulk_create(sections, batch_size=IMPORT_BATCH_SIZE)
+            QuestionGroup.objects.bulk_create(groups, batch_size=IMPORT_BATCH_SIZE)
+            Question.objects.bulk_create(questions, batch_size=IMPORT_BATCH_SIZE)
+    except Exception:
+        delete_media(stored)
+        raise
+    return mock_test, {
+        "sections": len(sections),
+        "question_groups": len(groups),
+        "questions": len(questions),
+        "media_files": len(stored),
+    }
@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.tenant_utils import schema_context
+from apps.mock_tests.importer import import_mock_test, read_package
+
+
+class Command(BaseCommand):
+    help = 'Import a whole mock test (sections, groups, questions, media) from a JSON or ZIP package'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Package file: test.json or a ZIP with test.json and media')
+        parser.add_argument('--schema', type=str, required=True, help='Tenant schema to import into')
+        parser.add_argument('--created-by', type=int, help='User id recorded as the test creator')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                package = read_package(handle)
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+        except ValidationError as e:
+            raise CommandError('\n'.join(e.messages))
+
+        try:
+            with schema_context(options['schema']):
+                mock_test, counts = import_mock_test(package, created_by_id=options['created_by'])
+        except ValidationError as e:
+            raise CommandError('Invalid import package:\n' + '\n'.join(e.messages))
+        finally:
+            package.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {options["schema"]}: imported "{mock_test.title}" ({mock_test.id}) as DRAFT — '
+            f'{counts["sections"]} sections, {counts["question_groups"]} groups, '
+            f'{counts["questions"]} questions, {counts["media_files"]} media files'
+        ))
@@ -69,6 +69,10 @@ class MockTest(TenantBaseModel):
     created_by_id = models.BigIntegerField(null=True, blank=True)
     pass_score = models.PositiveIntegerField(default=90)
     total_score = models.PositiveIntegerField(default=180)
+    content_version = models.PositiveIntegerField(
+        default=1,
+        help_text="Bumped on every publish/unpublish; keys cached answer keys and papers",
+    )
 
     class Meta:
         db_table = 'mock_tests'
@@ -200,6 +204,8 @@ class QuizQuestion(TenantBaseModel):
     # OPTIMIZATION: QuizOption model o'rniga JSONField
     options = models.JSONField(default=list)
     correct_option_index = models.PositiveSmallIntegerField(null=True, blank=True)
+    # MockTest question this was copied from (adaptive practice quizzes)
+    source_question_id = models.UUIDField(null=True, blank=True)
 
     class Meta:
         db_table = 'quiz_questions'
@@ -142,6 +142,13 @@ prefetch_related(
 1 query for MockTest + 1 for sections + 1 for groups + 1 for questions = **4 queries total**
 (not 1 + 3 + 10 + 50 = 64 queries without optimization).
 
+**Bulk Import (POST /mock-tests/import/):**
+
+A whole test package is validated in memory, its media uploaded in parallel, and the
+tree inserted with one `bulk_create` per level in one transaction. Scores and
+`correct_option_index` are computed while building the rows (no per-question signal
+recalculation), so the query count does not grow with the number of questions.
+
 **created_by Batch Fetch (user_map):**
 
 **NOTE:** Currently NOT implemented in list() views. Future enhancement would follow
@@ -304,6 +311,25 @@ Physical files are NOT duplicated in storage.
 
 **Response:** Returns the newly created MockTest with status=DRAFT, full nested hierarchy.
 """
+MOCK_TEST_IMPORT_DESC = """
+Create a whole mock test (sections, question groups, questions, media) from one package
+instead of one POST per object. Send a ZIP holding `test.json` and the media files it
+references (paths inside the ZIP) as `file`, or the test tree itself as a JSON body.
+
+**test.json:** MockTest fields (`title`, `level`, `description`, `pass_score`) with nested
+`sections` → `question_groups` → `questions`, using the same field names as the regular
+endpoints. `audio_file` / `image` hold ZIP paths. `order` and `question_number` default to
+the position in the list.
+
+**Behaviour:**
+- The whole package is validated before anything is written; all errors are returned at once.
+- Media are uploaded in parallel; each level is inserted with one bulk query in a single
+  transaction, and section / test total scores are computed once. A full N1 test takes a
+  handful of queries.
+- The test is created as **DRAFT** with created_by_id = current user.
+
+Also available as `manage.py import_mock_test <package> --schema <tenant>`. Only CENTER_ADMIN or TEACHER.
+"""
 
 mock_test_viewset_schema = extend_schema_view(
     list=extend_schema(
@@ -579,6 +605,84 @@ mock_test_viewset_schema = extend_schema_view(
             404: RESP_404,
         },
     ),
+    item_statistics=extend_schema(
+        tags=["Mock Tests"],
+        summary="Item statistics",
+        description=(
+            "Per-question item analysis built from graded submissions: difficulty (`p_value`, share "
+            "correct), discrimination (`point_biserial` against the total score) and option choice "
+            "frequencies. Statistics are aggregated incrementally by a background task, so new "
+            "submissions appear within a few minutes. Only CENTER_ADMIN or TEACHER."
+        ),
+        responses={
+            200: OpenApiResponse(
+                description="Items in paper order (questions with no responses yet are omitted).",
+                examples=[
+                    OpenApiExample(
+                        "Item statistics",
+                        value={
+                            "mock_test_id": "aa0e8400-e29b-41d4-a716-446655440001",
+                            "items": [
+                                {
+                                    "question_id": "bb0e8400-e29b-41d4-a716-446655440010",
+                                    "section_type": "VOCAB",
+                                    "responses": 120,
+                                    "p_value": 0.6833,
+                                    "point_biserial": 0.4121,
+                                    "option_frequencies": {"0": 0.1, "1": 0.6833, "2": 0.15, "3": 0.05},
+                                    "correct_index": 1,
+                                },
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            401: RESP_401,
+            403: OpenApiResponse(description="Only CENTER_ADMIN or TEACHER can view item statistics."),
+            404: RESP_404,
+        },
+    ),
+    question_timing=extend_schema(
+        tags=["Mock Tests"],
+        summary="Question timing",
+        description=(
+            "Per-question time statistics from student telemetry (POST /submissions/telemetry/): "
+            "students with events, mean / median / p90 time on the question per attempt (ms), "
+            "mean views and answer changes. High median or p90 time marks questions students get "
+            "stuck on. Events are written in batches every few seconds; results are cached for a "
+            "minute. Only CENTER_ADMIN or TEACHER."
+        ),
+        responses={
+            200: OpenApiResponse(
+                description="Items in paper order (questions without events are omitted).",
+                examples=[
+                    OpenApiExample(
+                        "Question timing",
+                        value={
+                            "mock_test_id": "aa0e8400-e29b-41d4-a716-446655440001",
+                            "items": [
+                                {
+                                    "question_id": "bb0e8400-e29b-41d4-a716-446655440010",
+                                    "section_type": "GRAMMAR_READING",
+                                    "students": 118,
+                                    "mean_time_ms": 48210,
+                                    "median_time_ms": 41000,
+                                    "p90_time_ms": 97500,
+                                    "mean_views": 2.4,
+                                    "mean_answer_changes": 0.8,
+                                },
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            401: RESP_401,
+            403: RESP_403,
+            404: RESP_404,
+        },
+    ),
     clone=extend_schema(
         tags=["Mock Tests"],
         summary="Clone mock test",
@@ -633,6 +737,59 @@ mock_test_viewset_schema = extend_schema_view(
             ),
         ],
     ),
+    import_package=extend_schema(
+        tags=["Mock Tests"],
+        summary="Import mock test package",
+        description=MOCK_TEST_IMPORT_DESC,
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {
+                    "file": {
+                        "type": "string",
+                        "format": "binary",
+                        "description": "ZIP with test.json and the media it references, or a plain JSON file.",
+                    },
+                },
+            },
+            "application/json": {"type": "object"},
+        },
+        responses={
+            201: OpenApiResponse(
+                description="Test created as DRAFT.",
+                examples=[
+                    OpenApiExample(
+                        "Imported",
+                        value={
+                            "detail": "MockTest imported successfully.",
+                            "imported": {"sections": 3, "question_groups": 14, "questions": 107, "media_files": 16},
+                            "data": {"id": "cc0e8400-e29b-41d4-a716-446655440007", "title": "JLPT N1 Mock 2026", "level": "N1", "status": "DRAFT", "total_score": 107},
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: OpenApiResponse(
+                description="Invalid package; every problem is listed with its path. Nothing is saved.",
+                examples=[
+                    OpenApiExample(
+                        "Validation errors",
+                        value={
+                            "detail": "Invalid import package.",
+                            "errors": [
+                                "sections[2].question_groups[0]: 'audio_file' file 'media/m1.mp3' is not in the package.",
+                                "sections[0].question_groups[3].questions[1]: There must be exactly one correct option. Found 2.",
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            401: RESP_401,
+            403: OpenApiResponse(description="Only CENTER_ADMIN or TEACHER can import tests."),
+        },
+    ),
 )
 
 
@@ -1168,6 +1325,52 @@ quiz_viewset_schema = extend_schema_view(
         description=QUIZ_DESTROY_DESC,
         responses={204: OpenApiResponse(description="Deleted."), 401: RESP_401, 403: RESP_403, 404: RESP_404},
     ),
+    adaptive=extend_schema(
+        tags=["Quizzes"],
+        summary="Generate adaptive practice quiz",
+        description=(
+            "Create a quiz for one student from standalone questions (no reading passage, audio or "
+            "group diagram) of published mock tests at `level`. Questions are chosen from the student's "
+            "mastery vector, which grading keeps up to date per section type and mondai: weak skills "
+            "first, difficulty slightly above the student's level, at most 40% of the quiz per skill. "
+            "Questions are copied into the quiz; answers to it count towards the student's mastery. "
+            "Assign the quiz through a homework. Only CENTER_ADMIN, or TEACHER of one of the student's groups."
+        ),
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "student_id": {"type": "integer"},
+                    "level": {"type": "string", "enum": ["N5", "N4", "N3", "N2", "N1"]},
+                    "question_count": {"type": "integer", "default": 20, "minimum": 1, "maximum": 50},
+                    "title": {"type": "string"},
+                },
+                "required": ["student_id", "level"],
+            }
+        },
+        responses={
+            201: OpenApiResponse(
+                description="Created quiz and the student's skills, weakest first.",
+                examples=[
+                    OpenApiExample(
+                        "Adaptive quiz",
+                        value={
+                            "quiz": {"id": "uuid", "title": "Adaptive practice N4", "is_active": True},
+                            "student_id": 42,
+                            "skills": [
+                                {"skill": "VOCAB:2", "mastery": 0.412, "attempts": 9.6},
+                                {"skill": "VOCAB", "mastery": 0.588, "attempts": 32.8},
+                            ],
+                        },
+                        response_only=True,
+                    ),
+                ],
+            ),
+            400: RESP_400_VALIDATION,
+            401: RESP_401,
+            403: RESP_403,
+        },
+    ),
 )
 
 
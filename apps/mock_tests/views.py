@@ -167,7 +167,12 @@ class MockTestViewSet(viewsets.ModelViewSet):
             mock_test.status = MockTest.Status.PUBLISHED
             action = "published"
         
-        mock_test.save(update_fields=['status'])
+        # New content version on every toggle: cached answer keys are keyed by it
+        previous_version = mock_test.content_version
+        mock_test.content_version = previous_version + 1
+        mock_test.save(update_fields=['status', 'content_version'])
+        from apps.attempts.answer_keys import invalidate_answer_key
+        transaction.on_commit(lambda: invalidate_answer_key(mock_test.id, previous_version))
         
         serializer = self.get_serializer(mock_test)
         return Response({
@@ -175,6 +180,34 @@ class MockTestViewSet(viewsets.ModelViewSet):
             "data": serializer.data
         })
 
+    @action(detail=True, methods=["get"], url_path="item-statistics")
+    def item_statistics(self, request, pk=None):
+        mock_test = self.get_object()
+        if request.user.role not in ("CENTER_ADMIN", "TEACHER"):
+            return Response(
+                {"detail": "Only center admins or teachers can view item statistics."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        from apps.attempts.item_stats import get_item_statistics
+        return Response({
+            "mock_test_id": str(mock_test.id),
+            "items": get_item_statistics(mock_test),
+        })
+
+    @action(detail=True, methods=["get"], url_path="question-timing")
+    def question_timing(self, request, pk=None):
+        mock_test = self.get_object()
+        if request.user.role not in ("CENTER_ADMIN", "TEACHER"):
+            return Response(
+                {"detail": "Only center admins or teachers can view question timing."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        from apps.attempts.telemetry import get_timing_statistics
+        return Response({
+            "mock_test_id": str(mock_test.id),
+            "items": get_timing_statistics(mock_test),
+        })
+
     @action(detail=True, methods=["post"], url_path="clone")
     def clone(self, request, pk=None):
         source = self.get_object()
@@ -239,6 +272,36 @@ class MockTestViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(cloned, context={"request": request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_package(self, request):
+        if request.user.role not in ("CENTER_ADMIN", "TEACHER"):
+            return Response(
+                {"detail": "Only center admins or teachers can import tests."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        from django.core.exceptions import ValidationError as DjangoValidationError
+        from rest_framework.exceptions import ValidationError as DRFValidationError
+        from .importer import Package, import_mock_test, read_package
+
+        upload = request.FILES.get("file")
+        if upload is None and not (request.content_type or "").startswith("application/json"):
+            raise DRFValidationError({"detail": "Upload a ZIP or JSON package as 'file', or send the test as JSON."})
+        try:
+            package = read_package(upload) if upload is not None else Package(request.data)
+            try:
+                mock_test, counts = import_mock_test(package, created_by_id=request.user.id)
+            finally:
+                package.close()
+        except DjangoValidationError as e:
+            raise DRFValidationError({"detail": "Invalid import package.", "errors": e.messages})
+
+        serializer = self.get_serializer(mock_test, context={"request": request})
+        return Response({
+            "detail": "MockTest imported successfully.",
+            "imported": counts,
+            "data": serializer.data,
+        }, status=status.HTTP_201_CREATED)
+
 
 @test_section_viewset_schema
 class TestSectionViewSet(viewsets.ModelViewSet):
@@ -457,6 +520,64 @@ class QuizViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by_id=self.request.user.id)
 
+    @action(detail=False, methods=["post"], url_path="adaptive")
+    def adaptive(self, request):
+        user = request.user
+        if user.role not in ("CENTER_ADMIN", "TEACHER"):
+            return Response(
+                {"detail": "Only center admins or teachers can generate practice quizzes."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        from rest_framework.exceptions import ValidationError as DRFValidationError
+        from apps.attempts.practice import PRACTICE_DEFAULT_SIZE, PRACTICE_MAX_SIZE, generate_practice_quiz
+
+        level = request.data.get("level")
+        if level not in MockTest.Level.values:
+            raise DRFValidationError({"level": f"Must be one of: {', '.join(MockTest.Level.values)}."})
+        try:
+            student_id = int(request.data.get("student_id"))
+            question_count = int(request.data.get("question_count", PRACTICE_DEFAULT_SIZE))
+        except (TypeError, ValueError):
+            raise DRFValidationError({"detail": "student_id and question_count must be integers."})
+        if not 1 <= question_count <= PRACTICE_MAX_SIZE:
+            raise DRFValidationError({"question_count": f"Must be between 1 and {PRACTICE_MAX_SIZE}."})
+
+        from apps.authentication.models import User
+        is_student = with_public_schema(
+            lambda: User.objects.filter(
+                id=student_id, center_id=user.center_id, role__in=("STUDENT", "GUEST"),
+            ).exists()
+        )
+        if not is_student:
+            raise DRFValidationError({"student_id": "Student not found."})
+        if user.role == "TEACHER":
+            from apps.groups.models import GroupMembership
+
+            teaching_group_ids = GroupMembership.objects.filter(
+                user_id=user.id, role_in_group=GroupMembership.ROLE_TEACHER,
+            ).values("group_id")
+            if not GroupMembership.objects.filter(
+                user_id=student_id,
+                role_in_group=GroupMembership.ROLE_STUDENT,
+                group_id__in=teaching_group_ids,
+            ).exists():
+                return Response(
+                    {"detail": "You can only generate practice quizzes for students in your groups."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+
+        quiz, skills = generate_practice_quiz(
+            student_id, level, question_count,
+            created_by_id=user.id, title=request.data.get("title") or None,
+        )
+        if quiz is None:
+            raise DRFValidationError({"level": "No standalone questions of published tests at this level."})
+        serializer = self.get_serializer(quiz, context={"request": request})
+        return Response(
+            {"quiz": serializer.data, "student_id": student_id, "skills": skills},
+            status=status.HTTP_201_CREATED,
+        )
+
 
 @quiz_question_viewset_schema
 class QuizQuestionViewSet(viewsets.ModelViewSet):
@@ -170,6 +170,34 @@ CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=env("REDIS_URL", default="r
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=CELERY_BROKER_URL)
 CELERY_TIMEZONE = TIME_ZONE
 
+# Grading gets its own queue so a room-wide submit burst cannot starve other tasks.
+# Run a dedicated worker with: celery -A config worker -Q grading
+CELERY_TASK_ROUTES = {
+    'apps.attempts.tasks.grade_submission_task': {'queue': 'grading'},
+}
+
+# submit-exam: record answers, return 202 and grade on the "grading" queue.
+ATTEMPTS_ASYNC_GRADING = env.bool("ATTEMPTS_ASYNC_GRADING", default=False)
+
+# Store graded MockTest answers/results as packed bytes instead of JSON (apps/attempts/encoding.py).
+ATTEMPTS_COMPACT_STORAGE = env.bool("ATTEMPTS_COMPACT_STORAGE", default=False)
+
+# start-exam waiting room: Redis token buckets per tenant and per room (apps/attempts/admission.py).
+# Starts above the rate get 429 with a queue position and Retry-After.
+ATTEMPTS_ADMISSION_ENABLED = env.bool("ATTEMPTS_ADMISSION_ENABLED", default=False)
+ATTEMPTS_ADMISSION_TENANT_RATE = env.float("ATTEMPTS_ADMISSION_TENANT_RATE", default=50.0)
+ATTEMPTS_ADMISSION_TENANT_BURST = env.int("ATTEMPTS_ADMISSION_TENANT_BURST", default=100)
+ATTEMPTS_ADMISSION_ROOM_RATE = env.float("ATTEMPTS_ADMISSION_ROOM_RATE", default=20.0)
+ATTEMPTS_ADMISSION_ROOM_BURST = env.int("ATTEMPTS_ADMISSION_ROOM_BURST", default=40)
+
+# Move payloads of submissions graded more than N days ago to zstd objects on the default
+# storage (apps/attempts/archive.py; needs zstandard). 0 disables archiving.
+ATTEMPTS_ARCHIVE_AFTER_DAYS = env.int("ATTEMPTS_ARCHIVE_AFTER_DAYS", default=0)
+
+# Bulk MockTest import (POST /mock-tests/import/, manage.py import_mock_test; apps/mock_tests/importer.py).
+MOCK_TESTS_IMPORT_MAX_SIZE_MB = env.int("MOCK_TESTS_IMPORT_MAX_SIZE_MB", default=100)
+MOCK_TESTS_IMPORT_MEDIA_WORKERS = env.int("MOCK_TESTS_IMPORT_MEDIA_WORKERS", default=8)
+
 # Celery Beat Schedule for periodic tasks
 CELERY_BEAT_SCHEDULE = {
     'check-expired-subscriptions-daily': {
@@ -178,10 +206,34 @@ CELERY_BEAT_SCHEDULE = {
         # Alternatively, use crontab for specific times:
         # 'schedule': crontab(hour=2, minute=0),  # Run at 2 AM daily
     },
+    'expire-due-submissions': {
+        'task': 'apps.attempts.tasks.expire_due_submissions',
+        'schedule': 15.0,  # Run every 15 seconds (pops due timers only)
+    },
     'auto-submit-stuck-submissions': {
         'task': 'apps.attempts.tasks.auto_submit_stuck_submissions',
+        'schedule': 3600.0,  # Hourly reconciliation across tenant schemas
+    },
+    'aggregate-item-statistics': {
+        'task': 'apps.attempts.tasks.aggregate_item_statistics',
         'schedule': 300.0,  # Run every 5 minutes
     },
+    'calibrate-score-scales': {
+        'task': 'apps.attempts.tasks.calibrate_score_scales',
+        'schedule': 3600.0,  # Hourly; only tests with enough new responses are refitted
+    },
+    'flush-autosaved-answers': {
+        'task': 'apps.attempts.tasks.flush_autosaved_answers',
+        'schedule': 30.0,  # Run every 30 seconds
+    },
+    'flush-telemetry': {
+        'task': 'apps.attempts.tasks.flush_telemetry',
+        'schedule': 10.0,  # Run every 10 seconds (COPY per tenant)
+    },
+    'archive-submission-payloads': {
+        'task': 'apps.attempts.tasks.archive_submission_payloads',
+        'schedule': 86400.0,  # Daily; no-op unless ATTEMPTS_ARCHIVE_AFTER_DAYS is set
+    },
 }
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
@@ -265,6 +317,7 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "idempotency-key",
     # "x-organization-id",  # DEPRECATED: Removed; tenant is identified via user's center_id in JWT
 ]
 
@@ -111,6 +111,7 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "idempotency-key",
     "x-center-id",
     "x-forwarded-for",
     "x-forwarded-proto",
@@ -123,6 +124,7 @@ CORS_EXPOSE_HEADERS = [
     "content-type",
     "authorization",
     "x-csrftoken",
+    "idempotent-replayed",
 ]
 
 # Preflight cache duration (in seconds)